@@ -1,6 +1,9 @@
 from __future__ import annotations
 
+import asyncio
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import streamlit as st
@@ -10,20 +13,67 @@ if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
 from sql_ai_agent.config import load_settings  # noqa: E402
+from sql_ai_agent.db.duckdb_client import CancelScope, QueryCancelledError, QueryTimeoutError  # noqa: E402
 from sql_ai_agent.pipeline import qa_pipeline  # noqa: E402
 from sql_ai_agent.storage.saved_queries import (  # noqa: E402
+    SavedQuery,
+    count_queries,
     delete_query,
     get_query,
     init_db,
     list_queries,
     save_query,
 )
+from sql_ai_agent.utils.tracing import start_metrics_server  # noqa: E402
 
 st.set_page_config(page_title="SQL AI Agent", layout="centered")
 
-settings = load_settings()
+SAVED_QUERY_OPTIONS = 200
+
+# Fragments rerun only their own block on interaction (st.fragment from 1.37,
+# st.experimental_fragment before); without them every interaction reruns the script.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+
+
+def _partial(func):
+    return _fragment(func) if _fragment else func
+
+
+@st.cache_resource
+def _settings():
+    return load_settings()
+
+
+@st.cache_resource
+def _metrics_server(port: int):
+    return start_metrics_server(port)
+
+
+@st.cache_resource
+def _init_saved_queries(db_path: str) -> None:
+    init_db(db_path)
+
+
+# Changes made here clear the cache; the ttl picks up saves made through the API or scripts.
+@st.cache_data(max_entries=64, ttl=60)
+def _saved_query_page(db_path: str, search: str | None) -> tuple[list[SavedQuery], int]:
+    saved = list_queries(db_path, search=search, limit=SAVED_QUERY_OPTIONS)
+    total = len(saved) if len(saved) < SAVED_QUERY_OPTIONS else count_queries(db_path, search=search)
+    return saved, total
+
+
+def _saved_queries_changed() -> None:
+    _saved_query_page.clear()
+
+
+settings = _settings()
+if settings.metrics_port:
+    try:
+        _metrics_server(settings.metrics_port)
+    except OSError as exc:
+        st.warning(f"Metrics endpoint unavailable on port {settings.metrics_port}: {exc}")
 try:
-    init_db(settings.saved_queries_db)
+    _init_saved_queries(settings.saved_queries_db)
 except Exception as exc:
     st.error(f"Failed to initialize saved queries database: {exc}")
 
@@ -60,6 +110,43 @@ def load_selected_query(query_id: int) -> None:
     st.session_state["save_name"] = selected.name
     st.session_state["save_tag"] = selected.tag or ""
     st.session_state["save_notes"] = selected.notes or ""
+    if _fragment:
+        # The query panel lives outside the sidebar fragment, so it needs a full rerun.
+        st.session_state["reload_app"] = True
+
+
+@st.cache_resource
+def _background_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=8, thread_name_prefix="streamlit-query")
+
+
+def _execute(sql: str, schema_context: str, explain: bool, scope: CancelScope):
+    if explain:
+        return asyncio.run(qa_pipeline.aexecute_and_explain(sql, schema_context, scope, paged=True))
+    return qa_pipeline.execute_sql_page(sql, scope=scope), None
+
+
+def _mark_cancelled() -> None:
+    st.session_state["query_cancelled"] = True
+
+
+def _run_cancellable(sql: str, schema_context: str, explain: bool):
+    # Clicking "Cancel query" triggers a rerun, which stops this script at the next
+    # Streamlit call in the polling loop; the finally block then interrupts DuckDB.
+    scope = CancelScope()
+    future = _background_executor().submit(_execute, sql, schema_context, explain, scope)
+    status = st.empty()
+    st.button("Cancel query", on_click=_mark_cancelled)
+    started = time.perf_counter()
+    try:
+        while not future.done():
+            status.caption(f"Running query... {time.perf_counter() - started:.1f}s")
+            time.sleep(0.1)
+    finally:
+        if not future.done():
+            scope.cancel()
+    status.empty()
+    return future.result()
 
 
 def delete_selected_query() -> None:
@@ -67,14 +154,52 @@ def delete_selected_query() -> None:
     if query_id is None:
         return
     deleted = delete_query(settings.saved_queries_db, int(query_id))
+    if deleted:
+        _saved_queries_changed()
     st.session_state["delete_status"] = "deleted" if deleted else "not_found"
-    st.rerun()
+
+
+@_partial
+def _saved_queries_panel() -> None:
+    if st.session_state.pop("reload_app", False):
+        st.rerun()
+    st.header("Saved Queries")
+    try:
+        search = st.text_input("Search", "").strip() or None
+        saved, total = _saved_query_page(settings.saved_queries_db, search)
+        if saved:
+            labels = {item.id: f"{item.name}  ({item.created_at[:10]})" for item in saved}
+            selected_id = st.selectbox(
+                "Select a saved query",
+                list(labels),
+                index=0,
+                key="selected_query_id",
+                format_func=lambda query_id: labels.get(query_id, str(query_id)),
+            )
+            col_load, col_delete = st.columns(2)
+            with col_load:
+                st.button("Load Query", on_click=load_selected_query, args=(selected_id,))
+            with col_delete:
+                st.button("Delete Query", on_click=delete_selected_query)
+            if st.session_state["delete_status"] == "deleted":
+                st.success("Deleted.")
+                st.session_state["delete_status"] = ""
+            elif st.session_state["delete_status"] == "not_found":
+                st.warning("Query not found.")
+                st.session_state["delete_status"] = ""
+            if total == len(saved):
+                st.caption(f"{len(saved)} saved queries")
+            else:
+                st.caption(f"Showing the top {len(saved)} of {total} saved queries. Refine the search to narrow them.")
+        else:
+            st.caption("No saved queries yet.")
+    except Exception as exc:
+        st.error(f"Failed to load saved queries: {exc}")
+
 
 st.title("SQL AI Agent")
 st.write("Ask a question about the books dataset (for example: 'What is the average price?').")
 
-question = st.text_input("Question", "", key="question")
-
 if "generated_sql" not in st.session_state:
     st.session_state["generated_sql"] = ""
 if "last_question" not in st.session_state:
@@ -99,154 +224,191 @@ if "show_explanation" not in st.session_state:
     st.session_state["show_explanation"] = False
 if "delete_status" not in st.session_state:
     st.session_state["delete_status"] = ""
-if "result_df" not in st.session_state:
-    st.session_state["result_df"] = None
+if "result_page" not in st.session_state:
+    st.session_state["result_page"] = None
 if "has_results" not in st.session_state:
     st.session_state["has_results"] = False
+if "query_cancelled" not in st.session_state:
+    st.session_state["query_cancelled"] = False
 
-if question != st.session_state["last_question"]:
-    st.session_state["generated_sql"] = ""
-    st.session_state["last_question"] = question
-    st.session_state["schema_context"] = ""
-    st.session_state["sql_explanation"] = ""
-    st.session_state["show_save_details"] = False
-    st.session_state["last_sql"] = ""
-    st.session_state["show_sql"] = False
-    st.session_state["show_explanation"] = False
-    st.session_state["result_df"] = None
-    st.session_state["has_results"] = False
-    if question.strip():
-        st.session_state["save_name"] = question.strip()[:80]
 
-with st.sidebar:
-    st.header("Saved Queries")
-    try:
-        search = st.text_input("Search", "")
-        saved = list_queries(settings.saved_queries_db, search=search.strip() or None)
-        if saved:
-            options = [item.id for item in saved]
-            selected_id = st.selectbox(
-                "Select a saved query",
-                options,
-                index=0,
-                key="selected_query_id",
-                format_func=lambda query_id: next(
-                    (f"{item.name}  ({item.created_at[:10]})" for item in saved if item.id == query_id),
-                    str(query_id),
-                ),
-            )
-            col_load, col_delete = st.columns(2)
-            with col_load:
-                st.button("Load Query", on_click=load_selected_query, args=(selected_id,))
-            with col_delete:
-                st.button("Delete Query", on_click=delete_selected_query)
-            if st.session_state["delete_status"] == "deleted":
-                st.success("Deleted.")
-                st.session_state["delete_status"] = ""
-            elif st.session_state["delete_status"] == "not_found":
-                st.warning("Query not found.")
-                st.session_state["delete_status"] = ""
-            st.caption(f"{len(saved)} saved queries")
-        else:
-            st.caption("No saved queries yet.")
-    except Exception as exc:
-        st.error(f"Failed to load saved queries: {exc}")
+@_partial
+def _query_panel() -> None:
+    question = st.text_input("Question", "", key="question")
 
-with st.container():
-    st.markdown('<div class="btn-run">', unsafe_allow_html=True)
-    run_clicked = st.button("Run query")
-    st.markdown("</div>", unsafe_allow_html=True)
-
-if run_clicked:
-    if not question.strip():
-        st.warning("Please enter a question.")
-    else:
-        try:
-            result = qa_pipeline.prepare_question(question)
-            st.session_state["generated_sql"] = result["sql"]
-            st.session_state["schema_context"] = result.get("schema_context", "")
-            st.session_state["sql_explanation"] = ""
-            st.session_state["show_save_details"] = False
-            st.session_state["show_sql"] = False
-            for note in result.get("notes", []):
-                st.info(note)
-
-            df = qa_pipeline.execute_sql(st.session_state["generated_sql"])
-            df = df.reset_index(drop=True)
-            st.session_state["result_df"] = df
-            st.session_state["has_results"] = True
-        except Exception as exc:
-            st.session_state["has_results"] = False
-            st.error(str(exc))
-
-if st.session_state["has_results"] and st.session_state["result_df"] is not None:
-    st.dataframe(st.session_state["result_df"], use_container_width=True, hide_index=True)
-    st.divider()
-
-    col_save, col_explain, col_sql = st.columns(3)
-    with col_save:
-        if st.button("Save query"):
-            st.session_state["show_save_details"] = True
-    with col_explain:
-        st.session_state["show_explanation"] = st.toggle(
-            "Explain SQL",
-            value=st.session_state["show_explanation"],
-        )
-    with col_sql:
-        st.session_state["show_sql"] = st.toggle(
-            "See SQL query",
-            value=st.session_state["show_sql"])
-
-    with st.expander("Generated SQL", expanded=st.session_state["show_sql"]):
-        st.code(st.session_state["generated_sql"], language="sql")
-
-    if st.session_state["show_explanation"] and not st.session_state["sql_explanation"]:
-        try:
-            explanation = qa_pipeline.explain(
-                st.session_state["generated_sql"],
-                st.session_state.get("schema_context", ""),
-            )
-            st.session_state["sql_explanation"] = explanation
-        except Exception as exc:
-            st.error(str(exc))
-            st.session_state["show_explanation"] = False
-
-    with st.expander("Explanation", expanded=st.session_state["show_explanation"]):
-        if st.session_state["sql_explanation"]:
-            st.write(st.session_state["sql_explanation"])
+    if question != st.session_state["last_question"]:
+        st.session_state["generated_sql"] = ""
+        st.session_state["last_question"] = question
+        st.session_state["schema_context"] = ""
+        st.session_state["sql_explanation"] = ""
+        st.session_state["show_save_details"] = False
+        st.session_state["last_sql"] = ""
+        st.session_state["show_sql"] = False
+        st.session_state["show_explanation"] = False
+        st.session_state["result_page"] = None
+        st.session_state["has_results"] = False
+        if question.strip():
+            st.session_state["save_name"] = question.strip()[:80]
+
+    with st.container():
+        st.markdown('<div class="btn-run">', unsafe_allow_html=True)
+        run_clicked = st.button("Run query")
+        st.markdown("</div>", unsafe_allow_html=True)
+
+    if run_clicked:
+        if not question.strip():
+            st.warning("Please enter a question.")
         else:
-            st.caption("Toggle 'Explain SQL' to generate a short explanation.")
-
-    if st.session_state["show_save_details"]:
-        st.subheader("Save details")
-        st.text_input("Name", key="save_name")
-        st.text_input("Tag (optional)", key="save_tag")
-        st.text_area("Notes (optional)", key="save_notes")
-
-        col_confirm, col_cancel = st.columns(2)
-        with col_confirm:
-            if st.button("Confirm save"):
-                if not question.strip():
-                    st.warning("Enter a question before saving.")
-                elif not st.session_state["generated_sql"]:
-                    st.warning("Run the query before saving.")
-                elif not st.session_state["save_name"].strip():
-                    st.warning("Please provide a name for this query.")
-                else:
-                    try:
-                        save_query(
-                            settings.saved_queries_db,
-                            name=st.session_state["save_name"].strip(),
-                            question=question.strip(),
-                            sql=st.session_state["generated_sql"],
-                            tag=st.session_state["save_tag"].strip() or None,
-                            notes=st.session_state["save_notes"].strip() or None,
-                        )
-                        st.success("Saved.")
-                        st.session_state["show_save_details"] = False
-                        st.rerun()
-                    except Exception as exc:
-                        st.error(str(exc))
-        with col_cancel:
-            if st.button("Cancel"):
+            try:
+                sql_preview = st.empty()
+                partial_sql = ""
+                result = {}
+                for event in qa_pipeline.prepare_question_stream(question):
+                    if event["type"] == "sql_delta":
+                        partial_sql += event["text"]
+                        sql_preview.code(partial_sql, language="sql")
+                    else:
+                        result = event["result"]
+                sql_preview.empty()
+                st.session_state["generated_sql"] = result["sql"]
+                st.session_state["schema_context"] = result.get("schema_context", "")
+                st.session_state["sql_explanation"] = ""
                 st.session_state["show_save_details"] = False
+                st.session_state["show_sql"] = False
+                for note in result.get("notes", []):
+                    st.info(note)
+                suggestion = result.get("suggestion")
+                if suggestion:
+                    with st.expander(f"Suggested SQL from a similar question: {suggestion['question']}"):
+                        st.code(suggestion["sql"], language="sql")
+
+                page, explanation = _run_cancellable(
+                    st.session_state["generated_sql"],
+                    st.session_state["schema_context"],
+                    st.session_state["show_explanation"],
+                )
+                if explanation is not None:
+                    st.session_state["sql_explanation"] = explanation
+                st.session_state["result_page"] = page
+                st.session_state["has_results"] = True
+            except QueryTimeoutError as exc:
+                st.session_state["has_results"] = False
+                st.error(f"{exc} Try a narrower question.")
+            except QueryCancelledError:
+                st.session_state["has_results"] = False
+                st.warning("Query cancelled.")
+            except Exception as exc:
+                st.session_state["has_results"] = False
+                st.error(str(exc))
+
+    if st.session_state["query_cancelled"]:
+        st.warning("Query cancelled.")
+        st.session_state["query_cancelled"] = False
+
+    if st.session_state["has_results"] and st.session_state["result_page"] is not None:
+        page = st.session_state["result_page"]
+        if page.page_count > 1:
+            page_number = st.number_input(
+                "Page",
+                min_value=1,
+                max_value=page.page_count,
+                value=page.page + 1,
+                step=1,
+            )
+            if page_number - 1 != page.page:
+                try:
+                    page = qa_pipeline.execute_sql_page(
+                        st.session_state["generated_sql"],
+                        page=int(page_number) - 1,
+                        page_size=page.page_size,
+                        total_rows=page.total_rows,
+                    )
+                    st.session_state["result_page"] = page
+                except Exception as exc:
+                    st.error(str(exc))
+        st.dataframe(page.df.reset_index(drop=True), use_container_width=True, hide_index=True)
+        if page.total_rows:
+            last_row = page.first_row + len(page.df)
+            st.caption(f"Rows {page.first_row + 1}-{last_row} of {page.total_rows}")
+        if page.truncated:
+            st.warning(f"Only the first {page.row_cap} of {page.total_rows} rows can be browsed.")
+        st.divider()
+
+        col_save, col_explain, col_sql = st.columns(3)
+        with col_save:
+            if st.button("Save query"):
+                st.session_state["show_save_details"] = True
+        with col_explain:
+            st.session_state["show_explanation"] = st.toggle(
+                "Explain SQL",
+                value=st.session_state["show_explanation"],
+            )
+        with col_sql:
+            st.session_state["show_sql"] = st.toggle(
+                "See SQL query",
+                value=st.session_state["show_sql"])
+
+        with st.expander("Generated SQL", expanded=st.session_state["show_sql"]):
+            st.code(st.session_state["generated_sql"], language="sql")
+
+        with st.expander("Explanation", expanded=st.session_state["show_explanation"]):
+            explanation_area = st.empty()
+            if st.session_state["show_explanation"] and not st.session_state["sql_explanation"]:
+                try:
+                    explanation = ""
+                    for text in qa_pipeline.explain_stream(
+                        st.session_state["generated_sql"],
+                        st.session_state.get("schema_context", ""),
+                    ):
+                        explanation += text
+                        explanation_area.write(explanation)
+                    st.session_state["sql_explanation"] = explanation
+                except Exception as exc:
+                    st.error(str(exc))
+                    st.session_state["show_explanation"] = False
+
+            if st.session_state["sql_explanation"]:
+                explanation_area.write(st.session_state["sql_explanation"])
+            else:
+                explanation_area.caption("Toggle 'Explain SQL' to generate a short explanation.")
+
+        if st.session_state["show_save_details"]:
+            st.subheader("Save details")
+            st.text_input("Name", key="save_name")
+            st.text_input("Tag (optional)", key="save_tag")
+            st.text_area("Notes (optional)", key="save_notes")
+
+            col_confirm, col_cancel = st.columns(2)
+            with col_confirm:
+                if st.button("Confirm save"):
+                    if not question.strip():
+                        st.warning("Enter a question before saving.")
+                    elif not st.session_state["generated_sql"]:
+                        st.warning("Run the query before saving.")
+                    elif not st.session_state["save_name"].strip():
+                        st.warning("Please provide a name for this query.")
+                    else:
+                        try:
+                            save_query(
+                                settings.saved_queries_db,
+                                name=st.session_state["save_name"].strip(),
+                                question=question.strip(),
+                                sql=st.session_state["generated_sql"],
+                                tag=st.session_state["save_tag"].strip() or None,
+                                notes=st.session_state["save_notes"].strip() or None,
+                            )
+                            _saved_queries_changed()
+                            st.success("Saved.")
+                            st.session_state["show_save_details"] = False
+                            st.rerun()
+                        except Exception as exc:
+                            st.error(str(exc))
+            with col_cancel:
+                if st.button("Cancel"):
+                    st.session_state["show_save_details"] = False
+
+
+with st.sidebar:
+    _saved_queries_panel()
+
+_query_panel()
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import duckdb
+from bs4 import BeautifulSoup
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from sql_ai_agent.ingest.books import parse_book_batch, read_html_pages, write_duckdb  # noqa: E402
+
+FIXTURES = ROOT_DIR / "tests" / "fixtures" / "books_toscrape"
+
+
+# The previous implementation, kept here as the baseline.
+def legacy_parse_books(html: str) -> list[dict[str, object]]:
+    soup = BeautifulSoup(html, "lxml")
+    books: list[dict[str, object]] = []
+    for pod in soup.select("article.product_pod"):
+        title_tag = pod.select_one("h3 a")
+        title = title_tag["title"].strip() if title_tag and title_tag.has_attr("title") else None
+        price_tag = pod.select_one("div.product_price p.price_color")
+        price = None
+        if price_tag:
+            price_text = price_tag.get_text().replace("£", "").replace("Â£", "").strip()
+            try:
+                price = float(price_text)
+            except ValueError:
+                pass
+        if title and price is not None:
+            books.append({"title": title, "price": price})
+    return books
+
+
+def legacy_write_duckdb(db_path: str, books: list[dict[str, object]]) -> None:
+    with duckdb.connect(database=db_path, read_only=False) as con:
+        con.execute("CREATE TABLE IF NOT EXISTS books (title VARCHAR, price DECIMAL(10, 2))")
+        con.execute("DELETE FROM books;")
+        con.executemany(
+            "INSERT INTO books (title, price) VALUES (?, ?)",
+            [(book["title"], book["price"]) for book in books],
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare the legacy and Arrow ingestion paths on HTML fixtures.")
+    parser.add_argument("--html-dir", default=str(FIXTURES), help="Directory of saved catalog pages.")
+    parser.add_argument("--repeat", type=int, default=50, help="How many times the fixture pages are ingested.")
+    args = parser.parse_args()
+
+    pages = list(read_html_pages(args.html_dir)) * args.repeat
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        books = [book for html in pages for book in legacy_parse_books(html)]
+        parsed = time.perf_counter()
+        legacy_write_duckdb(str(Path(tmp) / "legacy.duckdb"), books)
+        legacy = (parsed - started, time.perf_counter() - parsed, len(books))
+
+        started = time.perf_counter()
+        batches = [parse_book_batch(html) for html in pages]
+        parsed = time.perf_counter()
+        rows = write_duckdb(str(Path(tmp) / "arrow.duckdb"), batches)
+        arrow = (parsed - started, time.perf_counter() - parsed, rows)
+
+    print(f"{len(pages)} pages")
+    for name, (parse_seconds, load_seconds, count) in {"legacy": legacy, "arrow": arrow}.items():
+        print(
+            f"{name:>7}: parse {parse_seconds:6.2f}s, load {load_seconds:6.3f}s, "
+            f"{count / (parse_seconds + load_seconds):9.0f} rows/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
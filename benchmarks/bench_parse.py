@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from sql_ai_agent.ingest.books import PARSER_BACKENDS, parse_pages, read_html_pages  # noqa: E402
+
+FIXTURES = ROOT_DIR / "tests" / "fixtures" / "books_toscrape"
+
+
+def measure(html_dir: str, repeat: int, backend: str, processes: int) -> dict[str, float]:
+    pages = list(read_html_pages(html_dir)) * repeat
+    started = time.perf_counter()
+    records = sum(batch.num_rows for batch in parse_pages(pages, backend=backend, processes=processes))
+    elapsed = time.perf_counter() - started
+    # ru_maxrss is in KiB on Linux; pool workers are reported as children.
+    peak_kib = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    return {"pages": len(pages), "records_per_second": records / elapsed, "peak_rss_mib": peak_kib / 1024}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare HTML parser backends on recorded catalog pages.")
+    parser.add_argument("--html-dir", default=str(FIXTURES), help="Directory of saved catalog pages.")
+    parser.add_argument("--repeat", type=int, default=100, help="How many times the fixture pages are parsed.")
+    parser.add_argument("--processes", type=int, default=4, help="Process pool size for the parallel runs.")
+    parser.add_argument("--worker", nargs=2, metavar=("BACKEND", "PROCESSES"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        backend, processes = args.worker
+        print(json.dumps(measure(args.html_dir, args.repeat, backend, int(processes))))
+        return
+
+    # Each configuration runs in a fresh interpreter so peak RSS is not shared between them.
+    for backend in PARSER_BACKENDS:
+        for processes in sorted({1, args.processes}):
+            command = [
+                sys.executable,
+                __file__,
+                "--html-dir",
+                args.html_dir,
+                "--repeat",
+                str(args.repeat),
+                "--worker",
+                backend,
+                str(processes),
+            ]
+            result = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout)
+            print(
+                f"{backend:>5} x{processes}: {result['records_per_second']:10.0f} records/s, "
+                f"peak RSS {result['peak_rss_mib']:6.1f} MiB ({result['pages']} pages)"
+            )
+
+
+if __name__ == "__main__":
+    main()
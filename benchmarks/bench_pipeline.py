@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+for path in (ROOT_DIR, SRC_DIR):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+import duckdb  # noqa: E402
+
+from benchmarks.replay_llm import ReplayLLM  # noqa: E402
+from sql_ai_agent.db.connection_pool import close_pools  # noqa: E402
+from sql_ai_agent.db.summary_tables import wait_for_summaries  # noqa: E402
+from sql_ai_agent.pipeline import qa_pipeline  # noqa: E402
+from sql_ai_agent.storage.saved_queries import close_stores  # noqa: E402
+from sql_ai_agent.utils import tracing  # noqa: E402
+
+_COLUMN_TYPES = ("DOUBLE", "INTEGER", "VARCHAR")
+
+
+def build_catalog(db_path: str, tables: int, columns: int, rows: int) -> None:
+    """Write the scraped ``books`` table plus ``tables`` per-book stats tables ``columns`` wide."""
+    with duckdb.connect(db_path) as con:
+        con.execute(
+            """
+            CREATE OR REPLACE TABLE books AS
+            SELECT i AS book_id, 'Book ' || i AS title, CAST(((i * 37) % 5000) / 100 AS DECIMAL(10, 2)) AS price
+            FROM range(1, ? + 1) AS t(i)
+            """,
+            [rows],
+        )
+        for table in range(1, tables + 1):
+            expressions = []
+            for column in range(1, columns + 1):
+                kind = _COLUMN_TYPES[(column - 1) % len(_COLUMN_TYPES)]
+                seed = table * 101 + column
+                if kind == "DOUBLE":
+                    expressions.append(f"((book_id * {seed}) % 1000) / 10.0 AS metric_{column}")
+                elif kind == "INTEGER":
+                    expressions.append(f"CAST((book_id * {seed}) % 97 AS INTEGER) AS metric_{column}")
+                else:
+                    expressions.append(f"'group_' || ((book_id * {seed}) % 12) AS metric_{column}")
+            con.execute(
+                f"CREATE OR REPLACE TABLE book_stats_{table} AS SELECT book_id, {', '.join(expressions)} FROM books"
+            )
+
+
+def default_workload(tables: int) -> dict[str, str]:
+    workload = {
+        "How many books are there?": "SELECT COUNT(*) AS book_count FROM books",
+        "What is the average book price?": "SELECT AVG(price) AS avg_price FROM books",
+        "Which are the 10 most expensive books?": (
+            "SELECT title AS book_title, price AS book_price FROM books ORDER BY price DESC, title LIMIT 10"
+        ),
+        "List every book with its price": "SELECT title AS book_title, price AS book_price FROM books ORDER BY book_id",
+    }
+    for table in range(1, tables + 1):
+        workload[f"What is the average metric_1 in book_stats_{table}?"] = (
+            f"SELECT AVG(metric_1) AS avg_metric FROM book_stats_{table}"
+        )
+        workload[f"What is the total metric_1 of book_stats_{table} per price band?"] = (
+            "SELECT FLOOR(b.price / 10) * 10 AS price_band, SUM(s.metric_1) AS total_metric "
+            f"FROM books AS b JOIN book_stats_{table} AS s USING (book_id) GROUP BY 1 ORDER BY 1"
+        )
+    return workload
+
+
+def load_workload(path: str) -> dict[str, str]:
+    with open(path, encoding="utf-8") as handle:
+        rows = [json.loads(line) for line in handle if line.strip()]
+    return {row["question"]: row["sql"] for row in rows}
+
+
+class _SpanRecorder(logging.Handler):
+    """Keeps the duration of every finished tracing span, grouped by span name."""
+
+    def __init__(self) -> None:
+        super().__init__(logging.INFO)
+        self.durations: dict[str, list[float]] = {}
+        self._lock = threading.Lock()
+
+    def emit(self, record: logging.LogRecord) -> None:
+        span = getattr(record, "span", None)
+        if span:
+            with self._lock:
+                self.durations.setdefault(span["name"], []).append(span["duration_ms"] / 1000)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(durations: list[float]) -> dict[str, float]:
+    total = sum(durations)
+    return {
+        "count": len(durations),
+        "p50_ms": percentile(durations, 0.50) * 1000,
+        "p95_ms": percentile(durations, 0.95) * 1000,
+        "p99_ms": percentile(durations, 0.99) * 1000,
+        "mean_ms": total / len(durations) * 1000,
+        "calls_per_second": len(durations) / total if total else 0.0,
+    }
+
+
+def _commit() -> str | None:
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def run_benchmark(
+    workdir: str,
+    tables: int,
+    columns: int,
+    rows: int,
+    rounds: int,
+    concurrency: int,
+    llm_latency_ms: float,
+    workload: dict[str, str] | None = None,
+) -> dict:
+    db_path = str(Path(workdir) / "bench.duckdb")
+    started = time.perf_counter()
+    build_catalog(db_path, tables, columns, rows)
+    build_seconds = time.perf_counter() - started
+    workload = workload or default_workload(tables)
+
+    llm = ReplayLLM(workload, latency_seconds=llm_latency_ms / 1000)
+    os.environ.update(
+        {
+            "DUCKDB_PATH": db_path,
+            "SQL_CACHE_DB": str(Path(workdir) / "sql_cache.db"),
+            "SCHEMA_PROFILE_DB": str(Path(workdir) / "schema_profiles.db"),
+            # Every file the pipeline writes stays in the workdir, whatever .env points at.
+            "SAVED_QUERIES_DB": str(Path(workdir) / "saved_queries.db"),
+            "SUMMARY_DB": str(Path(workdir) / "summaries.duckdb"),
+            "RESULT_CACHE_SPILL_DIR": str(Path(workdir) / "result_spill"),
+            "OPENAI_API_KEY": "replay",
+            "OPENAI_BASE_URL": llm.base_url,
+            "OPENAI_MAX_RETRIES": "0",
+        }
+    )
+    recorder = _SpanRecorder()
+    trace_logger = logging.getLogger(tracing.__name__)
+    trace_logger.addHandler(recorder)
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
+    tracing.configure_tracing(True)
+
+    end_to_end: list[float] = []
+    errors: list[str] = []
+
+    def answer(question: str) -> None:
+        question_started = time.perf_counter()
+        try:
+            qa_pipeline.run(question)
+        except Exception as exc:
+            errors.append(f"{question}: {exc}")
+        end_to_end.append(time.perf_counter() - question_started)
+
+    try:
+        # Warm the schema catalog, retrieval index and column profiles outside the measurement.
+        qa_pipeline.warm_up()
+        recorder.durations.clear()
+
+        questions = list(workload) * rounds
+        wall_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            list(pool.map(answer, questions))
+        wall_seconds = time.perf_counter() - wall_started
+
+        sql_stats = qa_pipeline.sql_cache_stats()
+        result_stats = qa_pipeline.result_cache_stats()
+    finally:
+        tracing.configure_tracing(False)
+        trace_logger.removeHandler(recorder)
+        llm.close()
+
+    stages = {name: summarize(durations) for name, durations in sorted(recorder.durations.items())}
+    stages["end_to_end"] = summarize(end_to_end)
+    return {
+        "commit": _commit(),
+        "config": {
+            "tables": tables,
+            "columns": columns,
+            "rows": rows,
+            "rounds": rounds,
+            "concurrency": concurrency,
+            "llm_latency_ms": llm_latency_ms,
+            "questions": len(workload),
+        },
+        "build_seconds": build_seconds,
+        "wall_seconds": wall_seconds,
+        "questions_per_second": len(questions) / wall_seconds if wall_seconds else 0.0,
+        "errors": errors,
+        "llm_requests": llm.requests,
+        # ru_maxrss is in KiB on Linux and covers the whole run, catalog build included.
+        "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "caches": {
+            "sql": {
+                "hit_rate": sql_stats.hit_rate,
+                "exact_hits": sql_stats.exact_hits,
+                "similar_hits": sql_stats.similar_hits,
+                "misses": sql_stats.misses,
+            },
+            "result": {"hit_rate": result_stats.hit_rate, "hits": result_stats.hits, "misses": result_stats.misses},
+        },
+        "stages": stages,
+    }
+
+
+def print_report(report: dict, baseline: dict | None = None) -> None:
+    config = report["config"]
+    print(
+        f"{config['questions']} questions x {config['rounds']} rounds over {config['tables'] + 1} tables "
+        f"({config['rows']} rows, {config['columns']} columns each): "
+        f"{report['questions_per_second']:.1f} questions/s, peak RSS {report['peak_rss_mib']:.1f} MiB, "
+        f"{len(report['errors'])} errors"
+    )
+    caches = report["caches"]
+    print(
+        f"SQL cache hit rate {caches['sql']['hit_rate']:.0%}, "
+        f"result cache hit rate {caches['result']['hit_rate']:.0%}"
+    )
+    for name, stats in report["stages"].items():
+        line = (
+            f"  {name:<28} {stats['count']:>5} calls  p50 {stats['p50_ms']:8.2f} ms  "
+            f"p95 {stats['p95_ms']:8.2f} ms  p99 {stats['p99_ms']:8.2f} ms"
+        )
+        previous = (baseline or {}).get("stages", {}).get(name)
+        if previous and previous["p50_ms"]:
+            line += f"  p50 x{stats['p50_ms'] / previous['p50_ms']:.2f} vs baseline"
+        print(line)
+    for error in report["errors"][:5]:
+        print(f"  error: {error}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the question-to-answer path against a replayed LLM.")
+    parser.add_argument("--tables", type=int, default=4, help="Synthetic stats tables added next to books.")
+    parser.add_argument("--columns", type=int, default=12, help="Columns per synthetic stats table.")
+    parser.add_argument("--rows", type=int, default=100_000, help="Rows in books and in every stats table.")
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over the workload; later passes hit caches.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Questions answered in parallel.")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Delay added to every replayed LLM call.")
+    parser.add_argument("--workload", help="JSONL file of recorded {'question', 'sql'} pairs to replay.")
+    parser.add_argument("--output", help="Write the report as JSON to this file.")
+    parser.add_argument("--baseline", help="A previous --output file to compare stage latencies against.")
+    args = parser.parse_args()
+
+    workload = load_workload(args.workload) if args.workload else None
+    with tempfile.TemporaryDirectory(prefix="sql-ai-agent-bench-") as workdir:
+        report = run_benchmark(
+            workdir,
+            tables=args.tables,
+            columns=args.columns,
+            rows=args.rows,
+            rounds=args.rounds,
+            concurrency=args.concurrency,
+            llm_latency_ms=args.llm_latency_ms,
+            workload=workload,
+        )
+        # Background writers finish and pooled connections close before the directory is removed.
+        qa_pipeline.wait_for_sql_history()
+        wait_for_summaries()
+        close_pools()
+        close_stores()
+
+    baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8")) if args.baseline else None
+    print_report(report, baseline)
+    if args.output:
+        Path(args.output).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.output).write_text(json.dumps(report, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
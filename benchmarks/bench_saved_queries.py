@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import argparse
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from sql_ai_agent.storage.saved_queries import SavedQueryStore  # noqa: E402
+
+
+class LegacyStore:
+    """The previous access pattern: a new rollback-journal connection per call."""
+
+    def __init__(self, db_path: str) -> None:
+        self._db_path = db_path
+        SavedQueryStore(db_path).close()
+        with sqlite3.connect(db_path) as con:
+            con.execute("PRAGMA journal_mode=DELETE")
+
+    def save(self, name: str, question: str, sql: str) -> int:
+        with sqlite3.connect(self._db_path, timeout=30.0) as con:
+            cursor = con.execute(
+                "INSERT INTO saved_queries (name, question, sql, created_at) VALUES (?, ?, ?, ?)",
+                (name, question, sql, datetime.now(timezone.utc).isoformat()),
+            )
+            con.commit()
+            return int(cursor.lastrowid)
+
+    def list_queries(self, limit: int) -> list[tuple]:
+        with sqlite3.connect(self._db_path, timeout=30.0) as con:
+            return con.execute(
+                "SELECT id, name, question, sql, created_at, tag, notes FROM saved_queries "
+                "ORDER BY created_at DESC LIMIT ?",
+                (limit,),
+            ).fetchall()
+
+
+def run(store, seconds: float, readers: int, writers: int) -> tuple[int, int]:
+    counts = {"reads": 0, "writes": 0}
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def read() -> None:
+        done = 0
+        while time.perf_counter() < deadline:
+            store.list_queries(limit=50)
+            done += 1
+        with lock:
+            counts["reads"] += done
+
+    def write() -> None:
+        done = 0
+        while time.perf_counter() < deadline:
+            store.save(f"Query {done}", "How many books?", "SELECT COUNT(*) FROM books")
+            done += 1
+        with lock:
+            counts["writes"] += done
+
+    threads = [threading.Thread(target=read) for _ in range(readers)]
+    threads += [threading.Thread(target=write) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return counts["reads"], counts["writes"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare saved-query stores under concurrent reads and writes.")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Duration of each run.")
+    parser.add_argument("--readers", type=int, default=4, help="Reader threads.")
+    parser.add_argument("--writers", type=int, default=2, help="Writer threads.")
+    parser.add_argument("--rows", type=int, default=20_000, help="Rows loaded before the run.")
+    args = parser.parse_args()
+
+    seed = [{"name": f"Seed {i}", "question": f"Question {i}", "sql": f"SELECT {i}"} for i in range(args.rows)]
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("legacy", "pooled WAL"):
+            db_path = str(Path(tmp) / f"{name.replace(' ', '_')}.db")
+            loader = SavedQueryStore(db_path)
+            loader.save_many(seed)
+            loader.close()
+            store = LegacyStore(db_path) if name == "legacy" else SavedQueryStore(db_path, pool_size=args.readers + 1)
+            reads, writes = run(store, args.seconds, args.readers, args.writers)
+            print(f"{name:>10}: {reads / args.seconds:9.0f} reads/s, {writes / args.seconds:7.0f} writes/s")
+            if isinstance(store, SavedQueryStore):
+                store.close()
+
+
+if __name__ == "__main__":
+    main()
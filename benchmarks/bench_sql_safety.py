@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+import timeit
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from sql_ai_agent.safety import sql_safety  # noqa: E402
+
+# The previous implementation, kept here as the baseline.
+_LEGACY_PATTERN = re.compile(r"\b(" + "|".join(sql_safety._BLOCKED_KEYWORDS) + r")\b", re.IGNORECASE)
+
+
+def legacy_is_read_only(sql: str) -> bool:
+    if not sql or not sql.strip():
+        return False
+    stripped = sql.strip()
+    if ";" in stripped and len([part for part in stripped.split(";") if part.strip()]) != 1:
+        return False
+    return _LEGACY_PATTERN.search(sql) is None
+
+
+def generated_query(columns: int) -> str:
+    selects = ",\n    ".join(
+        f"AVG(CASE WHEN category = 'cat_{i}' THEN price END) AS avg_price_cat_{i} -- category {i}"
+        for i in range(columns)
+    )
+    return (
+        "WITH priced AS (\n"
+        "    SELECT title, price, category FROM books WHERE title NOT LIKE '%draft%'\n"
+        ")\n"
+        f"SELECT\n    {selects}\nFROM priced\nGROUP BY ALL\nORDER BY 1 DESC;"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare SQL safety validators on long generated queries.")
+    parser.add_argument("--columns", type=int, default=200, help="Aggregated columns in the generated query.")
+    parser.add_argument("--number", type=int, default=2000, help="Validations per measurement.")
+    args = parser.parse_args()
+
+    sql = generated_query(args.columns)
+    uncached = sql_safety.is_read_only.__wrapped__
+    assert legacy_is_read_only(sql) and uncached(sql)
+
+    results = {
+        "legacy regex": legacy_is_read_only,
+        "scanner (uncached)": uncached,
+        "scanner (cached verdict)": sql_safety.is_read_only,
+    }
+    print(f"query length: {len(sql)} chars, {args.number} validations each")
+    for name, func in results.items():
+        best = min(timeit.repeat(lambda: func(sql), number=args.number, repeat=5))
+        print(f"{name:>26}: {best / args.number * 1e6:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from sql_ai_agent.llm.sql_cache import normalize_question  # noqa: E402
+
+_QUESTION = re.compile(r"\n\nQuestion:\n(.*)\n\nSQL:$", re.S)
+EXPLANATION = "Returns the requested figures from the catalog."
+
+
+class ReplayLLM:
+    """A local OpenAI-compatible endpoint that answers each question with its recorded SQL.
+
+    Questions are matched after ``normalize_question``; unknown questions get a 400 so
+    gaps in a workload show up as errors instead of made-up SQL.
+    """
+
+    def __init__(self, recordings: dict[str, str], latency_seconds: float = 0.0) -> None:
+        self._recordings = {normalize_question(question): sql for question, sql in recordings.items()}
+        self._latency_seconds = latency_seconds
+        self._lock = threading.Lock()
+        self.requests = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="replay-llm", daemon=True)
+        self._thread.start()
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def close(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def answer(self, messages: list[dict]) -> str | None:
+        prompt = messages[-1]["content"] if messages else ""
+        if prompt.startswith("DuckDB rejected this query"):
+            # Repairs replay the recorded SQL for the original question.
+            prompt = messages[1]["content"]
+        match = _QUESTION.search(prompt)
+        if match is None:
+            return EXPLANATION
+        return self._recordings.get(normalize_question(match.group(1)))
+
+    def _handler(self) -> type[BaseHTTPRequestHandler]:
+        replay = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args) -> None:
+                pass
+
+            def do_POST(self) -> None:
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                with replay._lock:
+                    replay.requests += 1
+                if replay._latency_seconds:
+                    time.sleep(replay._latency_seconds)
+                content = replay.answer(request.get("messages", []))
+                if content is None:
+                    self._send(400, "application/json", json.dumps({"error": {"message": "No recorded SQL."}}))
+                elif request.get("stream"):
+                    self._send(200, "text/event-stream", _stream_body(content))
+                else:
+                    self._send(200, "application/json", json.dumps(_completion_body(content, request)))
+
+            def _send(self, status: int, content_type: str, body: str) -> None:
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+def _completion_body(content: str, request: dict) -> dict:
+    # Roughly four characters per token, so token counts scale with prompt size.
+    prompt_tokens = sum(len(message.get("content", "")) for message in request.get("messages", [])) // 4
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": "chatcmpl-replay",
+        "object": "chat.completion",
+        "created": 0,
+        "model": request.get("model", "replay"),
+        "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+def _stream_body(content: str) -> str:
+    events = []
+    for start in range(0, len(content), 16):
+        chunk = {
+            "id": "chatcmpl-replay",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "replay",
+            "choices": [{"index": 0, "delta": {"content": content[start : start + 16]}, "finish_reason": None}],
+        }
+        events.append(f"data: {json.dumps(chunk)}\n\n")
+    events.append("data: [DONE]\n\n")
+    return "".join(events)
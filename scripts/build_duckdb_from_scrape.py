@@ -1,89 +1,97 @@
 from __future__ import annotations
 
+import argparse
 import logging
 import sys
 from pathlib import Path
 
-import duckdb
-from bs4 import BeautifulSoup
-from firecrawl import FirecrawlApp
-
 ROOT_DIR = Path(__file__).resolve().parents[1]
 SRC_DIR = ROOT_DIR / "src"
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
 
 from sql_ai_agent.config import load_settings  # noqa: E402
+from sql_ai_agent.ingest.books import (  # noqa: E402
+    PARSER_BACKENDS,
+    URL_TO_SCRAPE,
+    parse_pages,
+    read_html_pages,
+    scrape_html,
+    write_duckdb,
+)
+from sql_ai_agent.ingest.crawler import FirecrawlFetcher, HttpFetcher, crawl  # noqa: E402
 from sql_ai_agent.utils.logging import setup_logging  # noqa: E402
 
-URL_TO_SCRAPE = "https://books.toscrape.com/"
-
-
-def scrape_html(api_key: str) -> str:
-    app = FirecrawlApp(api_key=api_key)
-    result = app.scrape_url(URL_TO_SCRAPE, params={"formats": ["html"]})
-    html = result.get("html")
-    if not html:
-        raise RuntimeError("Scrape completed but no HTML was returned.")
-    return html
-
-
-def parse_books(html: str) -> list[dict[str, object]]:
-    soup = BeautifulSoup(html, "lxml")
-    books: list[dict[str, object]] = []
-
-    for pod in soup.select("article.product_pod"):
-        title_tag = pod.select_one("h3 a")
-        title = title_tag["title"].strip() if title_tag and title_tag.has_attr("title") else None
-
-        price_tag = pod.select_one("div.product_price p.price_color")
-        price = None
-        if price_tag:
-            price_text = price_tag.get_text()
-            price_text = price_text.replace("\u00a3", "").replace("\u00c2\u00a3", "").strip()
-            try:
-                price = float(price_text)
-            except ValueError:
-                logging.warning("Unable to parse price: %s", price_text)
 
-        if title and price is not None:
-            books.append({"title": title, "price": price})
-
-    return books
-
-
-def write_duckdb(db_path: str, books: list[dict[str, object]]) -> None:
-    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    with duckdb.connect(database=db_path, read_only=False) as con:
-        con.execute(
-            """
-            CREATE TABLE IF NOT EXISTS books (
-                title VARCHAR,
-                price DECIMAL(10, 2)
-            );
-            """
-        )
-        con.execute("DELETE FROM books;")
-        con.executemany(
-            "INSERT INTO books (title, price) VALUES (?, ?)",
-            [(book["title"], book["price"]) for book in books],
+def run_crawl(args, settings) -> None:
+    if args.fetcher == "firecrawl":
+        if not settings.firecrawl_api_key:
+            raise ValueError("FIRECRAWL_API_KEY is not set.")
+        fetcher = FirecrawlFetcher(settings.firecrawl_api_key)
+    else:
+        fetcher = HttpFetcher(max_connections=args.workers)
+    try:
+        crawl(
+            settings.duckdb_path,
+            fetcher,
+            start_url=args.start_url,
+            workers=args.workers,
+            max_pages=args.max_pages,
+            parser=args.parser,
         )
+    finally:
+        if isinstance(fetcher, HttpFetcher):
+            fetcher.close()
 
 
 def main() -> None:
+    parser = argparse.ArgumentParser(description="Build the books DuckDB file from books.toscrape.com.")
+    parser.add_argument(
+        "--html-dir",
+        help="Load saved HTML pages from this directory instead of scraping (works offline).",
+    )
+    parser.add_argument("--save-html", help="Also write the scraped HTML to this file.")
+    parser.add_argument(
+        "--crawl",
+        action="store_true",
+        help="Walk every catalog page and upsert only books from pages that changed since the last crawl.",
+    )
+    parser.add_argument("--start-url", default=URL_TO_SCRAPE, help="First catalog page for --crawl.")
+    parser.add_argument("--fetcher", choices=("http", "firecrawl"), default="http", help="How --crawl fetches pages.")
+    parser.add_argument("--workers", type=int, default=8, help="Pages fetched in parallel by --crawl.")
+    parser.add_argument("--max-pages", type=int, default=None, help="Stop --crawl after this many pages.")
+    parser.add_argument(
+        "--parser",
+        choices=PARSER_BACKENDS,
+        default="lxml",
+        help="HTML parser: streaming lxml.etree (fast) or BeautifulSoup.",
+    )
+    parser.add_argument("--processes", type=int, default=1, help="Parse saved pages across this many processes.")
+    args = parser.parse_args()
+
     setup_logging()
     settings = load_settings()
 
-    if not settings.firecrawl_api_key:
-        raise ValueError("FIRECRAWL_API_KEY is not set.")
-
-    html = scrape_html(settings.firecrawl_api_key)
-    books = parse_books(html)
-    if not books:
+    if args.crawl:
+        run_crawl(args, settings)
+        return
+
+    if args.html_dir:
+        pages = list(read_html_pages(args.html_dir))
+    else:
+        if not settings.firecrawl_api_key:
+            raise ValueError("FIRECRAWL_API_KEY is not set.")
+        pages = [scrape_html(settings.firecrawl_api_key, URL_TO_SCRAPE)]
+        if args.save_html:
+            Path(args.save_html).parent.mkdir(parents=True, exist_ok=True)
+            Path(args.save_html).write_text(pages[0], encoding="utf-8")
+
+    batches = parse_pages(pages, backend=args.parser, processes=args.processes)
+    if not any(batch.num_rows for batch in batches):
         raise RuntimeError("No book records were parsed from the scraped HTML.")
 
-    write_duckdb(settings.duckdb_path, books)
-    logging.info("Wrote %d books to %s", len(books), settings.duckdb_path)
+    count = write_duckdb(settings.duckdb_path, batches)
+    logging.info("Wrote %d books to %s", count, settings.duckdb_path)
 
 
 if __name__ == "__main__":
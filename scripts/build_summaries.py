@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from sql_ai_agent.config import load_settings  # noqa: E402
+from sql_ai_agent.pipeline.qa_pipeline import build_summary_tables  # noqa: E402
+from sql_ai_agent.utils.logging import setup_logging  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Build summary tables for the most frequent aggregate queries.")
+    parser.add_argument("--summary-db", help="Sidecar DuckDB file for the summaries (default: SUMMARY_DB).")
+    args = parser.parse_args()
+
+    settings = load_settings()
+    setup_logging(json_format=settings.log_format == "json")
+    built = build_summary_tables(args.summary_db)
+    logging.info("Built %d summary table(s): %s", len(built), ", ".join(built) or "none")
+
+
+if __name__ == "__main__":
+    main()
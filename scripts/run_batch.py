@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+SRC_DIR = ROOT_DIR / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+from sql_ai_agent.config import load_settings  # noqa: E402
+from sql_ai_agent.pipeline.batch import run_batch  # noqa: E402
+from sql_ai_agent.utils.logging import setup_logging  # noqa: E402
+from sql_ai_agent.utils.tracing import start_metrics_server  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Answer a file of questions in one batch.")
+    parser.add_argument("input", help="JSONL or CSV file with a 'question' column (and optional 'id').")
+    parser.add_argument("output", help="Results file; '.parquet' writes Parquet, anything else JSONL.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Maximum questions in flight.")
+    parser.add_argument(
+        "--requests-per-minute",
+        type=float,
+        default=None,
+        help="Cap on LLM requests started per minute.",
+    )
+    args = parser.parse_args()
+
+    settings = load_settings()
+    setup_logging(json_format=settings.log_format == "json")
+    if settings.metrics_port:
+        start_metrics_server(settings.metrics_port)
+    report = run_batch(
+        args.input,
+        args.output,
+        concurrency=args.concurrency,
+        requests_per_minute=args.requests_per_minute,
+    )
+    for line in report.summary_lines():
+        logging.info(line)
+
+
+if __name__ == "__main__":
+    main()
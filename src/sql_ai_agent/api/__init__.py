@@ -0,0 +1 @@
+"""HTTP API over the question-to-answer pipeline."""
@@ -0,0 +1,396 @@
+from __future__ import annotations
+
+from dataclasses import asdict
+from typing import Any, AsyncIterator, Awaitable, Callable
+from urllib.parse import parse_qs
+import asyncio
+import json
+import logging
+import re
+
+import pyarrow as pa
+
+from sql_ai_agent.config import Settings, load_settings
+from sql_ai_agent.db.column_profiles import close_profile_stores, wait_for_profiling
+from sql_ai_agent.db.connection_pool import close_pools
+from sql_ai_agent.db.duckdb_client import QueryCancelledError, QueryTimeoutError
+from sql_ai_agent.db.result_cache import canonicalize_sql
+from sql_ai_agent.llm.sql_cache import close_sql_caches, fingerprint, normalize_question
+from sql_ai_agent.pipeline import qa_pipeline
+from sql_ai_agent.storage.saved_queries import (
+    close_stores,
+    count_queries,
+    delete_query,
+    get_query,
+    list_queries,
+    save_query,
+)
+from sql_ai_agent.utils.singleflight import SingleFlight
+from sql_ai_agent.utils.tracing import render_metrics
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+STREAM_BATCH_ROWS = 1000
+RESULT_FORMATS = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+_SAVED_QUERY_PATH = re.compile(r"^/saved-queries/(\d+)$")
+
+Send = Callable[[dict], Awaitable[None]]
+Receive = Callable[[], Awaitable[dict]]
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str, headers: dict[str, str] | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.headers = headers or {}
+
+
+class Overloaded(HTTPError):
+    def __init__(self) -> None:
+        super().__init__(503, "Server is busy, retry shortly.", {"Retry-After": "1"})
+
+
+class Limiter:
+    """Caps requests in flight and rejects new ones once ``max_queue`` are already waiting."""
+
+    def __init__(self, max_concurrency: int, max_queue: int) -> None:
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._max_queue = max_queue
+        self.waiting = 0
+
+    async def __aenter__(self) -> Limiter:
+        if self._semaphore.locked():
+            if self.waiting >= self._max_queue:
+                raise Overloaded()
+            self.waiting += 1
+            try:
+                await self._semaphore.acquire()
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._semaphore.release()
+
+
+def _json_bytes(payload: Any) -> bytes:
+    return json.dumps(payload, default=str).encode("utf-8")
+
+
+def _raw_headers(headers: dict[str, str] | None) -> list[tuple[bytes, bytes]]:
+    return [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in (headers or {}).items()]
+
+
+class _ChunkSink:
+    """File-like target for the Arrow IPC writer whose bytes are drained after each batch."""
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self.closed = False
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+async def _ndjson_chunks(table: pa.Table) -> AsyncIterator[bytes]:
+    for batch in table.to_batches(max_chunksize=STREAM_BATCH_ROWS):
+        yield b"".join(_json_bytes(row) + b"\n" for row in batch.to_pylist())
+
+
+async def _arrow_chunks(table: pa.Table) -> AsyncIterator[bytes]:
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=STREAM_BATCH_ROWS):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+class ApiApp:
+    """ASGI application serving the QA pipeline and saved queries over HTTP.
+
+    Blocking DuckDB and SQLite work runs on the pipeline's DuckDB worker pool, identical
+    questions or SQL in flight at the same time share one execution, and requests beyond
+    ``max_concurrency`` wait in a bounded queue before being rejected with 503.
+    Settings come from the environment, the same ones the pipeline loads per call.
+    """
+
+    def __init__(self) -> None:
+        self._limiter: Limiter | None = None
+        self.flight = SingleFlight("api", retry_on=(QueryCancelledError, QueryTimeoutError))
+
+    @property
+    def settings(self) -> Settings:
+        return load_settings()
+
+    def limiter(self) -> Limiter:
+        # Created on first use so it binds to the server's event loop.
+        if self._limiter is None:
+            settings = self.settings
+            self._limiter = Limiter(settings.api_max_concurrency, settings.api_max_queue)
+        return self._limiter
+
+    async def __call__(self, scope: dict, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        started = False
+
+        async def tracked_send(message: dict) -> None:
+            nonlocal started
+            started = started or message["type"] == "http.response.start"
+            await send(message)
+
+        try:
+            await self._dispatch(scope, receive, tracked_send)
+        except Exception as exc:
+            if started:
+                # A second http.response.start is a protocol error, so a stream that fails
+                # midway is closed as is; X-Total-Rows lets clients spot the short body.
+                logger.exception("API response failed after it started")
+                await send({"type": "http.response.body", "body": b""})
+            else:
+                await self._send_error(send, exc)
+
+    async def _send_error(self, send: Send, exc: Exception) -> None:
+        if isinstance(exc, HTTPError):
+            await self._send_json(send, exc.status, {"error": exc.message}, exc.headers)
+        elif isinstance(exc, QueryTimeoutError):
+            await self._send_json(send, 504, {"error": str(exc)})
+        elif isinstance(exc, ValueError):
+            await self._send_json(send, 400, {"error": str(exc)})
+        elif isinstance(exc, (FileNotFoundError, QueryCancelledError)):
+            await self._send_json(send, 503, {"error": str(exc)})
+        else:
+            logger.exception("Unhandled API error")
+            await self._send_json(send, 500, {"error": str(exc)})
+
+    async def _lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await qa_pipeline.run_blocking(wait_for_profiling)
+                close_pools()
+                close_stores()
+                close_profile_stores()
+                close_sql_caches()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _dispatch(self, scope: dict, receive: Receive, send: Send) -> None:
+        method, path = scope["method"], scope["path"].rstrip("/") or "/"
+        if method == "GET" and path == "/health":
+            await self._send_json(send, 200, {"status": "ok"})
+            return
+        if method == "GET" and path == "/metrics":
+            await self._send(send, 200, render_metrics().encode("utf-8"), "text/plain; version=0.0.4; charset=utf-8")
+            return
+
+        routes = {
+            ("POST", "/ask"): self._ask,
+            ("POST", "/sql/execute"): self._execute,
+            ("POST", "/sql/explain"): self._explain,
+            ("GET", "/saved-queries"): self._list_saved,
+            ("POST", "/saved-queries"): self._create_saved,
+        }
+        handler = routes.get((method, path))
+        args: tuple = ()
+        match = _SAVED_QUERY_PATH.match(path)
+        if handler is None and match is not None:
+            handler = {"GET": self._get_saved, "DELETE": self._delete_saved}.get(method)
+            args = (int(match.group(1)),)
+        if handler is None:
+            raise HTTPError(404, f"No route for {method} {path}.")
+
+        async with self.limiter():
+            await handler(scope, receive, send, *args)
+
+    async def _ask(self, scope: dict, receive: Receive, send: Send) -> None:
+        body = await self._read_json(receive)
+        question = str(body.get("question") or "").strip()
+        if not question:
+            raise ValueError("Question cannot be empty.")
+        explain = bool(body.get("explain", False))
+        key = f"ask:{explain}:{fingerprint(normalize_question(question))}"
+        payload = await self.flight.ado(key, lambda: self._answer(question, explain))
+        await self._send_json(send, 200, payload)
+
+    async def _answer(self, question: str, explain: bool) -> dict[str, Any]:
+        prepared = await qa_pipeline.aprepare_question(question)
+        if explain:
+            result, explanation = await asyncio.gather(
+                qa_pipeline.aexecute_sql_arrow(prepared["sql"]),
+                qa_pipeline.aexplain(prepared["sql"], prepared["schema_context"]),
+            )
+        else:
+            result, explanation = await qa_pipeline.aexecute_sql_arrow(prepared["sql"]), None
+        page = result.table.slice(0, self.settings.result_page_size)
+        payload = {
+            "sql": prepared["sql"],
+            "notes": prepared["notes"],
+            "suggestion": prepared["suggestion"],
+            "columns": page.column_names,
+            "rows": page.to_pylist(),
+            "total_rows": result.total_rows,
+            "truncated": result.total_rows > result.table.num_rows,
+        }
+        if explain:
+            payload["explanation"] = explanation
+        return payload
+
+    async def _execute(self, scope: dict, receive: Receive, send: Send) -> None:
+        body = await self._read_json(receive)
+        sql = str(body.get("sql") or "")
+        result_format = self._result_format(scope, body)
+        key = f"sql:{fingerprint(canonicalize_sql(sql))}"
+        result = await self.flight.ado(key, lambda: qa_pipeline.aexecute_sql_arrow(sql))
+        headers = {
+            "X-Total-Rows": str(result.total_rows),
+            "X-Truncated": "true" if result.total_rows > result.table.num_rows else "false",
+        }
+        if result_format == "json":
+            payload = {
+                "columns": result.table.column_names,
+                "rows": result.table.to_pylist(),
+                "total_rows": result.total_rows,
+            }
+            await self._send_json(send, 200, payload, headers)
+        elif result_format == "ndjson":
+            await self._stream(send, _ndjson_chunks(result.table), RESULT_FORMATS["ndjson"], headers)
+        else:
+            await self._stream(send, _arrow_chunks(result.table), RESULT_FORMATS["arrow"], headers)
+
+    async def _explain(self, scope: dict, receive: Receive, send: Send) -> None:
+        body = await self._read_json(receive)
+        sql = str(body.get("sql") or "")
+        if not sql.strip():
+            raise ValueError("SQL is empty.")
+        schema_context = body.get("schema_context")
+        if schema_context is None:
+            schema_context = await qa_pipeline.run_blocking(qa_pipeline.get_schema_context)
+        explanation = await qa_pipeline.aexplain(sql, str(schema_context))
+        await self._send_json(send, 200, {"explanation": explanation})
+
+    async def _list_saved(self, scope: dict, receive: Receive, send: Send) -> None:
+        params = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        search = (params.get("search") or [""])[0].strip() or None
+        limit = int((params.get("limit") or ["50"])[0])
+        offset = int((params.get("offset") or ["0"])[0])
+        if limit < 1 or offset < 0:
+            raise ValueError("limit must be positive and offset zero or positive.")
+        db_path = self.settings.saved_queries_db
+        items = await qa_pipeline.run_blocking(list_queries, db_path, search, limit, offset)
+        total = await qa_pipeline.run_blocking(count_queries, db_path, search)
+        await self._send_json(send, 200, {"items": [asdict(item) for item in items], "total": total})
+
+    async def _create_saved(self, scope: dict, receive: Receive, send: Send) -> None:
+        body = await self._read_json(receive)
+        fields = {name: str(body.get(name) or "").strip() for name in ("name", "question", "sql")}
+        missing = [name for name, value in fields.items() if not value]
+        if missing:
+            raise ValueError(f"Missing required field(s): {', '.join(missing)}.")
+        query_id = await qa_pipeline.run_blocking(
+            save_query,
+            self.settings.saved_queries_db,
+            fields["name"],
+            fields["question"],
+            fields["sql"],
+            body.get("tag") or None,
+            body.get("notes") or None,
+        )
+        await self._send_json(send, 201, {"id": query_id})
+
+    async def _get_saved(self, scope: dict, receive: Receive, send: Send, query_id: int) -> None:
+        item = await qa_pipeline.run_blocking(get_query, self.settings.saved_queries_db, query_id)
+        if item is None:
+            raise HTTPError(404, f"Saved query {query_id} not found.")
+        await self._send_json(send, 200, asdict(item))
+
+    async def _delete_saved(self, scope: dict, receive: Receive, send: Send, query_id: int) -> None:
+        deleted = await qa_pipeline.run_blocking(delete_query, self.settings.saved_queries_db, query_id)
+        if not deleted:
+            raise HTTPError(404, f"Saved query {query_id} not found.")
+        await self._send(send, 204, b"", None)
+
+    @staticmethod
+    def _result_format(scope: dict, body: dict) -> str:
+        result_format = body.get("format")
+        if result_format is None:
+            accept = dict(scope.get("headers") or []).get(b"accept", b"").decode("latin-1")
+            result_format = next((name for name, media in RESULT_FORMATS.items() if media in accept), "json")
+        if result_format not in RESULT_FORMATS:
+            raise ValueError(f"Unknown format '{result_format}'. Use one of: {', '.join(RESULT_FORMATS)}.")
+        return result_format
+
+    @staticmethod
+    async def _read_json(receive: Receive) -> dict:
+        chunks: list[bytes] = []
+        size = 0
+        while True:
+            message = await receive()
+            chunk = message.get("body", b"")
+            size += len(chunk)
+            if size > MAX_BODY_BYTES:
+                raise HTTPError(413, "Request body is too large.")
+            chunks.append(chunk)
+            if not message.get("more_body"):
+                break
+        body = json.loads(b"".join(chunks) or b"{}")
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object.")
+        return body
+
+    @staticmethod
+    async def _send(
+        send: Send, status: int, body: bytes, content_type: str | None, headers: dict | None = None
+    ) -> None:
+        raw_headers = [(b"content-length", str(len(body)).encode("latin-1"))]
+        if content_type:
+            raw_headers.append((b"content-type", content_type.encode("latin-1")))
+        raw_headers += _raw_headers(headers)
+        await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _send_json(self, send: Send, status: int, payload: Any, headers: dict | None = None) -> None:
+        await self._send(send, status, _json_bytes(payload), "application/json", headers)
+
+    @staticmethod
+    async def _stream(send: Send, chunks: AsyncIterator[bytes], content_type: str, headers: dict) -> None:
+        raw_headers = [(b"content-type", content_type.encode("latin-1")), *_raw_headers(headers)]
+        await send({"type": "http.response.start", "status": 200, "headers": raw_headers})
+        async for chunk in chunks:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+
+def create_app() -> ApiApp:
+    return ApiApp()
+
+
+app = create_app()
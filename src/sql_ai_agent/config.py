@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 import os
 
@@ -13,16 +14,121 @@ class Settings:
     duckdb_path: str
     firecrawl_api_key: str | None
     saved_queries_db: str
+    duckdb_pool_size: int = 4
+    sql_cache_db: str = str(Path("data") / "sql_cache.db")
+    sql_cache_max_entries: int = 5000
+    sql_cache_ttl_seconds: int = 7 * 24 * 3600
+    sql_cache_similarity_threshold: float = 0.0
+    openai_model: str = "gpt-4o-mini"
+    openai_base_url: str | None = None
+    openai_timeout_seconds: float = 30.0
+    openai_max_retries: int = 3
+    openai_max_connections: int = 20
+    max_result_rows: int = 10_000
+    result_page_size: int = 100
+    query_timeout_seconds: float = 30.0
+    duckdb_memory_limit: str | None = None
+    duckdb_threads: int = 0
+    result_cache_max_entries: int = 256
+    result_cache_max_bytes: int = 256 * 1024 * 1024
+    result_cache_spill_dir: str | None = None
+    result_cache_max_spill_bytes: int = 1024 * 1024 * 1024
+    schema_top_k: int = 8
+    schema_min_score: float = 1.0
+    schema_max_columns: int = 50
+    schema_profile_db: str | None = None
+    schema_profile_top_values: int = 5
+    sql_repair_attempts: int = 2
+    tracing_enabled: bool = False
+    metrics_port: int = 0
+    log_format: str = "text"
+    api_max_concurrency: int = 32
+    api_max_queue: int = 64
+    summary_db: str | None = None
+    summary_min_executions: int = 3
+    summary_max_tables: int = 20
+    summary_max_age_seconds: int = 3600
 
 
-def load_settings() -> Settings:
+@lru_cache(maxsize=1)
+def _load_env_file() -> None:
     load_dotenv()
 
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return int(value)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be an integer, got '{value}'.") from exc
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    try:
+        return float(value)
+    except ValueError as exc:
+        raise ValueError(f"{name} must be a number, got '{value}'.") from exc
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in {"1", "true", "yes", "on"}
+
+
+def load_settings() -> Settings:
+    _load_env_file()
+
     default_duckdb_path = str(Path("data") / "dados.duckdb")
     default_saved_queries_db = str(Path("data") / "saved_queries.db")
+    saved_queries_db = os.getenv("SAVED_QUERIES_DB", default_saved_queries_db)
+    default_sql_cache_db = str(Path(saved_queries_db).parent / "sql_cache.db")
+    sql_cache_db = os.getenv("SQL_CACHE_DB", default_sql_cache_db)
+    # An empty SCHEMA_PROFILE_DB turns column profiling off.
+    schema_profile_db = os.getenv("SCHEMA_PROFILE_DB", str(Path(sql_cache_db).parent / "schema_profiles.db"))
     return Settings(
         openai_api_key=os.getenv("OPENAI_API_KEY"),
         duckdb_path=os.getenv("DUCKDB_PATH", default_duckdb_path),
         firecrawl_api_key=os.getenv("FIRECRAWL_API_KEY"),
-        saved_queries_db=os.getenv("SAVED_QUERIES_DB", default_saved_queries_db),
+        saved_queries_db=saved_queries_db,
+        duckdb_pool_size=max(1, _env_int("DUCKDB_POOL_SIZE", 4)),
+        sql_cache_db=sql_cache_db,
+        sql_cache_max_entries=max(1, _env_int("SQL_CACHE_MAX_ENTRIES", 5000)),
+        sql_cache_ttl_seconds=max(0, _env_int("SQL_CACHE_TTL_SECONDS", 7 * 24 * 3600)),
+        sql_cache_similarity_threshold=_env_float("SQL_CACHE_SIMILARITY_THRESHOLD", 0.0),
+        openai_model=os.getenv("OPENAI_MODEL") or "gpt-4o-mini",
+        openai_base_url=os.getenv("OPENAI_BASE_URL") or None,
+        openai_timeout_seconds=_env_float("OPENAI_TIMEOUT_SECONDS", 30.0),
+        openai_max_retries=max(0, _env_int("OPENAI_MAX_RETRIES", 3)),
+        openai_max_connections=max(1, _env_int("OPENAI_MAX_CONNECTIONS", 20)),
+        max_result_rows=max(1, _env_int("MAX_RESULT_ROWS", 10_000)),
+        result_page_size=max(1, _env_int("RESULT_PAGE_SIZE", 100)),
+        query_timeout_seconds=max(0.0, _env_float("QUERY_TIMEOUT_SECONDS", 30.0)),
+        duckdb_memory_limit=os.getenv("DUCKDB_MEMORY_LIMIT") or None,
+        duckdb_threads=max(0, _env_int("DUCKDB_THREADS", 0)),
+        result_cache_max_entries=max(0, _env_int("RESULT_CACHE_MAX_ENTRIES", 256)),
+        result_cache_max_bytes=max(0, _env_int("RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024)),
+        result_cache_spill_dir=os.getenv("RESULT_CACHE_SPILL_DIR") or None,
+        result_cache_max_spill_bytes=max(0, _env_int("RESULT_CACHE_MAX_SPILL_BYTES", 1024 * 1024 * 1024)),
+        schema_top_k=max(0, _env_int("SCHEMA_TOP_K", 8)),
+        schema_min_score=_env_float("SCHEMA_MIN_SCORE", 1.0),
+        schema_max_columns=max(1, _env_int("SCHEMA_MAX_COLUMNS", 50)),
+        schema_profile_db=schema_profile_db or None,
+        schema_profile_top_values=max(0, _env_int("SCHEMA_PROFILE_TOP_VALUES", 5)),
+        sql_repair_attempts=max(0, _env_int("SQL_REPAIR_ATTEMPTS", 2)),
+        tracing_enabled=_env_flag("TRACING_ENABLED"),
+        metrics_port=max(0, _env_int("METRICS_PORT", 0)),
+        log_format=(os.getenv("LOG_FORMAT") or "text").strip().lower(),
+        api_max_concurrency=max(1, _env_int("API_MAX_CONCURRENCY", 32)),
+        api_max_queue=max(0, _env_int("API_MAX_QUEUE", 64)),
+        summary_db=os.getenv("SUMMARY_DB") or None,
+        summary_min_executions=max(1, _env_int("SUMMARY_MIN_EXECUTIONS", 3)),
+        summary_max_tables=max(0, _env_int("SUMMARY_MAX_TABLES", 20)),
+        summary_max_age_seconds=max(0, _env_int("SUMMARY_MAX_AGE_SECONDS", 3600)),
     )
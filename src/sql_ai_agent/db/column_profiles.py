@@ -0,0 +1,311 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import json
+import logging
+import re
+import sqlite3
+import threading
+import time
+
+from sql_ai_agent.db.duckdb_client import DuckDBClient
+from sql_ai_agent.db.schema_catalog import SchemaCatalog, TableInfo
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS table_profiles (
+    db_path TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    row_count INTEGER NOT NULL,
+    profiled_at REAL NOT NULL,
+    PRIMARY KEY (db_path, table_name)
+);
+CREATE TABLE IF NOT EXISTS column_profiles (
+    db_path TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    column_name TEXT NOT NULL,
+    distinct_count INTEGER,
+    min_value TEXT,
+    max_value TEXT,
+    null_fraction REAL NOT NULL,
+    top_values TEXT NOT NULL,
+    PRIMARY KEY (db_path, table_name, column_name)
+);
+"""
+
+# The storage layout (row groups, segments, blocks and their zone-map stats) changes
+# whenever a table's data is rewritten, and reading it does not scan any data.
+_STORAGE_SQL = """
+SELECT row_group_id, column_id, segment_id, count, block_id, block_offset, has_updates, stats
+FROM pragma_storage_info(?)
+ORDER BY row_group_id, column_id, segment_id
+"""
+
+_RANGE_TYPES = re.compile(
+    r"^(U?(TINY|SMALL|BIG|HUGE)?INT(EGER)?|FLOAT|DOUBLE|REAL|DECIMAL|NUMERIC|DATE|TIME|TIMESTAMP)",
+    re.IGNORECASE,
+)
+_TEXT_TYPES = re.compile(r"^(VARCHAR|TEXT|STRING|CHAR|ENUM|BOOLEAN)", re.IGNORECASE)
+_NESTED_TYPE = re.compile(r"\[|^(STRUCT|MAP|UNION|BLOB|BIT)", re.IGNORECASE)
+_MAX_VALUE_LENGTH = 40
+_CATEGORICAL_DISTINCT = 50
+
+
+@dataclass(frozen=True)
+class ColumnProfile:
+    name: str
+    distinct_count: int | None
+    min_value: str | None
+    max_value: str | None
+    null_fraction: float
+    top_values: tuple[str, ...] = ()
+
+    def describe(self) -> str:
+        if self.null_fraction >= 1.0:
+            return "all null"
+        parts = []
+        if self.distinct_count is not None:
+            parts.append(f"~{self.distinct_count} distinct")
+        if self.min_value is not None and self.max_value is not None:
+            parts.append(f"{self.min_value}..{self.max_value}")
+        if self.null_fraction > 0:
+            parts.append(f"{self.null_fraction:.0%} null")
+        if self.top_values:
+            parts.append("values " + ", ".join(f"'{value}'" for value in self.top_values))
+        return ", ".join(parts)
+
+
+@dataclass(frozen=True)
+class TableProfile:
+    name: str
+    fingerprint: str
+    row_count: int
+    columns: tuple[ColumnProfile, ...]
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _clip(value: object) -> str | None:
+    if value is None:
+        return None
+    text = str(value)
+    return text if len(text) <= _MAX_VALUE_LENGTH else text[: _MAX_VALUE_LENGTH - 3] + "..."
+
+
+def table_fingerprint(db: DuckDBClient, table: TableInfo) -> str:
+    digest = hashlib.sha256()
+    for column in table.columns:
+        digest.update(f"{column.name}\0{column.type}\0".encode("utf-8"))
+    for row in db.fetch_rows(_STORAGE_SQL, [table.name]):
+        digest.update(repr(row).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def profile_table(db: DuckDBClient, table: TableInfo, fingerprint: str, top_k: int = 5) -> TableProfile:
+    selects = ["count(*)"]
+    for column in table.columns:
+        name = _quote(column.name)
+        nested = bool(_NESTED_TYPE.search(column.type))
+        selects.append(f"count({name})")
+        selects.append("NULL" if nested else f"approx_count_distinct({name})")
+        if _RANGE_TYPES.match(column.type) and not nested:
+            selects.append(f"min({name})::VARCHAR")
+            selects.append(f"max({name})::VARCHAR")
+        else:
+            selects.extend(["NULL", "NULL"])
+        if top_k and _TEXT_TYPES.match(column.type) and not nested:
+            selects.append(f"approx_top_k({name}::VARCHAR, {int(top_k)})")
+        else:
+            selects.append("NULL")
+    row = db.fetch_rows(f"SELECT {', '.join(selects)} FROM {_quote(table.name)}")[0]
+
+    row_count = row[0]
+    columns = []
+    for index, column in enumerate(table.columns):
+        non_null, distinct, min_value, max_value, top_values = row[1 + index * 5 : 6 + index * 5]
+        if distinct is not None:
+            distinct = min(distinct, non_null)
+        # Frequent values only help the model for categorical columns.
+        if top_values is None or distinct is None or distinct > _CATEGORICAL_DISTINCT:
+            top_values = []
+        columns.append(
+            ColumnProfile(
+                name=column.name,
+                distinct_count=distinct,
+                min_value=_clip(min_value),
+                max_value=_clip(max_value),
+                null_fraction=1 - non_null / row_count if row_count else 0.0,
+                top_values=tuple(_clip(value) for value in top_values if value is not None),
+            )
+        )
+    return TableProfile(table.name, fingerprint, row_count, tuple(columns))
+
+
+class ProfileStore:
+    """SQLite sidecar holding column profiles per database file and table.
+
+    All access goes through one long-lived connection serialized by the store lock.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._lock = threading.Lock()
+        self._loaded: dict[str, dict[str, TableProfile]] = {}
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._con = sqlite3.connect(path, check_same_thread=False)
+        self._con.executescript(_SCHEMA)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def load(self, db_path: str) -> dict[str, TableProfile]:
+        with self._lock:
+            profiles = self._loaded.get(db_path)
+            if profiles is None:
+                profiles = self._read(db_path)
+                self._loaded[db_path] = profiles
+            return profiles
+
+    def _read(self, db_path: str) -> dict[str, TableProfile]:
+        columns: dict[str, list[ColumnProfile]] = {}
+        # Called with the store lock held.
+        with self._con as con:
+            tables = con.execute(
+                "SELECT table_name, fingerprint, row_count FROM table_profiles WHERE db_path = ?",
+                (db_path,),
+            ).fetchall()
+            rows = con.execute(
+                """
+                SELECT table_name, column_name, distinct_count, min_value, max_value, null_fraction, top_values
+                FROM column_profiles WHERE db_path = ?
+                """,
+                (db_path,),
+            ).fetchall()
+        for table_name, name, distinct, min_value, max_value, null_fraction, top_values in rows:
+            columns.setdefault(table_name, []).append(
+                ColumnProfile(name, distinct, min_value, max_value, null_fraction, tuple(json.loads(top_values)))
+            )
+        return {
+            name: TableProfile(name, fingerprint, row_count, tuple(columns.get(name, [])))
+            for name, fingerprint, row_count in tables
+        }
+
+    def save(self, db_path: str, profile: TableProfile) -> None:
+        with self._lock, self._con as con:
+            con.execute("DELETE FROM column_profiles WHERE db_path = ? AND table_name = ?", (db_path, profile.name))
+            con.execute(
+                "INSERT OR REPLACE INTO table_profiles VALUES (?, ?, ?, ?, ?)",
+                (db_path, profile.name, profile.fingerprint, profile.row_count, time.time()),
+            )
+            con.executemany(
+                "INSERT INTO column_profiles VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (
+                        db_path,
+                        profile.name,
+                        column.name,
+                        column.distinct_count,
+                        column.min_value,
+                        column.max_value,
+                        column.null_fraction,
+                        json.dumps(list(column.top_values)),
+                    )
+                    for column in profile.columns
+                ],
+            )
+            self._loaded.pop(db_path, None)
+
+    def remove_missing(self, db_path: str, table_names: set[str]) -> None:
+        with self._lock, self._con as con:
+            stored = [row[0] for row in con.execute("SELECT table_name FROM table_profiles WHERE db_path = ?", (db_path,))]
+            for name in stored:
+                if name not in table_names:
+                    con.execute("DELETE FROM table_profiles WHERE db_path = ? AND table_name = ?", (db_path, name))
+                    con.execute("DELETE FROM column_profiles WHERE db_path = ? AND table_name = ?", (db_path, name))
+            self._loaded.pop(db_path, None)
+
+    def close(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+def refresh_profiles(db: DuckDBClient, catalog: SchemaCatalog, store: ProfileStore, top_k: int = 5) -> list[str]:
+    """Profile tables whose storage changed since the stored profile; return their names."""
+    stored = store.load(db.db_path)
+    refreshed = []
+    for table in catalog.tables:
+        try:
+            fingerprint = table_fingerprint(db, table)
+            previous = stored.get(table.name)
+            if previous is not None and previous.fingerprint == fingerprint:
+                continue
+            store.save(db.db_path, profile_table(db, table, fingerprint, top_k))
+        except Exception as exc:
+            logger.warning("Could not profile table %s: %s", table.name, exc)
+            continue
+        refreshed.append(table.name)
+    store.remove_missing(db.db_path, set(catalog.table_names()))
+    if refreshed:
+        logger.info("Profiled %d table(s) in %s", len(refreshed), db.db_path)
+    return refreshed
+
+
+def profile_annotations(profiles: dict[str, TableProfile]) -> dict[tuple[str, str | None], str]:
+    annotations: dict[tuple[str, str | None], str] = {}
+    for table in profiles.values():
+        annotations[(table.name, None)] = f"{table.row_count} rows"
+        for column in table.columns:
+            description = column.describe()
+            if description:
+                annotations[(table.name, column.name)] = description
+    return annotations
+
+
+_STORES: dict[str, ProfileStore] = {}
+_STORES_LOCK = threading.Lock()
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="profiler")
+_SCHEDULED: dict[tuple[str, str], tuple[object, Future]] = {}
+
+
+def get_profile_store(path: str) -> ProfileStore:
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            store = ProfileStore(path)
+            _STORES[path] = store
+        return store
+
+
+def close_profile_stores() -> None:
+    """Close every registered store; a later ``get_profile_store`` opens a fresh one."""
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+        _STORES.clear()
+    for store in stores:
+        store.close()
+
+
+def schedule_profiling(db: DuckDBClient, catalog: SchemaCatalog, store: ProfileStore, top_k: int = 5) -> Future:
+    """Refresh profiles in the background once per database version."""
+    key = (db.db_path, store.path)
+    with _STORES_LOCK:
+        scheduled = _SCHEDULED.get(key)
+        if scheduled is not None and scheduled[0] == catalog.signature:
+            return scheduled[1]
+        future = _EXECUTOR.submit(refresh_profiles, db, catalog, store, top_k)
+        _SCHEDULED[key] = (catalog.signature, future)
+        return future
+
+
+def wait_for_profiling(timeout: float | None = None) -> None:
+    with _STORES_LOCK:
+        futures = [future for _, future in _SCHEDULED.values()]
+    wait(futures, timeout=timeout)
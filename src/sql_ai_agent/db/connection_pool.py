@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+import os
+import threading
+import time
+
+import duckdb
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    size: int
+    idle: int
+    in_use: int
+    checkouts: int
+    total_wait_seconds: float
+    max_wait_seconds: float
+    reopens: int
+
+
+def file_signature(db_path: str) -> tuple[int, int] | None:
+    try:
+        stat = os.stat(db_path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ConnectionPool:
+    """Long-lived read-only DuckDB connection shared through a bounded set of cursors.
+
+    DuckDB caches database instances per path inside the process, so a changed file is
+    only picked up once every cursor of the old instance is closed. When the file
+    signature changes, new checkouts wait for in-flight cursors to drain and the pool
+    then reopens the database.
+    """
+
+    def __init__(self, db_path: str, size: int = 4, config: dict[str, Any] | None = None) -> None:
+        if size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self._db_path = db_path
+        self._size = size
+        self._config = dict(config or {})
+        self._cond = threading.Condition()
+        self._root: duckdb.DuckDBPyConnection | None = None
+        self._signature: tuple[int, int] | None = None
+        self._idle: list[duckdb.DuckDBPyConnection] = []
+        self._in_use = 0
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._reopens = 0
+        self._closed = False
+
+    @property
+    def db_path(self) -> str:
+        return self._db_path
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def config(self) -> dict[str, Any]:
+        return dict(self._config)
+
+    def _open_locked(self) -> None:
+        self._signature = file_signature(self._db_path)
+        self._root = duckdb.connect(database=self._db_path, read_only=True, config=self._config)
+
+    def _close_locked(self) -> None:
+        for cursor in self._idle:
+            cursor.close()
+        self._idle.clear()
+        if self._root is not None:
+            self._root.close()
+            self._root = None
+
+    def _is_stale_locked(self) -> bool:
+        return self._root is not None and file_signature(self._db_path) != self._signature
+
+    def _acquire_locked(self) -> duckdb.DuckDBPyConnection | None:
+        if self._is_stale_locked():
+            if self._in_use:
+                return None
+            self._close_locked()
+            self._reopens += 1
+        if self._root is None:
+            self._open_locked()
+        if self._idle:
+            return self._idle.pop()
+        if self._in_use < self._size:
+            return self._root.cursor()
+        return None
+
+    def acquire(self) -> duckdb.DuckDBPyConnection:
+        started = time.perf_counter()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Connection pool is closed.")
+            cursor = self._acquire_locked()
+            while cursor is None:
+                self._cond.wait()
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                cursor = self._acquire_locked()
+            self._in_use += 1
+            waited = time.perf_counter() - started
+            self._checkouts += 1
+            self._total_wait += waited
+            self._max_wait = max(self._max_wait, waited)
+            return cursor
+
+    def release(self, cursor: duckdb.DuckDBPyConnection) -> None:
+        with self._cond:
+            self._in_use -= 1
+            if self._closed or self._root is None:
+                cursor.close()
+            else:
+                self._idle.append(cursor)
+            self._cond.notify_all()
+
+    @contextmanager
+    def connection(self) -> Iterator[duckdb.DuckDBPyConnection]:
+        cursor = self.acquire()
+        try:
+            yield cursor
+        finally:
+            self.release(cursor)
+
+    def stats(self) -> PoolStats:
+        with self._cond:
+            return PoolStats(
+                size=self._size,
+                idle=len(self._idle),
+                in_use=self._in_use,
+                checkouts=self._checkouts,
+                total_wait_seconds=self._total_wait,
+                max_wait_seconds=self._max_wait,
+                reopens=self._reopens,
+            )
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._close_locked()
+            self._cond.notify_all()
+
+
+_POOLS: dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def _pool_key(db_path: str) -> str:
+    if db_path == ":memory:":
+        return db_path
+    return str(Path(db_path).resolve())
+
+
+def get_pool(db_path: str, size: int = 4, config: dict[str, Any] | None = None) -> ConnectionPool:
+    key = _pool_key(db_path)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path, size=size, config=config)
+            _POOLS[key] = pool
+        elif pool.size != size or pool.config != dict(config or {}):
+            # DuckDB keeps one database instance per file, so a second pool could not apply
+            # different settings anyway; refuse instead of silently handing out the first one.
+            raise ValueError(
+                f"Connection pool for '{db_path}' is already open with size={pool.size}, "
+                f"config={pool.config}; requested size={size}, config={dict(config or {})}."
+            )
+        return pool
+
+
+def close_pools() -> None:
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+    for pool in pools:
+        pool.close()
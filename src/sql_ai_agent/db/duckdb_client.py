@@ -1,24 +1,236 @@
 from __future__ import annotations
 
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Iterator, List, Sequence, TypeVar
+import math
+import threading
 
 import duckdb
 import pandas as pd
 
+from sql_ai_agent.config import load_settings
+from sql_ai_agent.db.connection_pool import ConnectionPool, PoolStats, get_pool
+from sql_ai_agent.utils.tracing import span
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+T = TypeVar("T")
+
+
+class QueryTimeoutError(TimeoutError):
+    pass
+
+
+class QueryCancelledError(RuntimeError):
+    pass
+
+
+class CancelScope:
+    """Lets another thread interrupt the statement currently running for a caller."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._connection: duckdb.DuckDBPyConnection | None = None
+        self._cancelled = False
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            if self._connection is not None:
+                self._connection.interrupt()
+
+    def _attach(self, connection: duckdb.DuckDBPyConnection) -> None:
+        with self._lock:
+            if self._cancelled:
+                raise QueryCancelledError("Query was cancelled.")
+            self._connection = connection
+
+    def _detach(self) -> None:
+        with self._lock:
+            self._connection = None
+
+
+_QUERY_EXECUTOR: ThreadPoolExecutor | None = None
+_QUERY_EXECUTOR_LOCK = threading.Lock()
+# Workers per pooled connection: the extra ones cover statements still unwinding from an interrupt.
+_WORKERS_PER_CONNECTION = 2
+# How long a timed-out caller waits for the interrupt to land before giving up on the worker.
+CANCEL_GRACE_SECONDS = 1.0
+
+
+def _get_query_executor() -> ThreadPoolExecutor:
+    global _QUERY_EXECUTOR
+    with _QUERY_EXECUTOR_LOCK:
+        if _QUERY_EXECUTOR is None:
+            workers = load_settings().duckdb_pool_size * _WORKERS_PER_CONNECTION
+            _QUERY_EXECUTOR = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="duckdb-query")
+        return _QUERY_EXECUTOR
+
+
+@dataclass(frozen=True)
+class QueryResult:
+    df: pd.DataFrame
+    total_rows: int
+    row_cap: int
+    page: int
+    page_size: int
+
+    @property
+    def truncated(self) -> bool:
+        return self.total_rows > self.row_cap
+
+    @property
+    def available_rows(self) -> int:
+        return min(self.total_rows, self.row_cap)
+
+    @property
+    def page_count(self) -> int:
+        return max(1, math.ceil(self.available_rows / self.page_size))
+
+    @property
+    def first_row(self) -> int:
+        return self.page * self.page_size
+
+
+def wrap_query(sql: str) -> str:
+    # The newline keeps a trailing "-- comment" from swallowing the closing parenthesis.
+    body = sql.strip().rstrip(";").strip()
+    return f"SELECT * FROM (\n{body}\n) AS _result"
+
 
 class DuckDBClient:
-    def __init__(self, db_path: str) -> None:
+    def __init__(
+        self,
+        db_path: str,
+        pool_size: int = 4,
+        config: dict[str, Any] | None = None,
+    ) -> None:
         self._db_path = db_path
+        self._pool: ConnectionPool = get_pool(db_path, size=pool_size, config=config)
+
+    @property
+    def db_path(self) -> str:
+        return self._db_path
 
     def query(self, sql: str) -> pd.DataFrame:
-        with duckdb.connect(database=self._db_path, read_only=True) as con:
+        with self._pool.connection() as con:
             return con.execute(sql).df()
 
+    def _run_on_connection(self, func: Callable[[duckdb.DuckDBPyConnection], T], scope: CancelScope) -> T:
+        with self._pool.connection() as con:
+            scope._attach(con)
+            try:
+                return func(con)
+            finally:
+                scope._detach()
+
+    def run(
+        self,
+        func: Callable[[duckdb.DuckDBPyConnection], T],
+        timeout: float | None = None,
+        scope: CancelScope | None = None,
+    ) -> T:
+        if timeout is None and scope is None:
+            with self._pool.connection() as con:
+                return func(con)
+
+        # The statement runs on a worker thread so the caller can interrupt it when
+        # the deadline passes or another thread cancels the scope.
+        scope = scope or CancelScope()
+        future = _get_query_executor().submit(self._run_on_connection, func, scope)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            scope.cancel()
+            # A job still queued never starts; a running one gets a short grace period to
+            # stop, since the interrupt may not land (e.g. during a pandas conversion).
+            future.cancel()
+            wait([future], timeout=CANCEL_GRACE_SECONDS)
+            raise QueryTimeoutError(f"Query exceeded the {timeout:g}s execution budget.") from None
+        except duckdb.InterruptException as exc:
+            raise QueryCancelledError("Query was cancelled.") from exc
+
+    def count_rows(self, sql: str, timeout: float | None = None, scope: CancelScope | None = None) -> int:
+        count_sql = f"SELECT COUNT(*) FROM ({wrap_query(sql)})"
+        with span("duckdb.count_rows"):
+            return int(self.run(lambda con: con.execute(count_sql).fetchone()[0], timeout, scope))
+
+    def query_page(
+        self,
+        sql: str,
+        limit: int,
+        offset: int = 0,
+        timeout: float | None = None,
+        scope: CancelScope | None = None,
+    ) -> pd.DataFrame:
+        page_sql = f"{wrap_query(sql)} LIMIT ? OFFSET ?"
+        with span("duckdb.query_page") as trace:
+            df = self.run(lambda con: con.execute(page_sql, [limit, offset]).df(), timeout, scope)
+            trace.record_rows(len(df))
+        return df
+
+    def query_arrow(
+        self,
+        sql: str,
+        limit: int,
+        timeout: float | None = None,
+        scope: CancelScope | None = None,
+    ) -> "pa.Table":
+        page_sql = f"{wrap_query(sql)} LIMIT ?"
+        with span("duckdb.query_arrow") as trace:
+            table = self.run(lambda con: con.execute(page_sql, [limit]).arrow(), timeout, scope)
+            trace.record_rows(table.num_rows)
+        return table
+
+    def arrow_to_df(self, table: "pa.Table") -> pd.DataFrame:
+        # Converting through DuckDB keeps the same pandas dtypes as .df() (e.g. DECIMAL -> float64).
+        with self._pool.connection() as con:
+            return con.from_arrow(table).df()
+
+    def iter_batches(self, sql: str, batch_size: int = 10_000) -> Iterator["pa.RecordBatch"]:
+        """Yield ``sql`` in Arrow batches on one pooled cursor.
+
+        The cursor stays checked out until the iterator is exhausted or closed, so callers
+        that may stop early should wrap it in ``contextlib.closing``.
+        """
+        con = self._pool.acquire()
+        try:
+            reader = con.execute(sql).fetch_record_batch(batch_size)
+            try:
+                yield from reader
+            finally:
+                reader.close()
+        finally:
+            self._pool.release(con)
+
+    def fetch_rows(self, sql: str, params: Sequence[Any] | None = None) -> list[tuple]:
+        with self._pool.connection() as con:
+            return con.execute(sql, params).fetchall()
+
+    def explain_error(self, sql: str) -> str | None:
+        """Plan the query without running it and return the binder/parser error, if any."""
+        try:
+            with span("duckdb.explain"), self._pool.connection() as con:
+                con.execute(f"EXPLAIN {wrap_query(sql)}")
+        except duckdb.Error as exc:
+            return str(exc)
+        return None
+
     def list_tables(self) -> List[str]:
-        with duckdb.connect(database=self._db_path, read_only=True) as con:
+        with self._pool.connection() as con:
             rows = con.execute("SHOW TABLES").fetchall()
         return [row[0] for row in rows]
 
     def describe_table(self, table: str) -> pd.DataFrame:
-        with duckdb.connect(database=self._db_path, read_only=True) as con:
+        with self._pool.connection() as con:
             return con.execute(f"PRAGMA table_info('{table}')").df()
+
+    def pool_stats(self) -> PoolStats:
+        return self._pool.stats()
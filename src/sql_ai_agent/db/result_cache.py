@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+import hashlib
+import logging
+import re
+import threading
+
+from sql_ai_agent.safety.sql_safety import OPAQUE_PATTERN
+
+if TYPE_CHECKING:
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def canonicalize_sql(sql: str) -> str:
+    # Literals and quoted identifiers (including E'' and dollar-quoted strings) are kept
+    # verbatim; comments are dropped, since a line comment can end mid-expression and
+    # whitespace collapsing would otherwise change what it covers.
+    parts: list[str] = []
+    code: list[str] = []
+    last = 0
+    for match in OPAQUE_PATTERN.finditer(sql):
+        code.append(sql[last : match.start()])
+        token = match.group(0)
+        if token.startswith(("--", "/*")):
+            code.append(" ")
+        else:
+            parts += [_WHITESPACE.sub(" ", "".join(code)), token]
+            code = []
+        last = match.end()
+    code.append(sql[last:])
+    parts.append(_WHITESPACE.sub(" ", "".join(code)))
+    return "".join(parts).strip().rstrip(";").strip()
+
+
+def result_key(sql: str, db_path: str, signature: object, row_cap: int) -> str:
+    text = f"{db_path}|{signature}|{row_cap}|{canonicalize_sql(sql)}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass(frozen=True)
+class CachedResult:
+    table: "pa.Table"
+    total_rows: int
+
+
+@dataclass(frozen=True)
+class ResultCacheStats:
+    hits: int
+    misses: int
+    evictions: int
+    spilled: int
+    entries: int
+    bytes: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+@dataclass
+class _Entry:
+    db_path: str
+    signature: object
+    total_rows: int
+    nbytes: int
+    table: "pa.Table | None" = None
+    spill_path: Path | None = None
+
+
+class ResultCache:
+    """LRU cache of executed query results held as Arrow tables.
+
+    Size is bounded by entry count and bytes. With a ``spill_dir``, entries evicted from
+    memory are written to Parquet and kept until the disk budget is used up. Entries for a
+    database are dropped as soon as a different file signature is seen for it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 256,
+        max_bytes: int = 256 * 1024 * 1024,
+        spill_dir: str | None = None,
+        max_spill_bytes: int = 1024 * 1024 * 1024,
+    ) -> None:
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._spill_dir = Path(spill_dir) if spill_dir else None
+        self._max_spill_bytes = max_spill_bytes
+        self._memory: OrderedDict[str, _Entry] = OrderedDict()
+        self._disk: OrderedDict[str, _Entry] = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_bytes = 0
+        self._signatures: dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._spilled = 0
+        if self._spill_dir is not None:
+            self._spill_dir.mkdir(parents=True, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self._max_entries > 0 and self._max_bytes > 0
+
+    def _invalidate_locked(self, db_path: str, signature: object) -> None:
+        if self._signatures.get(db_path, signature) != signature:
+            for store in (self._memory, self._disk):
+                for key in [key for key, entry in store.items() if entry.db_path == db_path]:
+                    self._drop_locked(store, key)
+        self._signatures[db_path] = signature
+
+    def _drop_locked(self, store: OrderedDict[str, _Entry], key: str) -> _Entry:
+        entry = store.pop(key)
+        if store is self._memory:
+            self._memory_bytes -= entry.nbytes
+        else:
+            self._disk_bytes -= entry.nbytes
+            if entry.spill_path is not None:
+                entry.spill_path.unlink(missing_ok=True)
+        return entry
+
+    def get(self, key: str, db_path: str, signature: object) -> CachedResult | None:
+        if not self.enabled:
+            return None
+        with self._lock:
+            self._invalidate_locked(db_path, signature)
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self._hits += 1
+                return CachedResult(entry.table, entry.total_rows)
+            entry = self._disk.get(key)
+            if entry is None:
+                self._misses += 1
+                return None
+            self._disk.move_to_end(key)
+            spill_path = entry.spill_path
+        try:
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(spill_path)
+        except (OSError, ValueError) as exc:
+            logger.warning("Failed to read spilled result %s: %s", spill_path, exc)
+            with self._lock:
+                if key in self._disk:
+                    self._drop_locked(self._disk, key)
+                self._misses += 1
+            return None
+        with self._lock:
+            self._hits += 1
+        return CachedResult(table, entry.total_rows)
+
+    def put(self, key: str, db_path: str, signature: object, result: CachedResult) -> None:
+        if not self.enabled:
+            return
+        nbytes = int(result.table.nbytes)
+        if nbytes > self._max_bytes:
+            return
+        spills: list[tuple[str, _Entry]] = []
+        with self._lock:
+            self._invalidate_locked(db_path, signature)
+            for store in (self._memory, self._disk):
+                if key in store:
+                    self._drop_locked(store, key)
+            self._memory[key] = _Entry(db_path, signature, result.total_rows, nbytes, table=result.table)
+            self._memory_bytes += nbytes
+            while len(self._memory) > self._max_entries or self._memory_bytes > self._max_bytes:
+                old_key, entry = next(iter(self._memory.items()))
+                self._drop_locked(self._memory, old_key)
+                self._evictions += 1
+                if self._spill_dir is not None and entry.nbytes <= self._max_spill_bytes:
+                    spills.append((old_key, entry))
+        for old_key, entry in spills:
+            self._spill(old_key, entry)
+
+    def _spill(self, key: str, entry: _Entry) -> None:
+        import pyarrow.parquet as pq
+
+        path = self._spill_dir / f"{key}.parquet"
+        try:
+            pq.write_table(entry.table, path)
+        except OSError as exc:
+            logger.warning("Failed to spill result to %s: %s", path, exc)
+            return
+        with self._lock:
+            if self._signatures.get(entry.db_path) != entry.signature:
+                path.unlink(missing_ok=True)
+                return
+            self._disk[key] = _Entry(entry.db_path, entry.signature, entry.total_rows, entry.nbytes, spill_path=path)
+            self._disk_bytes += entry.nbytes
+            self._spilled += 1
+            while self._disk_bytes > self._max_spill_bytes:
+                self._drop_locked(self._disk, next(iter(self._disk)))
+                self._evictions += 1
+
+    def stats(self) -> ResultCacheStats:
+        with self._lock:
+            return ResultCacheStats(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                spilled=self._spilled,
+                entries=len(self._memory) + len(self._disk),
+                bytes=self._memory_bytes,
+            )
+
+    def clear(self) -> None:
+        with self._lock:
+            for store in (self._memory, self._disk):
+                for key in list(store):
+                    self._drop_locked(store, key)
+
+
+_CACHES: dict[tuple, ResultCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_result_cache(
+    max_entries: int = 256,
+    max_bytes: int = 256 * 1024 * 1024,
+    spill_dir: str | None = None,
+    max_spill_bytes: int = 1024 * 1024 * 1024,
+) -> ResultCache:
+    key = (max_entries, max_bytes, spill_dir, max_spill_bytes)
+    with _CACHES_LOCK:
+        cache = _CACHES.get(key)
+        if cache is None:
+            cache = ResultCache(max_entries, max_bytes, spill_dir, max_spill_bytes)
+            _CACHES[key] = cache
+        return cache
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Iterable, Mapping
+import threading
+
+from sql_ai_agent.db.connection_pool import file_signature
+from sql_ai_agent.db.duckdb_client import DuckDBClient
+
+_COLUMNS_SQL = """
+SELECT c.table_name, c.column_name, c.data_type, c.column_comment, t.table_comment
+FROM information_schema.columns AS c
+JOIN information_schema.tables AS t USING (table_catalog, table_schema, table_name)
+WHERE c.table_catalog = current_database() AND c.table_schema = current_schema()
+ORDER BY c.table_name, c.ordinal_position
+"""
+
+
+@dataclass(frozen=True)
+class ColumnInfo:
+    name: str
+    type: str
+    comment: str | None = None
+
+
+@dataclass(frozen=True)
+class TableInfo:
+    name: str
+    columns: tuple[ColumnInfo, ...]
+    comment: str | None = None
+
+
+@dataclass(frozen=True)
+class SchemaCatalog:
+    tables: tuple[TableInfo, ...]
+    signature: tuple[int, int] | None
+
+    def table_names(self) -> list[str]:
+        return [table.name for table in self.tables]
+
+    def render(self, annotations: Mapping[tuple[str, str | None], str] | None = None) -> str:
+        return render_tables(self.tables, annotations)
+
+
+def render_tables(
+    tables: Iterable[TableInfo], annotations: Mapping[tuple[str, str | None], str] | None = None
+) -> str:
+    """Render tables one per line; ``annotations`` adds notes keyed by (table, column or None)."""
+    annotations = annotations or {}
+    lines = ["Tables:"]
+    for table in tables:
+        columns = []
+        for column in table.columns:
+            note = annotations.get((table.name, column.name))
+            columns.append(f"{column.name} {column.type}" + (f" [{note}]" if note else ""))
+        note = annotations.get((table.name, None))
+        lines.append(f"- {table.name}" + (f" ({note})" if note else "") + f": {', '.join(columns)}")
+    return "\n".join(lines)
+
+
+def load_catalog(db: DuckDBClient) -> SchemaCatalog:
+    signature = file_signature(db.db_path)
+    grouped: dict[str, list[ColumnInfo]] = {}
+    table_comments: dict[str, str | None] = {}
+    for table_name, column_name, data_type, column_comment, table_comment in db.fetch_rows(_COLUMNS_SQL):
+        grouped.setdefault(table_name, []).append(ColumnInfo(column_name, data_type, column_comment))
+        table_comments[table_name] = table_comment
+    tables = tuple(
+        TableInfo(name, tuple(columns), table_comments[name]) for name, columns in grouped.items()
+    )
+    return SchemaCatalog(tables=tables, signature=signature)
+
+
+_CACHE: dict[str, SchemaCatalog] = {}
+_CACHE_LOCK = threading.Lock()
+
+
+def get_catalog(db: DuckDBClient) -> SchemaCatalog:
+    # Keyed by path and validated against the file's mtime/size, so every session in
+    # the process shares one catalog until the database file is rewritten.
+    signature = file_signature(db.db_path)
+    with _CACHE_LOCK:
+        cached = _CACHE.get(db.db_path)
+        if cached is not None and signature is not None and cached.signature == signature:
+            return cached
+        catalog = load_catalog(db)
+        if catalog.signature is not None:
+            _CACHE[db.db_path] = catalog
+        return catalog
+
+
+def clear_catalog_cache() -> None:
+    with _CACHE_LOCK:
+        _CACHE.clear()
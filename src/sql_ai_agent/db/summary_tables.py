@@ -0,0 +1,559 @@
+from __future__ import annotations
+
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Iterable
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import duckdb
+
+from sql_ai_agent.db.connection_pool import file_signature, get_pool
+
+logger = logging.getLogger(__name__)
+
+# Aggregates whose per-group value is stored once and read back as is. Any other
+# aggregate (string_agg, list, ...) keeps a query on the base table.
+_SUPPORTED_AGGREGATES = frozenset({"count", "count_star", "sum", "avg", "mean", "min", "max", "median"})
+_UNSUPPORTED_CLASSES = frozenset({"SUBQUERY", "WINDOW", "STAR", "PARAMETER", "LAMBDA"})
+
+_METADATA_SQL = """
+CREATE TABLE summaries.main.summary_source (source_path VARCHAR, signature VARCHAR, built_at DOUBLE);
+CREATE TABLE summaries.main.summary_tables (
+    name VARCHAR,
+    schema_name VARCHAR,
+    table_name VARCHAR,
+    dimensions VARCHAR,
+    aggregates VARCHAR,
+    source_rows BIGINT,
+    summary_rows BIGINT
+);
+"""
+
+
+class _Unsupported(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class AggregateShape:
+    """A single-table ``GROUP BY`` query reduced to what a summary table must provide."""
+
+    schema: str
+    table: str
+    dimensions: frozenset[str]
+    aggregates: frozenset[str]
+    statement: str
+
+
+@dataclass(frozen=True)
+class SummarySpec:
+    schema: str
+    table: str
+    dimensions: tuple[str, ...]
+    aggregates: tuple[str, ...]
+    executions: int
+
+    @property
+    def name(self) -> str:
+        return "summary_" + _digest(self.schema, self.table, *self.dimensions)
+
+
+@dataclass(frozen=True)
+class SummaryTable:
+    name: str
+    schema: str
+    table: str
+    dimensions: frozenset[str]
+    columns: dict[str, str]
+    source_rows: int
+    summary_rows: int
+
+
+@dataclass(frozen=True)
+class _State:
+    sidecar_signature: tuple[int, int] | None
+    source_path: str | None
+    source_signature: str | None
+    built_at: float
+    tables: dict[tuple[str, str, frozenset[str]], SummaryTable]
+
+
+def _digest(*parts: str) -> str:
+    return hashlib.sha1("|".join(parts).encode("utf-8")).hexdigest()[:12]
+
+
+def aggregate_column(aggregate: str) -> str:
+    return "agg_" + _digest(aggregate)
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+_PARSER = threading.local()
+
+
+def _parser() -> duckdb.DuckDBPyConnection:
+    con = getattr(_PARSER, "con", None)
+    if con is None:
+        con = _PARSER.con = duckdb.connect()
+    return con
+
+
+@lru_cache(maxsize=1)
+def _aggregate_names() -> frozenset[str]:
+    rows = _parser().execute(
+        "SELECT DISTINCT lower(function_name) FROM duckdb_functions() WHERE function_type = 'aggregate'"
+    ).fetchall()
+    return frozenset(row[0] for row in rows) | {"count_star"}
+
+
+def _serialize(sql: str) -> dict | None:
+    parsed = json.loads(_parser().execute("SELECT json_serialize_sql(?)", [sql]).fetchone()[0])
+    if parsed.get("error") or len(parsed.get("statements", [])) != 1:
+        return None
+    return parsed["statements"][0]
+
+
+def _deserialize(statement: dict) -> str:
+    payload = json.dumps({"error": False, "statements": [statement]})
+    return _parser().execute("SELECT json_deserialize_sql(?)", [payload]).fetchone()[0]
+
+
+def _column_ref(name: str, alias: str = "") -> dict:
+    return {"class": "COLUMN_REF", "type": "COLUMN_REF", "alias": alias, "column_names": [name]}
+
+
+def _base_table(table: str, schema: str = "", alias: str = "") -> dict:
+    return {
+        "type": "BASE_TABLE",
+        "alias": alias,
+        "sample": None,
+        "schema_name": schema,
+        "table_name": table,
+        "column_name_alias": [],
+        "catalog_name": "",
+    }
+
+
+def _column_name(ref: dict, qualifiers: frozenset[str]) -> str:
+    names = ref["column_names"]
+    if len(names) == 1:
+        return names[0].lower()
+    if len(names) == 2 and names[0].lower() in qualifiers:
+        return names[1].lower()
+    raise _Unsupported
+
+
+def _is_aggregate(node: dict) -> bool:
+    return (
+        node.get("class") == "FUNCTION"
+        and not node.get("schema")
+        and not node.get("catalog")
+        and node["function_name"].lower() in _aggregate_names()
+    )
+
+
+def _canonical(value: Any, qualifiers: frozenset[str]) -> Any:
+    """Copy of an aggregate expression without source positions, aliases or table qualifiers."""
+    if isinstance(value, list):
+        return [_canonical(item, qualifiers) for item in value]
+    if not isinstance(value, dict):
+        return value
+    node = {key: _canonical(item, qualifiers) for key, item in value.items() if key != "query_location"}
+    if "class" in node:
+        node["alias"] = ""
+    if node.get("class") == "COLUMN_REF":
+        node["column_names"] = [_column_name(value, qualifiers)]
+    if node.get("class") == "FUNCTION":
+        node["function_name"] = node["function_name"].lower()
+    return node
+
+
+def _collect(
+    value: Any,
+    qualifiers: frozenset[str],
+    columns: set[str],
+    aggregates: dict[str, dict],
+    in_aggregate: bool = False,
+) -> None:
+    """Gather column references outside aggregates and the aggregates themselves."""
+    if isinstance(value, list):
+        for item in value:
+            _collect(item, qualifiers, columns, aggregates, in_aggregate)
+        return
+    if not isinstance(value, dict):
+        return
+    kind = value.get("class")
+    if kind in _UNSUPPORTED_CLASSES:
+        raise _Unsupported
+    if kind == "COLUMN_REF":
+        name = _column_name(value, qualifiers)
+        if not in_aggregate:
+            columns.add(name)
+        return
+    if kind is not None and _is_aggregate(value):
+        if in_aggregate or value["function_name"].lower() not in _SUPPORTED_AGGREGATES:
+            raise _Unsupported
+        for item in value.values():
+            _collect(item, qualifiers, columns, aggregates, in_aggregate=True)
+        node = _canonical(value, qualifiers)
+        aggregates[json.dumps(node, sort_keys=True)] = node
+        return
+    for item in value.values():
+        _collect(item, qualifiers, columns, aggregates, in_aggregate)
+
+
+def _shape(statement: dict) -> AggregateShape:
+    node = statement["node"]
+    if node.get("type") != "SELECT_NODE" or node.get("cte_map", {}).get("map"):
+        raise _Unsupported
+    if node.get("sample") or node.get("qualify") or node.get("aggregate_handling") != "STANDARD_HANDLING":
+        raise _Unsupported
+    source = node.get("from_table") or {}
+    if source.get("type") != "BASE_TABLE" or source.get("catalog_name") or source.get("sample"):
+        raise _Unsupported
+    table = source["table_name"].lower()
+    qualifiers = frozenset({(source.get("alias") or source["table_name"]).lower()})
+
+    groups = node.get("group_expressions") or []
+    if any(group.get("class") != "COLUMN_REF" for group in groups):
+        raise _Unsupported
+    if groups and node.get("group_sets") != [list(range(len(groups)))]:
+        raise _Unsupported
+    dimensions = frozenset(_column_name(group, qualifiers) for group in groups)
+    if len(dimensions) != len(groups):
+        raise _Unsupported
+
+    aggregates: dict[str, dict] = {}
+    for item in node["select_list"]:
+        columns: set[str] = set()
+        found: dict[str, dict] = {}
+        _collect(item, qualifiers, columns, found)
+        # Renamed columns would change the output header, so aggregate items need an alias.
+        if not columns <= dimensions or (found and not item.get("alias")):
+            raise _Unsupported
+        aggregates.update(found)
+    if not aggregates:
+        raise _Unsupported
+
+    for clause in ("where_clause", "having"):
+        columns = set()
+        _collect(node.get(clause), qualifiers, columns, aggregates)
+        if not columns <= dimensions:
+            raise _Unsupported
+    # Without groups an empty filter result still yields one aggregate row, which a
+    # filtered summary row cannot reproduce.
+    if node.get("where_clause") and not dimensions:
+        raise _Unsupported
+
+    aliases = {item["alias"].lower() for item in node["select_list"] if item.get("alias")}
+    columns = set()
+    _collect(node.get("modifiers"), qualifiers, columns, aggregates)
+    if not columns <= dimensions | aliases:
+        raise _Unsupported
+
+    return AggregateShape(
+        schema=(source.get("schema_name") or "main").lower(),
+        table=table,
+        dimensions=dimensions,
+        aggregates=frozenset(aggregates),
+        statement=json.dumps(statement),
+    )
+
+
+@lru_cache(maxsize=1024)
+def aggregate_shape(sql: str) -> AggregateShape | None:
+    """Return the summary shape of ``sql``, or ``None`` when no summary table can answer it exactly."""
+    try:
+        statement = _serialize(sql)
+        return _shape(statement) if statement is not None else None
+    except (_Unsupported, KeyError, TypeError, duckdb.Error):
+        return None
+
+
+def advise(workload: Iterable[tuple[str, int]], min_executions: int = 3, max_tables: int = 20) -> list[SummarySpec]:
+    """Pick the most executed aggregate shapes; shapes sharing table and groups share one summary."""
+    executions: dict[tuple[str, str, frozenset[str]], int] = {}
+    aggregates: dict[tuple[str, str, frozenset[str]], set[str]] = {}
+    for sql, count in workload:
+        shape = aggregate_shape(sql)
+        if shape is None:
+            continue
+        key = (shape.schema, shape.table, shape.dimensions)
+        executions[key] = executions.get(key, 0) + count
+        aggregates.setdefault(key, set()).update(shape.aggregates)
+    hot = [key for key, count in executions.items() if count >= min_executions]
+    hot.sort(key=executions.get, reverse=True)
+    return [
+        SummarySpec(
+            schema=schema,
+            table=table,
+            dimensions=tuple(sorted(dimensions)),
+            aggregates=tuple(sorted(aggregates[(schema, table, dimensions)])),
+            executions=executions[(schema, table, dimensions)],
+        )
+        for schema, table, dimensions in hot[:max_tables]
+    ]
+
+
+def _summary_select(spec: SummarySpec) -> str:
+    groups = [_column_ref(dimension) for dimension in spec.dimensions]
+    select_list = [_column_ref(dimension) for dimension in spec.dimensions]
+    for aggregate in spec.aggregates:
+        node = json.loads(aggregate)
+        node["alias"] = aggregate_column(aggregate)
+        select_list.append(node)
+    node = {
+        "type": "SELECT_NODE",
+        "modifiers": [],
+        "cte_map": {"map": []},
+        "select_list": select_list,
+        "from_table": _base_table(spec.table, spec.schema),
+        "where_clause": None,
+        "group_expressions": groups,
+        "group_sets": [list(range(len(groups)))] if groups else [],
+        "aggregate_handling": "STANDARD_HANDLING",
+        "having": None,
+        "sample": None,
+        "qualify": None,
+    }
+    return _deserialize({"node": node, "named_param_map": []})
+
+
+def _replace_aggregates(value: Any, qualifiers: frozenset[str], columns: dict[str, str]) -> Any:
+    if isinstance(value, list):
+        return [_replace_aggregates(item, qualifiers, columns) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if value.get("class") == "FUNCTION" and _is_aggregate(value):
+        key = json.dumps(_canonical(value, qualifiers), sort_keys=True)
+        return _column_ref(columns[key], value.get("alias", ""))
+    return {key: _replace_aggregates(item, qualifiers, columns) for key, item in value.items()}
+
+
+def _rewrite(shape: AggregateShape, summary: SummaryTable) -> str:
+    statement = json.loads(shape.statement)
+    node = statement["node"]
+    source = node["from_table"]
+    alias = source.get("alias") or source["table_name"]
+    qualifiers = frozenset({alias.lower()})
+    node["select_list"] = _replace_aggregates(node["select_list"], qualifiers, summary.columns)
+    node["modifiers"] = _replace_aggregates(node["modifiers"], qualifiers, summary.columns)
+    filters = [
+        _replace_aggregates(node[clause], qualifiers, summary.columns)
+        for clause in ("where_clause", "having")
+        if node.get(clause)
+    ]
+    if len(filters) > 1:
+        filters = [{"class": "CONJUNCTION", "type": "CONJUNCTION_AND", "alias": "", "children": filters}]
+    # Each summary row is one group, so HAVING becomes a row filter and GROUP BY goes away.
+    # Keeping the original alias lets qualified column references resolve unchanged.
+    node["from_table"] = _base_table(summary.name, alias=alias)
+    node["where_clause"] = filters[0] if filters else None
+    node["having"] = None
+    node["group_expressions"] = []
+    node["group_sets"] = []
+    return _deserialize(statement)
+
+
+def _signature_text(signature: tuple[int, int] | None) -> str | None:
+    return json.dumps(list(signature)) if signature is not None else None
+
+
+class SummaryStore:
+    """Pre-aggregated summary tables for one source database, kept in a sidecar DuckDB file.
+
+    The sidecar is rebuilt as a whole into a temporary file and swapped in, so readers
+    never see a half-built set. Summaries are only used while the source file signature
+    matches the one they were built from.
+    """
+
+    def __init__(self, path: str, pool_size: int = 4, config: dict[str, Any] | None = None) -> None:
+        self._path = path
+        self._pool_size = pool_size
+        self._config = dict(config or {})
+        self._lock = threading.Lock()
+        self._state: _State | None = None
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _read(self) -> _State:
+        sidecar_signature = file_signature(self._path)
+        if sidecar_signature is None:
+            return _State(None, None, None, 0.0, {})
+        with get_pool(self._path, self._pool_size, self._config).connection() as con:
+            source = con.execute("SELECT source_path, signature, built_at FROM summary_source").fetchone()
+            rows = con.execute(
+                "SELECT name, schema_name, table_name, dimensions, aggregates, source_rows, summary_rows "
+                "FROM summary_tables"
+            ).fetchall()
+        tables = {}
+        for name, schema, table, dimensions, aggregates, source_rows, summary_rows in rows:
+            summary = SummaryTable(
+                name=name,
+                schema=schema,
+                table=table,
+                dimensions=frozenset(json.loads(dimensions)),
+                columns={aggregate: aggregate_column(aggregate) for aggregate in json.loads(aggregates)},
+                source_rows=source_rows,
+                summary_rows=summary_rows,
+            )
+            tables[(schema, table, summary.dimensions)] = summary
+        source_path, signature, built_at = source if source else (None, None, 0.0)
+        return _State(sidecar_signature, source_path, signature, built_at, tables)
+
+    def _current_state(self) -> _State:
+        with self._lock:
+            if self._state is None or self._state.sidecar_signature != file_signature(self._path):
+                self._state = self._read()
+            return self._state
+
+    def is_current(self, source_path: str, max_age_seconds: float = 0.0) -> bool:
+        state = self._current_state()
+        if state.source_path != str(Path(source_path).resolve()):
+            return False
+        if state.source_signature != _signature_text(file_signature(source_path)):
+            return False
+        return not max_age_seconds or time.time() - state.built_at < max_age_seconds
+
+    def summaries(self) -> list[SummaryTable]:
+        return list(self._current_state().tables.values())
+
+    def rewrite(self, sql: str, source_path: str) -> str | None:
+        """Return ``sql`` rewritten to read a summary table, or ``None`` when none matches."""
+        if not self.is_current(source_path):
+            return None
+        shape = aggregate_shape(sql)
+        if shape is None:
+            return None
+        summary = self._current_state().tables.get((shape.schema, shape.table, shape.dimensions))
+        if summary is None or not shape.aggregates <= summary.columns.keys():
+            return None
+        return _rewrite(shape, summary)
+
+    def build(self, source_path: str, specs: list[SummarySpec], max_ratio: float = 0.5) -> list[str]:
+        """Materialize ``specs`` from ``source_path``; summaries over ``max_ratio`` of their table are dropped."""
+        signature = file_signature(source_path)
+        if signature is None:
+            raise FileNotFoundError(f"DuckDB file not found at '{source_path}'.")
+        Path(self._path).parent.mkdir(parents=True, exist_ok=True)
+        temporary = f"{self._path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        built: list[str] = []
+        con = duckdb.connect()
+        try:
+            con.execute(f"ATTACH {_literal(source_path)} AS src (READ_ONLY)")
+            con.execute(f"ATTACH {_literal(temporary)} AS summaries")
+            con.execute("USE src")
+            con.execute(_METADATA_SQL)
+            for spec in specs:
+                target = f"summaries.main.{_quote(spec.name)}"
+                try:
+                    con.execute(f"CREATE TABLE {target} AS {_summary_select(spec)}")
+                    source_rows = con.execute(
+                        f"SELECT COUNT(*) FROM {_quote(spec.schema)}.{_quote(spec.table)}"
+                    ).fetchone()[0]
+                except duckdb.Error as exc:
+                    logger.warning("Skipping summary of %s.%s: %s", spec.schema, spec.table, exc)
+                    con.execute(f"DROP TABLE IF EXISTS {target}")
+                    continue
+                summary_rows = con.execute(f"SELECT COUNT(*) FROM {target}").fetchone()[0]
+                if source_rows and summary_rows > source_rows * max_ratio:
+                    con.execute(f"DROP TABLE {target}")
+                    continue
+                con.execute(
+                    "INSERT INTO summaries.main.summary_tables VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        spec.name,
+                        spec.schema,
+                        spec.table,
+                        json.dumps(list(spec.dimensions)),
+                        json.dumps(list(spec.aggregates)),
+                        source_rows,
+                        summary_rows,
+                    ],
+                )
+                built.append(spec.name)
+            con.execute(
+                "INSERT INTO summaries.main.summary_source VALUES (?, ?, ?)",
+                [str(Path(source_path).resolve()), _signature_text(signature), time.time()],
+            )
+            con.execute("DETACH summaries")
+        finally:
+            con.close()
+        with self._lock:
+            os.replace(temporary, self._path)
+            self._state = None
+        return built
+
+
+def refresh_summaries(
+    source_path: str,
+    store: SummaryStore,
+    workload: Callable[[], Iterable[tuple[str, int]]],
+    min_executions: int = 3,
+    max_tables: int = 20,
+) -> list[str]:
+    return store.build(source_path, advise(workload(), min_executions, max_tables))
+
+
+_STORES: dict[str, SummaryStore] = {}
+_STORES_LOCK = threading.Lock()
+_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="summaries")
+_SCHEDULED: dict[tuple[str, str], tuple[object, Future]] = {}
+
+
+def get_summary_store(path: str, pool_size: int = 4, config: dict[str, Any] | None = None) -> SummaryStore:
+    with _STORES_LOCK:
+        store = _STORES.get(path)
+        if store is None:
+            store = SummaryStore(path, pool_size, config)
+            _STORES[path] = store
+        return store
+
+
+def schedule_refresh(
+    source_path: str,
+    store: SummaryStore,
+    workload: Callable[[], Iterable[tuple[str, int]]],
+    min_executions: int = 3,
+    max_tables: int = 20,
+    force: bool = False,
+) -> Future:
+    """Rebuild summaries in the background; a failed build is not retried until the source changes.
+
+    ``force`` queues a rebuild even when one for this source version is running or failed,
+    for when the workload itself changed.
+    """
+    key = (source_path, store.path)
+    signature = file_signature(source_path)
+    with _STORES_LOCK:
+        scheduled = _SCHEDULED.get(key)
+        if scheduled is not None and scheduled[0] == signature and not force:
+            future = scheduled[1]
+            if not future.done() or future.exception() is not None:
+                return future
+        future = _EXECUTOR.submit(refresh_summaries, source_path, store, workload, min_executions, max_tables)
+        _SCHEDULED[key] = (signature, future)
+        return future
+
+
+def wait_for_summaries(timeout: float | None = None) -> None:
+    with _STORES_LOCK:
+        futures = [future for _, future in _SCHEDULED.values()]
+    wait(futures, timeout=timeout)
@@ -0,0 +1 @@
+"""Scraping and loading of the books dataset."""
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator
+import io
+import logging
+import re
+
+import duckdb
+import pyarrow as pa
+import pyarrow.compute as pc
+from bs4 import BeautifulSoup
+from lxml import etree
+
+logger = logging.getLogger(__name__)
+
+URL_TO_SCRAPE = "https://books.toscrape.com/"
+
+BOOK_SCHEMA = pa.schema([("book_id", pa.int64()), ("title", pa.string()), ("price", pa.float64())])
+
+_BOOKS_DDL = "CREATE TABLE {name} (book_id BIGINT, title VARCHAR, price DECIMAL(10, 2))"
+# Product links look like "catalogue/a-light-in-the-attic_1000/index.html"; the number
+# is the site's own id and stays the same across catalog pages.
+_BOOK_ID = re.compile(r"_(\d+)/index\.html$")
+
+PARSER_BACKENDS = ("bs4", "lxml")
+
+
+def _has_class(name: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+_POD_TITLE = etree.XPath("h3/a")
+_POD_PRICE = etree.XPath(f"string(div[{_has_class('product_price')}]/p[{_has_class('price_color')}])")
+
+
+def book_id_from_href(href: str | None) -> int | None:
+    match = _BOOK_ID.search(href or "")
+    return int(match.group(1)) if match else None
+
+
+def scrape_html(api_key: str, url: str = URL_TO_SCRAPE) -> str:
+    # Imported lazily so parsing and offline loading work without the Firecrawl SDK.
+    from firecrawl import FirecrawlApp
+
+    app = FirecrawlApp(api_key=api_key)
+    result = app.scrape_url(url, params={"formats": ["html"]})
+    html = result.get("html")
+    if not html:
+        raise RuntimeError("Scrape completed but no HTML was returned.")
+    return html
+
+
+def read_html_pages(directory: str) -> Iterator[str]:
+    """Yield saved HTML pages (e.g. recorded fixtures) in path order."""
+    paths = sorted(Path(directory).rglob("*.html"))
+    if not paths:
+        raise FileNotFoundError(f"No HTML files found in '{directory}'.")
+    for path in paths:
+        yield path.read_text(encoding="utf-8")
+
+
+def _parse_prices(texts: list[str | None]) -> pa.Array:
+    cleaned = pc.utf8_trim_whitespace(pc.replace_substring_regex(pa.array(texts, pa.string()), "Â|£", ""))
+    valid = pc.match_substring_regex(cleaned, r"^[0-9]+(\.[0-9]+)?$")
+    for text in pc.filter(cleaned, pc.invert(valid)).to_pylist():
+        logger.warning("Unable to parse price: %s", text)
+    return pc.if_else(valid, cleaned, None).cast(pa.float64())
+
+
+_Columns = tuple[list[int | None], list[str | None], list[str | None]]
+
+
+def _extract_bs4(html: str) -> _Columns:
+    soup = BeautifulSoup(html, "lxml")
+    book_ids: list[int | None] = []
+    titles: list[str | None] = []
+    price_texts: list[str | None] = []
+    for pod in soup.select("article.product_pod"):
+        title_tag = pod.select_one("h3 a")
+        title = title_tag.get("title") if title_tag else None
+        book_ids.append(book_id_from_href(title_tag.get("href")) if title_tag else None)
+        titles.append(title.strip() if title else None)
+        price_tag = pod.select_one("div.product_price p.price_color")
+        price_texts.append(price_tag.get_text() if price_tag else None)
+    return book_ids, titles, price_texts
+
+
+def _extract_lxml(html: str) -> _Columns:
+    book_ids: list[int | None] = []
+    titles: list[str | None] = []
+    price_texts: list[str | None] = []
+    source = io.BytesIO(html.encode("utf-8"))
+    for _, pod in etree.iterparse(source, events=("end",), tag="article", html=True, encoding="utf-8"):
+        if "product_pod" in (pod.get("class") or "").split():
+            links = _POD_TITLE(pod)
+            title = links[0].get("title") if links else None
+            book_ids.append(book_id_from_href(links[0].get("href")) if links else None)
+            titles.append(title.strip() if title else None)
+            price_texts.append(_POD_PRICE(pod) or None)
+        # Drop each pod, and the list items before it, once read so the tree stays small.
+        pod.clear(keep_tail=False)
+        for node in (pod, pod.getparent()):
+            while node is not None and node.getprevious() is not None:
+                del node.getparent()[0]
+    return book_ids, titles, price_texts
+
+
+def parse_book_batch(html: str, backend: str = "bs4") -> pa.RecordBatch:
+    if backend == "lxml":
+        book_ids, titles, price_texts = _extract_lxml(html)
+    elif backend == "bs4":
+        book_ids, titles, price_texts = _extract_bs4(html)
+    else:
+        raise ValueError(f"Unknown parser backend '{backend}'. Use one of: {', '.join(PARSER_BACKENDS)}.")
+
+    batch = pa.RecordBatch.from_arrays(
+        [pa.array(book_ids, pa.int64()), pa.array(titles, pa.string()), _parse_prices(price_texts)],
+        schema=BOOK_SCHEMA,
+    )
+    return batch.filter(pc.and_(pc.is_valid(batch["title"]), pc.is_valid(batch["price"])))
+
+
+def parse_pages(pages: Iterable[str], backend: str = "bs4", processes: int = 1) -> list[pa.RecordBatch]:
+    """Parse pages into batches, spreading them over a process pool when ``processes`` > 1."""
+    if processes <= 1:
+        return [parse_book_batch(html, backend) for html in pages]
+    pages = list(pages)
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        chunksize = max(1, len(pages) // (processes * 4))
+        return list(pool.map(parse_book_batch, pages, [backend] * len(pages), chunksize=chunksize))
+
+
+def parse_books(html: str, backend: str = "bs4") -> list[dict[str, object]]:
+    return parse_book_batch(html, backend).to_pylist()
+
+
+def replace_books(con: duckdb.DuckDBPyConnection, source: str) -> None:
+    """Swap ``books`` for a table loaded from ``source``; call inside a transaction."""
+    con.execute("DROP TABLE IF EXISTS books__staging")
+    con.execute(_BOOKS_DDL.format(name="books__staging"))
+    con.execute(f"INSERT INTO books__staging SELECT book_id, title, price FROM {source}")
+    con.execute("DROP TABLE IF EXISTS books")
+    con.execute("ALTER TABLE books__staging RENAME TO books")
+
+
+def write_duckdb(db_path: str, batches: Iterable[pa.RecordBatch]) -> int:
+    """Replace the ``books`` table with the given batches and return the row count.
+
+    Rows are bulk loaded into a staging table from one registered Arrow table, and the
+    staging table is renamed over ``books`` in the same transaction, so readers see
+    either the old or the new table and never an empty one.
+    """
+    table = pa.Table.from_batches(list(batches), schema=BOOK_SCHEMA)
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    with duckdb.connect(database=db_path, read_only=False) as con:
+        con.register("incoming_books", table)
+        con.execute("BEGIN TRANSACTION")
+        try:
+            replace_books(con, "incoming_books")
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+        finally:
+            con.unregister("incoming_books")
+    return table.num_rows
@@ -0,0 +1,262 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Protocol
+from urllib.parse import urljoin
+import hashlib
+import logging
+import re
+
+import duckdb
+import httpx
+import pyarrow as pa
+
+from sql_ai_agent.ingest.books import BOOK_SCHEMA, URL_TO_SCRAPE, parse_book_batch, replace_books, scrape_html
+
+logger = logging.getLogger(__name__)
+
+# Crawl state lives in its own schema, so it stays out of the schema shown to the LLM.
+_STATE_DDL = """
+CREATE SCHEMA IF NOT EXISTS _crawl;
+CREATE TABLE IF NOT EXISTS _crawl.pages (
+    url VARCHAR PRIMARY KEY,
+    etag VARCHAR,
+    content_hash VARCHAR NOT NULL,
+    next_url VARCHAR,
+    page_count INTEGER,
+    fetched_at TIMESTAMP NOT NULL
+);
+"""
+
+_PAGE_COUNT = re.compile(r"Page\s+\d+\s+of\s+(\d+)")
+_NEXT_LINK = re.compile(r'<li class="next">\s*<a href="([^"]+)"')
+_PAGE_NUMBER = re.compile(r"page-\d+\.html$")
+
+
+@dataclass(frozen=True)
+class FetchResult:
+    url: str
+    html: str | None
+    etag: str | None = None
+
+    @property
+    def not_modified(self) -> bool:
+        return self.html is None
+
+
+class Fetcher(Protocol):
+    def fetch(self, url: str, etag: str | None = None) -> FetchResult:
+        """Return the page, or ``html=None`` when the server reports it unchanged."""
+        ...
+
+
+class HttpFetcher:
+    """Plain HTTP fetcher with conditional requests; safe to share across threads."""
+
+    def __init__(self, timeout: float = 30.0, max_connections: int = 8) -> None:
+        self._client = httpx.Client(
+            timeout=timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+        )
+
+    def fetch(self, url: str, etag: str | None = None) -> FetchResult:
+        headers = {"If-None-Match": etag} if etag else {}
+        response = self._client.get(url, headers=headers)
+        if response.status_code == 304:
+            return FetchResult(url, None, etag)
+        response.raise_for_status()
+        return FetchResult(url, response.text, response.headers.get("ETag"))
+
+    def close(self) -> None:
+        self._client.close()
+
+
+class FirecrawlFetcher:
+    """Fetches through Firecrawl; it exposes no validators, so only content hashes apply."""
+
+    def __init__(self, api_key: str) -> None:
+        self._api_key = api_key
+
+    def fetch(self, url: str, etag: str | None = None) -> FetchResult:
+        return FetchResult(url, scrape_html(self._api_key, url))
+
+
+@dataclass(frozen=True)
+class _PageState:
+    etag: str | None
+    content_hash: str
+    next_url: str | None
+    page_count: int | None
+
+
+@dataclass(frozen=True)
+class _Visit:
+    url: str
+    state: _PageState
+    batch: pa.RecordBatch | None
+
+
+@dataclass
+class CrawlReport:
+    pages: int = 0
+    not_modified: int = 0
+    unchanged: int = 0
+    changed: int = 0
+    rows_written: int = 0
+    full_reload: bool = False
+    errors: list[str] = field(default_factory=list)
+
+
+def _pagination(html: str, url: str) -> tuple[str | None, int | None]:
+    next_link = _NEXT_LINK.search(html)
+    page_count = _PAGE_COUNT.search(html)
+    return (
+        urljoin(url, next_link.group(1)) if next_link else None,
+        int(page_count.group(1)) if page_count else None,
+    )
+
+
+def _visit(fetcher: Fetcher, url: str, known: dict[str, _PageState], parser: str = "bs4") -> _Visit:
+    previous = known.get(url)
+    result = fetcher.fetch(url, previous.etag if previous else None)
+    if result.not_modified and previous is not None:
+        return _Visit(url, previous, None)
+    if result.html is None:
+        raise RuntimeError(f"No HTML returned for {url}.")
+    content_hash = hashlib.sha256(result.html.encode("utf-8")).hexdigest()
+    if previous is not None and previous.content_hash == content_hash:
+        return _Visit(url, _PageState(result.etag, content_hash, previous.next_url, previous.page_count), None)
+    next_url, page_count = _pagination(result.html, url)
+    batch = parse_book_batch(result.html, parser)
+    return _Visit(url, _PageState(result.etag, content_hash, next_url, page_count), batch)
+
+
+def _page_urls(first: _Visit, max_pages: int | None) -> list[str] | None:
+    """Derive every catalog page URL from the first page, or None if they must be followed."""
+    next_url, page_count = first.state.next_url, first.state.page_count
+    if next_url is None:
+        return []
+    if page_count is None or not _PAGE_NUMBER.search(next_url):
+        return None
+    last = page_count if max_pages is None else min(page_count, max_pages)
+    return [_PAGE_NUMBER.sub(f"page-{number}.html", next_url) for number in range(2, last + 1)]
+
+
+def _load_state(con: duckdb.DuckDBPyConnection) -> dict[str, _PageState]:
+    rows = con.execute("SELECT url, etag, content_hash, next_url, page_count FROM _crawl.pages").fetchall()
+    return {url: _PageState(*state) for url, *state in rows}
+
+
+def _books_keyed(con: duckdb.DuckDBPyConnection) -> bool:
+    row = con.execute(
+        """
+        SELECT count(*) FROM information_schema.columns
+        WHERE table_schema = 'main' AND table_name = 'books' AND column_name = 'book_id'
+        """
+    ).fetchone()
+    return bool(row[0])
+
+
+def _apply(con: duckdb.DuckDBPyConnection, visits: list[_Visit], full_reload: bool) -> int:
+    batches = [visit.batch for visit in visits if visit.batch is not None]
+    incoming = pa.Table.from_batches(batches, schema=BOOK_SCHEMA)
+    # A book can shift between pages while the crawl runs; keep one row per id.
+    source = "(SELECT DISTINCT ON (book_id) * FROM incoming_books WHERE book_id IS NOT NULL)"
+    con.register("incoming_books", incoming)
+    try:
+        written = con.execute(f"SELECT count(*) FROM {source}").fetchone()[0]
+        if full_reload and not written:
+            # Swapping in an empty table would wipe the catalog, e.g. after a site layout change.
+            raise RuntimeError("No book records were parsed from the scraped HTML.")
+        con.execute("BEGIN TRANSACTION")
+        try:
+            if full_reload:
+                replace_books(con, source)
+            elif incoming.num_rows:
+                con.execute(f"DELETE FROM books WHERE book_id IN (SELECT book_id FROM {source})")
+                con.execute(f"INSERT INTO books SELECT book_id, title, price FROM {source}")
+            con.executemany(
+                "INSERT OR REPLACE INTO _crawl.pages VALUES (?, ?, ?, ?, ?, now())",
+                [
+                    (
+                        visit.url,
+                        visit.state.etag,
+                        visit.state.content_hash,
+                        visit.state.next_url,
+                        visit.state.page_count,
+                    )
+                    for visit in visits
+                ],
+            )
+            con.execute("COMMIT")
+        except Exception:
+            con.execute("ROLLBACK")
+            raise
+    finally:
+        con.unregister("incoming_books")
+    return written
+
+
+def crawl(
+    db_path: str,
+    fetcher: Fetcher,
+    start_url: str = URL_TO_SCRAPE,
+    workers: int = 8,
+    max_pages: int | None = None,
+    parser: str = "bs4",
+) -> CrawlReport:
+    """Walk the paginated catalog and upsert books from pages that changed since the last crawl.
+
+    Pages answered with 304 Not Modified, or whose content hash matches the last crawl, are
+    not parsed. The first crawl (or one against a ``books`` table without ``book_id``)
+    replaces the table instead.
+    """
+    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+    report = CrawlReport()
+    with duckdb.connect(database=db_path, read_only=False) as con:
+        con.execute(_STATE_DDL)
+        known = _load_state(con)
+        report.full_reload = not known or not _books_keyed(con)
+        if report.full_reload:
+            known = {}
+
+        first = _visit(fetcher, start_url, known, parser)
+        visits = [first]
+        urls = _page_urls(first, max_pages)
+        if urls is None:
+            # No page count to derive URLs from; follow "next" links one at a time.
+            while visits[-1].state.next_url and (max_pages is None or len(visits) < max_pages):
+                visits.append(_visit(fetcher, visits[-1].state.next_url, known, parser))
+        elif urls:
+            with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="crawler") as pool:
+                for future in [pool.submit(_visit, fetcher, url, known, parser) for url in urls]:
+                    try:
+                        visits.append(future.result())
+                    except Exception as exc:
+                        # Failed pages keep their old state and are retried next crawl.
+                        logger.warning("Failed to crawl page: %s", exc)
+                        report.errors.append(str(exc))
+
+        for visit in visits:
+            if visit.batch is not None:
+                report.changed += 1
+            elif known.get(visit.url) is visit.state:
+                report.not_modified += 1
+            else:
+                report.unchanged += 1
+        report.pages = len(visits)
+        if report.full_reload and report.errors:
+            raise RuntimeError(f"Initial crawl failed for {len(report.errors)} page(s): {report.errors[0]}")
+        report.rows_written = _apply(con, visits, report.full_reload)
+    logger.info(
+        "Crawled %d pages: %d changed, %d unchanged, %d not modified; %d rows written",
+        report.pages,
+        report.changed,
+        report.unchanged,
+        report.not_modified,
+        report.rows_written,
+    )
+    return report
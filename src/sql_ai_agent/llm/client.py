@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from sql_ai_agent.config import Settings, load_settings
+
+_CLIENTS: dict[tuple, OpenAI] = {}
+_CLIENTS_LOCK = threading.Lock()
+_ASYNC_CLIENTS: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[tuple, AsyncOpenAI]] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _client_key(settings: Settings) -> tuple:
+    return (
+        settings.openai_api_key,
+        settings.openai_base_url,
+        settings.openai_timeout_seconds,
+        settings.openai_max_retries,
+        settings.openai_max_connections,
+    )
+
+
+def _timeout(settings: Settings) -> httpx.Timeout:
+    return httpx.Timeout(settings.openai_timeout_seconds, connect=min(settings.openai_timeout_seconds, 10.0))
+
+
+def _limits(settings: Settings) -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.openai_max_connections,
+        max_keepalive_connections=settings.openai_max_connections,
+    )
+
+
+def get_client(settings: Settings | None = None) -> OpenAI:
+    settings = settings or load_settings()
+    if not settings.openai_api_key:
+        raise ValueError("OPENAI_API_KEY is not set.")
+
+    key = _client_key(settings)
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            # One pooled httpx client per configuration keeps TLS sessions alive across
+            # calls; the SDK retries with exponential backoff and jitter.
+            http_client = httpx.Client(limits=_limits(settings), timeout=_timeout(settings))
+            client = OpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url,
+                timeout=_timeout(settings),
+                max_retries=settings.openai_max_retries,
+                http_client=http_client,
+            )
+            _CLIENTS[key] = client
+        return client
+
+
+def get_async_client(settings: Settings | None = None) -> AsyncOpenAI:
+    settings = settings or load_settings()
+    if not settings.openai_api_key:
+        raise ValueError("OPENAI_API_KEY is not set.")
+
+    # httpx async connections belong to the loop that opened them, so the pool is
+    # shared per event loop rather than per process.
+    loop = asyncio.get_running_loop()
+    key = _client_key(settings)
+    with _CLIENTS_LOCK:
+        clients = _ASYNC_CLIENTS.setdefault(loop, {})
+        client = clients.get(key)
+        if client is None:
+            http_client = httpx.AsyncClient(limits=_limits(settings), timeout=_timeout(settings))
+            client = AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url,
+                timeout=_timeout(settings),
+                max_retries=settings.openai_max_retries,
+                http_client=http_client,
+            )
+            clients[key] = client
+        return client
+
+
+def reset_clients() -> None:
+    with _CLIENTS_LOCK:
+        clients = list(_CLIENTS.values())
+        _CLIENTS.clear()
+        _ASYNC_CLIENTS.clear()
+    for client in clients:
+        client.close()
@@ -0,0 +1,250 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+import hashlib
+import logging
+import math
+import re
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sql_cache (
+    cache_key TEXT PRIMARY KEY,
+    scope TEXT NOT NULL,
+    normalized_question TEXT NOT NULL,
+    question TEXT NOT NULL,
+    sql TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    last_used_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_sql_cache_scope ON sql_cache (scope);
+CREATE INDEX IF NOT EXISTS idx_sql_cache_last_used ON sql_cache (last_used_at);
+"""
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@dataclass(frozen=True)
+class CacheHit:
+    sql: str
+    question: str
+    similarity: float
+
+    @property
+    def exact(self) -> bool:
+        return self.similarity >= 1.0
+
+
+@dataclass(frozen=True)
+class SqlCacheStats:
+    exact_hits: int
+    similar_hits: int
+    misses: int
+    stores: int
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return (self.exact_hits + self.similar_hits) / lookups if lookups else 0.0
+
+
+def normalize_question(question: str) -> str:
+    text = _WHITESPACE.sub(" ", question.strip().lower())
+    return text.rstrip("?!. ")
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _ngrams(text: str, n: int = 3) -> Counter[str]:
+    padded = f"  {text} "
+    return Counter(padded[i : i + n] for i in range(len(padded) - n + 1))
+
+
+def _cosine(left: Counter[str], right: Counter[str]) -> float:
+    if not left or not right:
+        return 0.0
+    dot = sum(count * right[gram] for gram, count in left.items())
+    norm = math.sqrt(sum(v * v for v in left.values())) * math.sqrt(sum(v * v for v in right.values()))
+    return dot / norm if norm else 0.0
+
+
+class SqlCache:
+    """SQLite-backed cache of generated SQL.
+
+    Entries are scoped by schema hash, model and prompt version. Exact lookups use the
+    normalized question; when ``similarity_threshold`` is above zero, a character
+    trigram index over the questions in the same scope is consulted on exact misses.
+    All access goes through one long-lived connection serialized by the cache lock.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        max_entries: int = 5000,
+        ttl_seconds: int = 7 * 24 * 3600,
+        similarity_threshold: float = 0.0,
+    ) -> None:
+        self._db_path = db_path
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._similarity_threshold = similarity_threshold
+        self._lock = threading.Lock()
+        self._exact_hits = 0
+        self._similar_hits = 0
+        self._misses = 0
+        self._stores = 0
+        self._index: dict[str, list[tuple[str, Counter[str]]]] = {}
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self._con = sqlite3.connect(db_path, check_same_thread=False)
+        self._con.executescript(_SCHEMA)
+
+    @staticmethod
+    def scope_for(schema_context: str, model: str, prompt_version: str) -> str:
+        return fingerprint(f"{fingerprint(schema_context)}|{model}|{prompt_version}")
+
+    def _expiry_cutoff(self, now: float) -> float:
+        return now - self._ttl_seconds if self._ttl_seconds else float("-inf")
+
+    def _scope_index(self, con: sqlite3.Connection, scope: str, cutoff: float) -> list[tuple[str, Counter[str]]]:
+        index = self._index.get(scope)
+        if index is None:
+            rows = con.execute(
+                "SELECT cache_key, normalized_question FROM sql_cache WHERE scope = ? AND created_at >= ?",
+                (scope, cutoff),
+            ).fetchall()
+            index = [(key, _ngrams(text)) for key, text in rows]
+            self._index[scope] = index
+        return index
+
+    def _similar_key(self, con: sqlite3.Connection, scope: str, normalized: str, cutoff: float) -> tuple[str, float] | None:
+        grams = _ngrams(normalized)
+        best: tuple[str, float] | None = None
+        for key, candidate in self._scope_index(con, scope, cutoff):
+            score = _cosine(grams, candidate)
+            if score >= self._similarity_threshold and (best is None or score > best[1]):
+                best = (key, score)
+        return best
+
+    def lookup(self, question: str, scope: str) -> CacheHit | None:
+        normalized = normalize_question(question)
+        key = fingerprint(f"{scope}|{normalized}")
+        now = time.time()
+        cutoff = self._expiry_cutoff(now)
+        try:
+            with self._lock, self._con as con:
+                similarity = 1.0
+                row = con.execute(
+                    "SELECT question, sql FROM sql_cache WHERE cache_key = ? AND created_at >= ?",
+                    (key, cutoff),
+                ).fetchone()
+                if row is None and self._similarity_threshold > 0:
+                    match = self._similar_key(con, scope, normalized, cutoff)
+                    if match is not None:
+                        key, similarity = match
+                        row = con.execute(
+                            "SELECT question, sql FROM sql_cache WHERE cache_key = ? AND created_at >= ?",
+                            (key, cutoff),
+                        ).fetchone()
+                if row is None:
+                    self._misses += 1
+                    return None
+                con.execute(
+                    "UPDATE sql_cache SET last_used_at = ?, hits = hits + 1 WHERE cache_key = ?",
+                    (now, key),
+                )
+                if similarity >= 1.0:
+                    self._exact_hits += 1
+                else:
+                    self._similar_hits += 1
+                return CacheHit(sql=row[1], question=row[0], similarity=similarity)
+        except sqlite3.Error as exc:
+            logger.warning("SQL cache lookup failed: %s", exc)
+            return None
+
+    def store(self, question: str, scope: str, sql: str) -> None:
+        if not sql.strip():
+            return
+        normalized = normalize_question(question)
+        key = fingerprint(f"{scope}|{normalized}")
+        now = time.time()
+        try:
+            with self._lock, self._con as con:
+                con.execute(
+                    """
+                    INSERT OR REPLACE INTO sql_cache
+                        (cache_key, scope, normalized_question, question, sql, created_at, last_used_at, hits)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, 0)
+                    """,
+                    (key, scope, normalized, question, sql, now, now),
+                )
+                self._evict(con, now)
+                self._stores += 1
+        except sqlite3.Error as exc:
+            logger.warning("SQL cache store failed: %s", exc)
+
+    def _evict(self, con: sqlite3.Connection, now: float) -> None:
+        if self._ttl_seconds:
+            con.execute("DELETE FROM sql_cache WHERE created_at < ?", (now - self._ttl_seconds,))
+        con.execute(
+            """
+            DELETE FROM sql_cache WHERE cache_key IN (
+                SELECT cache_key FROM sql_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self._max_entries,),
+        )
+        self._index.clear()
+
+    def stats(self) -> SqlCacheStats:
+        with self._lock:
+            return SqlCacheStats(
+                exact_hits=self._exact_hits,
+                similar_hits=self._similar_hits,
+                misses=self._misses,
+                stores=self._stores,
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._con as con:
+            con.execute("DELETE FROM sql_cache")
+            self._index.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+_CACHES: dict[str, SqlCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def get_sql_cache(
+    db_path: str,
+    max_entries: int = 5000,
+    ttl_seconds: int = 7 * 24 * 3600,
+    similarity_threshold: float = 0.0,
+) -> SqlCache:
+    with _CACHES_LOCK:
+        cache = _CACHES.get(db_path)
+        if cache is None:
+            cache = SqlCache(db_path, max_entries, ttl_seconds, similarity_threshold)
+            _CACHES[db_path] = cache
+        return cache
+
+
+def close_sql_caches() -> None:
+    """Close every registered cache; a later ``get_sql_cache`` opens a fresh one."""
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+        _CACHES.clear()
+    for cache in caches:
+        cache.close()
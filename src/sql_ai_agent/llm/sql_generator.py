@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+import hashlib
 import re
-
-from openai import OpenAI
+from typing import Iterable, Iterator
 
 from sql_ai_agent.config import load_settings
+from sql_ai_agent.llm.client import get_async_client, get_client
+from sql_ai_agent.utils.tracing import span
 
 _SYSTEM_PROMPT = (
     "You generate a single DuckDB SQL query for the user's question. "
@@ -17,6 +19,8 @@ _EXPLAIN_PROMPT = (
     "Use 2-4 short sentences. Do not include markdown."
 )
 
+PROMPT_VERSION = hashlib.sha256(_SYSTEM_PROMPT.encode("utf-8")).hexdigest()[:12]
+
 
 def _strip_code_fences(text: str) -> str:
     if text.startswith("```"):
@@ -25,43 +29,208 @@ def _strip_code_fences(text: str) -> str:
     return text.strip()
 
 
+class _IncrementalStripper:
+    """Streaming counterpart of ``_strip_code_fences`` (or plain ``strip`` without fences).
+
+    Leading text is buffered until the opening fence can be recognised, and trailing
+    whitespace/backticks are held back until more text arrives, so the concatenated
+    output equals the non-streaming result.
+    """
+
+    _OPENING_FENCE = re.compile(r"^```[a-zA-Z]*\n")
+    _HELD_SUFFIX = re.compile(r"[\s`]*$")
+
+    def __init__(self, fences: bool = True) -> None:
+        self._head: str | None = "" if fences else None
+        self._fenced = False
+        self._pending = ""
+        self._emitted = False
+
+    def _resolve_head(self, final: bool) -> None:
+        head = self._head or ""
+        if head.startswith("```"):
+            match = self._OPENING_FENCE.match(head)
+            if match is None and "\n" not in head and not final:
+                return
+            self._fenced = True
+            if match is not None:
+                head = head[match.end() :]
+        elif len(head) < 3 and "```".startswith(head) and not final:
+            return
+        self._head = None
+        self._pending += head
+
+    def _release(self, text: str) -> str:
+        if not self._emitted:
+            text = text.lstrip()
+            self._emitted = bool(text)
+        return text
+
+    def feed(self, text: str) -> str:
+        if self._head is not None:
+            self._head += text
+            self._resolve_head(final=False)
+            if self._head is not None:
+                return ""
+        else:
+            self._pending += text
+        held = self._HELD_SUFFIX.search(self._pending).start()
+        ready, self._pending = self._pending[:held], self._pending[held:]
+        return self._release(ready)
+
+    def finish(self) -> str:
+        if self._head is not None:
+            self._resolve_head(final=True)
+        tail = self._pending
+        self._pending = ""
+        if self._fenced:
+            tail = re.sub(r"\n```$", "", tail)
+        return self._release(tail.rstrip())
+
+
+def _sql_messages(question: str, schema_context: str) -> list[dict[str, str]]:
+    return [
+        {"role": "system", "content": _SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"Schema:\n{schema_context}\n\nQuestion:\n{question}\n\nSQL:",
+        },
+    ]
+
+
+def _repair_messages(question: str, schema_context: str, sql: str, error: str) -> list[dict[str, str]]:
+    return [
+        *_sql_messages(question, schema_context),
+        {"role": "assistant", "content": sql},
+        {
+            "role": "user",
+            "content": f"DuckDB rejected this query:\n{error}\n\nReturn only the corrected SQL.",
+        },
+    ]
+
+
+def _explain_messages(sql: str, schema_context: str) -> list[dict[str, str]]:
+    return [
+        {"role": "system", "content": _EXPLAIN_PROMPT},
+        {
+            "role": "user",
+            "content": f"Schema:\n{schema_context}\n\nSQL:\n{sql}\n\nExplain:",
+        },
+    ]
+
+
+def _stream_completion(name: str, messages: list[dict[str, str]]) -> Iterable[str]:
+    settings = load_settings()
+    client = get_client(settings)
+    # Streamed responses carry no usage, so these spans only record latency.
+    with span(name):
+        stream = client.chat.completions.create(
+            model=settings.openai_model,
+            temperature=0,
+            messages=messages,
+            stream=True,
+        )
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+def _stream_stripped(tokens: Iterable[str], fences: bool) -> Iterator[str]:
+    stripper = _IncrementalStripper(fences=fences)
+    for token in tokens:
+        text = stripper.feed(token)
+        if text:
+            yield text
+    text = stripper.finish()
+    if text:
+        yield text
+
+
 def generate_sql(question: str, schema_context: str) -> str:
     settings = load_settings()
-    if not settings.openai_api_key:
-        raise ValueError("OPENAI_API_KEY is not set.")
-
-    client = OpenAI(api_key=settings.openai_api_key)
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0,
-        messages=[
-            {"role": "system", "content": _SYSTEM_PROMPT},
-            {
-                "role": "user",
-                "content": f"Schema:\n{schema_context}\n\nQuestion:\n{question}\n\nSQL:",
-            },
-        ],
-    )
+    client = get_client(settings)
+    with span("llm.generate_sql") as trace:
+        response = client.chat.completions.create(
+            model=settings.openai_model,
+            temperature=0,
+            messages=_sql_messages(question, schema_context),
+        )
+        trace.record_usage(response.usage)
 
     content = response.choices[0].message.content or ""
     return _strip_code_fences(content)
 
 
+async def agenerate_sql(question: str, schema_context: str) -> str:
+    settings = load_settings()
+    client = get_async_client(settings)
+    with span("llm.generate_sql") as trace:
+        response = await client.chat.completions.create(
+            model=settings.openai_model,
+            temperature=0,
+            messages=_sql_messages(question, schema_context),
+        )
+        trace.record_usage(response.usage)
+    return _strip_code_fences(response.choices[0].message.content or "")
+
+
+def repair_sql(question: str, schema_context: str, sql: str, error: str) -> str:
+    settings = load_settings()
+    client = get_client(settings)
+    with span("llm.repair_sql") as trace:
+        response = client.chat.completions.create(
+            model=settings.openai_model,
+            temperature=0,
+            messages=_repair_messages(question, schema_context, sql, error),
+        )
+        trace.record_usage(response.usage)
+    return _strip_code_fences(response.choices[0].message.content or "")
+
+
+async def arepair_sql(question: str, schema_context: str, sql: str, error: str) -> str:
+    settings = load_settings()
+    client = get_async_client(settings)
+    with span("llm.repair_sql") as trace:
+        response = await client.chat.completions.create(
+            model=settings.openai_model,
+            temperature=0,
+            messages=_repair_messages(question, schema_context, sql, error),
+        )
+        trace.record_usage(response.usage)
+    return _strip_code_fences(response.choices[0].message.content or "")
+
+
+def stream_sql(question: str, schema_context: str) -> Iterator[str]:
+    tokens = _stream_completion("llm.stream_sql", _sql_messages(question, schema_context))
+    return _stream_stripped(tokens, fences=True)
+
+
 def explain_sql(sql: str, schema_context: str) -> str:
     settings = load_settings()
-    if not settings.openai_api_key:
-        raise ValueError("OPENAI_API_KEY is not set.")
-
-    client = OpenAI(api_key=settings.openai_api_key)
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        temperature=0,
-        messages=[
-            {"role": "system", "content": _EXPLAIN_PROMPT},
-            {
-                "role": "user",
-                "content": f"Schema:\n{schema_context}\n\nSQL:\n{sql}\n\nExplain:",
-            },
-        ],
-    )
+    client = get_client(settings)
+    with span("llm.explain_sql") as trace:
+        response = client.chat.completions.create(
+            model=settings.openai_model,
+            temperature=0,
+            messages=_explain_messages(sql, schema_context),
+        )
+        trace.record_usage(response.usage)
     return (response.choices[0].message.content or "").strip()
+
+
+async def aexplain_sql(sql: str, schema_context: str) -> str:
+    settings = load_settings()
+    client = get_async_client(settings)
+    with span("llm.explain_sql") as trace:
+        response = await client.chat.completions.create(
+            model=settings.openai_model,
+            temperature=0,
+            messages=_explain_messages(sql, schema_context),
+        )
+        trace.record_usage(response.usage)
+    return (response.choices[0].message.content or "").strip()
+
+
+def stream_explain(sql: str, schema_context: str) -> Iterator[str]:
+    tokens = _stream_completion("llm.stream_explain", _explain_messages(sql, schema_context))
+    return _stream_stripped(tokens, fences=False)
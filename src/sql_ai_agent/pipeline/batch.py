@@ -0,0 +1,308 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Protocol
+import asyncio
+import csv
+import json
+import logging
+import time
+
+import openai
+
+from sql_ai_agent.llm.sql_generator import agenerate_sql
+from sql_ai_agent.pipeline import qa_pipeline
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BatchQuestion:
+    id: str
+    question: str
+
+
+@dataclass
+class StageStats:
+    count: int = 0
+    errors: int = 0
+    total_seconds: float = 0.0
+
+    def record(self, seconds: float, ok: bool = True) -> None:
+        self.count += 1
+        self.total_seconds += seconds
+        if not ok:
+            self.errors += 1
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.count if self.count else 0.0
+
+
+@dataclass
+class BatchReport:
+    questions: int = 0
+    failed: int = 0
+    wall_seconds: float = 0.0
+    stages: dict[str, StageStats] = field(default_factory=dict)
+
+    def stage(self, name: str) -> StageStats:
+        return self.stages.setdefault(name, StageStats())
+
+    @property
+    def questions_per_second(self) -> float:
+        return self.questions / self.wall_seconds if self.wall_seconds else 0.0
+
+    def summary_lines(self) -> list[str]:
+        lines = [
+            f"{self.questions} questions ({self.failed} failed) in {self.wall_seconds:.2f}s "
+            f"-> {self.questions_per_second:.2f} questions/s"
+        ]
+        for name, stats in self.stages.items():
+            throughput = stats.count / stats.total_seconds if stats.total_seconds else 0.0
+            lines.append(
+                f"  {name}: {stats.count} calls, {stats.errors} errors, "
+                f"mean {stats.mean_seconds * 1000:.1f} ms, {throughput:.2f} calls/s of stage time"
+            )
+        return lines
+
+
+class ResultWriter(Protocol):
+    def write(self, record: dict[str, Any]) -> None: ...
+
+    def close(self) -> None: ...
+
+
+class JsonlResultWriter:
+    def __init__(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "w", encoding="utf-8")
+
+    def write(self, record: dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, default=str) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetResultWriter:
+    _FIELDS = ("id", "question", "sql", "row_count", "error", "notes", "rows")
+
+    def __init__(self, path: str, row_group_size: int = 256) -> None:
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise RuntimeError("Parquet output requires pyarrow to be installed.") from exc
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._pa = pa
+        self._schema = pa.schema(
+            [
+                ("id", pa.string()),
+                ("question", pa.string()),
+                ("sql", pa.string()),
+                ("row_count", pa.int64()),
+                ("error", pa.string()),
+                ("notes", pa.string()),
+                ("rows", pa.string()),
+            ]
+        )
+        self._writer = pq.ParquetWriter(path, self._schema)
+        self._row_group_size = row_group_size
+        self._buffer: list[dict[str, Any]] = []
+
+    def write(self, record: dict[str, Any]) -> None:
+        row = dict(record)
+        row["notes"] = json.dumps(row.get("notes") or [])
+        row["rows"] = json.dumps(row.get("rows"), default=str) if row.get("rows") is not None else None
+        self._buffer.append({name: row.get(name) for name in self._FIELDS})
+        if len(self._buffer) >= self._row_group_size:
+            self._flush()
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._writer.write_table(self._pa.Table.from_pylist(self._buffer, schema=self._schema))
+            self._buffer = []
+
+    def close(self) -> None:
+        self._flush()
+        self._writer.close()
+
+
+def open_writer(path: str) -> ResultWriter:
+    if path.endswith(".parquet"):
+        return ParquetResultWriter(path)
+    return JsonlResultWriter(path)
+
+
+def read_questions(path: str) -> Iterator[BatchQuestion]:
+    with open(path, encoding="utf-8", newline="") as handle:
+        if path.endswith(".csv"):
+            rows: Iterable[dict[str, Any]] = csv.DictReader(handle)
+        else:
+            rows = (json.loads(line) for line in handle if line.strip())
+        for number, row in enumerate(rows, start=1):
+            question = str(row.get("question") or "").strip()
+            if question:
+                yield BatchQuestion(id=str(row.get("id") or number), question=question)
+
+
+class RateLimiter:
+    """Spaces out request starts to stay under a requests-per-minute budget."""
+
+    def __init__(self, requests_per_minute: float | None) -> None:
+        self._interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if not self._interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def back_off(self, seconds: float) -> None:
+        self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+
+async def _generate(
+    item: BatchQuestion,
+    schema_context: str,
+    limiter: RateLimiter,
+    report: BatchReport,
+    max_rate_limit_retries: int,
+) -> str:
+    attempt = 0
+    while True:
+        await limiter.acquire()
+        started = time.perf_counter()
+        try:
+            sql = await agenerate_sql(item.question, schema_context)
+        except openai.RateLimitError:
+            report.stage("generate").record(time.perf_counter() - started, ok=False)
+            if attempt >= max_rate_limit_retries:
+                raise
+            # The SDK has already retried; pause every worker before trying again.
+            limiter.back_off(2.0 ** attempt)
+            attempt += 1
+            continue
+        report.stage("generate").record(time.perf_counter() - started)
+        return sql
+
+
+async def _answer(
+    item: BatchQuestion,
+    limiter: RateLimiter,
+    report: BatchReport,
+    max_rate_limit_retries: int,
+) -> dict[str, Any]:
+    record: dict[str, Any] = {"id": item.id, "question": item.question, "sql": None, "notes": []}
+
+    async def generate(question: str, schema_context: str) -> str:
+        sql = await _generate(item, schema_context, limiter, report, max_rate_limit_retries)
+        # Kept so a question whose SQL never validates still shows what was generated.
+        record["sql"] = sql
+        return sql
+
+    try:
+        started = time.perf_counter()
+        try:
+            prepared = await qa_pipeline.aprepare_question(item.question, generate, limiter.acquire)
+        except Exception:
+            report.stage("prepare").record(time.perf_counter() - started, ok=False)
+            raise
+        report.stage("prepare").record(time.perf_counter() - started)
+        record["sql"] = prepared["sql"]
+        record["notes"] = prepared["notes"]
+
+        started = time.perf_counter()
+        try:
+            df = await qa_pipeline.aexecute_sql(prepared["sql"])
+        except Exception:
+            report.stage("execute").record(time.perf_counter() - started, ok=False)
+            raise
+        report.stage("execute").record(time.perf_counter() - started)
+        record["row_count"] = len(df)
+        record["rows"] = df.to_dict(orient="records")
+        if df.attrs.get("truncated"):
+            note = f"Only the first {len(df)} of {df.attrs['total_rows']} rows were kept."
+            record["notes"] = [*record["notes"], note]
+        record["error"] = None
+    except Exception as exc:
+        record["row_count"] = None
+        record["rows"] = None
+        record["error"] = str(exc)
+    return record
+
+
+async def arun_batch(
+    questions: Iterable[BatchQuestion],
+    writer: ResultWriter,
+    concurrency: int = 8,
+    requests_per_minute: float | None = None,
+    max_rate_limit_retries: int = 3,
+) -> BatchReport:
+    report = BatchReport()
+    wall_started = time.perf_counter()
+
+    started = time.perf_counter()
+    # Builds the shared catalog and retrieval index once; questions only rank against it.
+    # Column profiling is awaited here so every question in the batch gets the statistics.
+    await qa_pipeline.awarm_up()
+    report.stage("schema").record(time.perf_counter() - started)
+
+    limiter = RateLimiter(requests_per_minute)
+    queue: asyncio.Queue[BatchQuestion | None] = asyncio.Queue(maxsize=concurrency * 2)
+
+    async def worker() -> None:
+        while True:
+            item = await queue.get()
+            if item is None:
+                return
+            record = await _answer(item, limiter, report, max_rate_limit_retries)
+            writer.write(record)
+            report.questions += 1
+            if record["error"] is not None:
+                report.failed += 1
+                logger.warning("Question %s failed: %s", item.id, record["error"])
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        for item in questions:
+            await queue.put(item)
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+
+    report.wall_seconds = time.perf_counter() - wall_started
+    return report
+
+
+def run_batch(
+    input_path: str,
+    output_path: str,
+    concurrency: int = 8,
+    requests_per_minute: float | None = None,
+) -> BatchReport:
+    writer = open_writer(output_path)
+    try:
+        return asyncio.run(
+            arun_batch(
+                read_questions(input_path),
+                writer,
+                concurrency=concurrency,
+                requests_per_minute=requests_per_minute,
+            )
+        )
+    finally:
+        writer.close()
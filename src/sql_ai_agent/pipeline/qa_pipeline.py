@@ -1,32 +1,323 @@
 from __future__ import annotations
 
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Any, Awaitable, Callable, Iterator, TypeVar
+import asyncio
+import contextvars
+import logging
+import threading
+import time
 
-from sql_ai_agent.config import load_settings
-from sql_ai_agent.db.duckdb_client import DuckDBClient
-from sql_ai_agent.llm.sql_generator import explain_sql, generate_sql
+from sql_ai_agent.config import Settings, load_settings
+from sql_ai_agent.db.column_profiles import (
+    get_profile_store,
+    profile_annotations,
+    schedule_profiling,
+    wait_for_profiling,
+)
+from sql_ai_agent.db.connection_pool import file_signature
+from sql_ai_agent.db.duckdb_client import (
+    CancelScope,
+    DuckDBClient,
+    QueryCancelledError,
+    QueryResult,
+    QueryTimeoutError,
+)
+from sql_ai_agent.db.result_cache import (
+    CachedResult,
+    ResultCache,
+    ResultCacheStats,
+    get_result_cache,
+    result_key,
+)
+from sql_ai_agent.db.schema_catalog import SchemaCatalog, get_catalog
+from sql_ai_agent.db.summary_tables import SummaryStore, get_summary_store, refresh_summaries, schedule_refresh
+from sql_ai_agent.llm.sql_cache import CacheHit, SqlCache, SqlCacheStats, get_sql_cache, normalize_question
+from sql_ai_agent.llm.sql_generator import (
+    PROMPT_VERSION,
+    aexplain_sql,
+    agenerate_sql,
+    arepair_sql,
+    explain_sql,
+    generate_sql,
+    repair_sql,
+    stream_explain,
+    stream_sql,
+)
+from sql_ai_agent.pipeline.schema_retrieval import count_tokens, get_schema_index, prune_schema
 from sql_ai_agent.safety.sql_safety import reject_unsafe_sql
+from sql_ai_agent.storage.saved_queries import frequent_sql, list_queries, record_sql_executions
+from sql_ai_agent.utils.singleflight import SingleFlight, SingleFlightStats, WaitCancelled, WaitTimeout
+from sql_ai_agent.utils.tracing import span
 
 
-def _get_db_client() -> DuckDBClient:
-    settings = load_settings()
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_DB_EXECUTOR: ThreadPoolExecutor | None = None
+_DB_EXECUTOR_LOCK = threading.Lock()
+
+# Identical questions (and identical SQL) arriving while one is already being answered
+# wait for that answer instead of paying for another LLM call or DuckDB scan.
+_PREPARE_FLIGHT = SingleFlight("prepare_question")
+# A cancel or timeout belongs to the leader's caller; callers sharing its fetch run it again.
+_EXECUTE_FLIGHT = SingleFlight("execute_sql", retry_on=(QueryCancelledError, QueryTimeoutError))
+
+# Executions feeding the summary advisor are counted in memory and written to the SQL
+# history by one background worker, so the query path never waits on SQLite.
+_HISTORY_EXECUTOR = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sql-history")
+_HISTORY_LOCK = threading.Lock()
+_PENDING_EXECUTIONS: dict[Settings, Counter[str]] = {}
+_HISTORY_FLUSH_QUEUED = False
+
+
+def _get_db_executor() -> ThreadPoolExecutor:
+    global _DB_EXECUTOR
+    with _DB_EXECUTOR_LOCK:
+        if _DB_EXECUTOR is None:
+            settings = load_settings()
+            _DB_EXECUTOR = ThreadPoolExecutor(
+                max_workers=settings.duckdb_pool_size,
+                thread_name_prefix="duckdb",
+            )
+        return _DB_EXECUTOR
+
+
+async def run_blocking(func: Callable[..., T], *args: Any) -> T:
+    """Run a blocking call on the pipeline's DuckDB worker threads."""
+    loop = asyncio.get_running_loop()
+    # Run in a copy of the caller's context so spans opened in the worker nest under its span.
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_db_executor(), partial(context.run, func, *args))
+
+
+def _get_db_client(settings: Settings | None = None) -> DuckDBClient:
+    settings = settings or load_settings()
     db_path = settings.duckdb_path
     if db_path != ":memory:" and not Path(db_path).exists():
         raise FileNotFoundError(f"DuckDB file not found at '{db_path}'.")
-    return DuckDBClient(db_path)
+    return DuckDBClient(db_path, pool_size=settings.duckdb_pool_size, config=_duckdb_config(settings))
+
+
+def _duckdb_config(settings: Settings) -> dict[str, object]:
+    config: dict[str, object] = {}
+    if settings.duckdb_memory_limit:
+        config["memory_limit"] = settings.duckdb_memory_limit
+    if settings.duckdb_threads:
+        config["threads"] = settings.duckdb_threads
+    return config
+
+
+def _query_timeout(settings: Settings) -> float | None:
+    return settings.query_timeout_seconds or None
 
 
 def _build_schema_context(db: DuckDBClient) -> str:
-    tables = db.list_tables()
-    if not tables:
+    catalog = get_catalog(db)
+    if not catalog.tables:
         raise ValueError("No tables found in the DuckDB database.")
+    return catalog.render()
+
+
+def _get_sql_cache(settings: Settings) -> SqlCache:
+    return get_sql_cache(
+        settings.sql_cache_db,
+        max_entries=settings.sql_cache_max_entries,
+        ttl_seconds=settings.sql_cache_ttl_seconds,
+        similarity_threshold=settings.sql_cache_similarity_threshold,
+    )
+
+
+def _schema_annotations(db: DuckDBClient, settings: Settings, catalog: SchemaCatalog) -> dict:
+    if not settings.schema_profile_db:
+        return {}
+    try:
+        store = get_profile_store(settings.schema_profile_db)
+        # Profiles are refreshed in the background; until then the stored ones are used.
+        schedule_profiling(db, catalog, store, settings.schema_profile_top_values)
+        return profile_annotations(store.load(db.db_path))
+    except Exception as exc:
+        logger.warning("Column profiles unavailable: %s", exc)
+        return {}
+
+
+def _schema_for_question(db: DuckDBClient, settings: Settings, question: str) -> tuple[str, str]:
+    """Return the full schema context (the cache scope) and the one sent to the LLM."""
+    with span("pipeline.schema") as trace:
+        catalog = get_catalog(db)
+        if not catalog.tables:
+            raise ValueError("No tables found in the DuckDB database.")
+        full_context = catalog.render()
+        annotations = _schema_annotations(db, settings, catalog)
+        if not settings.schema_top_k:
+            return full_context, catalog.render(annotations)
+
+        pruned = prune_schema(
+            get_schema_index(db, catalog),
+            question,
+            top_k=settings.schema_top_k,
+            min_score=settings.schema_min_score,
+            max_columns=settings.schema_max_columns,
+            annotations=annotations,
+        )
+        trace.set(tables=len(pruned.tables), pruned=pruned.pruned)
+        if pruned.pruned and logger.isEnabledFor(logging.INFO):
+            logger.info(
+                "Schema pruned to %d of %d tables: %d -> %d prompt tokens",
+                len(pruned.tables),
+                len(catalog.tables),
+                count_tokens(full_context, settings.openai_model),
+                count_tokens(pruned.context, settings.openai_model),
+            )
+        return full_context, pruned.context
+
+
+def _lookup_cached_sql(
+    settings: Settings, question: str, schema_context: str
+) -> tuple[SqlCache, str, str | None, dict | None]:
+    """Return the cached SQL for this exact question, or a similar question's SQL as a suggestion."""
+    cache = _get_sql_cache(settings)
+    scope = SqlCache.scope_for(schema_context, settings.openai_model, PROMPT_VERSION)
+    with span("pipeline.cache_lookup") as trace:
+        hit = cache.lookup(question, scope)
+        trace.set(hit=hit is not None, exact=hit is not None and hit.exact)
+    if hit is None:
+        return cache, scope, None, None
+    if hit.exact:
+        return cache, scope, hit.sql, None
+    # Another question's SQL may answer something else, so it is only offered, never run.
+    return cache, scope, None, _suggestion(hit)
+
+
+def _suggestion(hit: CacheHit) -> dict:
+    return {"question": hit.question, "sql": hit.sql, "similarity": hit.similarity}
+
+
+def _suggestion_notes(suggestion: dict | None) -> list[str]:
+    if suggestion is None:
+        return []
+    return [f"A similar question was answered before: '{suggestion['question']}'. Its SQL is offered as a suggestion."]
+
+
+def _check_safety(sql: str) -> None:
+    with span("pipeline.safety"):
+        reject_unsafe_sql(sql)
+
+
+def _validation_error(db: DuckDBClient, sql: str) -> str | None:
+    with span("pipeline.validate") as trace:
+        try:
+            _check_safety(sql)
+        except ValueError as exc:
+            error: str | None = str(exc)
+        else:
+            error = db.explain_error(sql)
+        trace.set(valid=error is None)
+        return error
+
 
-    lines = ["Tables:"]
-    for table in tables:
-        info = db.describe_table(table)
-        columns = ", ".join(f"{row['name']} {row['type']}" for _, row in info.iterrows())
-        lines.append(f"- {table}: {columns}")
-    return "\n".join(lines)
+def _repair_note(attempt: int, error: str, validate_seconds: float, repair_seconds: float) -> str:
+    reason = error.strip().splitlines()[0][:200] if error.strip() else "unknown error"
+    return (
+        f"Attempt {attempt} failed validation in {validate_seconds * 1000:.0f} ms ({reason}); "
+        f"regenerated in {repair_seconds * 1000:.0f} ms."
+    )
+
+
+def _invalid_sql_error(attempts: int, error: str) -> ValueError:
+    return ValueError(f"Generated SQL is still invalid after {attempts} attempt(s): {error}")
+
+
+def _repaired_sql(
+    db: DuckDBClient, settings: Settings, question: str, schema_context: str, sql: str, notes: list[str]
+) -> str:
+    """Validate ``sql`` with EXPLAIN and let the model fix binder errors a bounded number of times."""
+    if not settings.sql_repair_attempts:
+        return sql
+    for attempt in range(1, settings.sql_repair_attempts + 2):
+        started = time.perf_counter()
+        error = _validation_error(db, sql)
+        validated = time.perf_counter() - started
+        if error is None:
+            return sql
+        if attempt > settings.sql_repair_attempts:
+            break
+        started = time.perf_counter()
+        repaired = repair_sql(question, schema_context, sql, error)
+        notes.append(_repair_note(attempt, error, validated, time.perf_counter() - started))
+        if not repaired.strip() or repaired == sql:
+            break
+        sql = repaired
+    raise _invalid_sql_error(attempt, error)
+
+
+async def _arepaired_sql(
+    db: DuckDBClient,
+    settings: Settings,
+    question: str,
+    schema_context: str,
+    sql: str,
+    notes: list[str],
+    before_repair: Callable[[], Awaitable[None]] | None = None,
+) -> str:
+    if not settings.sql_repair_attempts:
+        return sql
+    for attempt in range(1, settings.sql_repair_attempts + 2):
+        started = time.perf_counter()
+        error = await run_blocking(_validation_error, db, sql)
+        validated = time.perf_counter() - started
+        if error is None:
+            return sql
+        if attempt > settings.sql_repair_attempts:
+            break
+        if before_repair is not None:
+            await before_repair()
+        started = time.perf_counter()
+        repaired = await arepair_sql(question, schema_context, sql, error)
+        notes.append(_repair_note(attempt, error, validated, time.perf_counter() - started))
+        if not repaired.strip() or repaired == sql:
+            break
+        sql = repaired
+    raise _invalid_sql_error(attempt, error)
+
+
+def _flight_key(scope: str, question: str) -> tuple[str, str]:
+    return scope, normalize_question(question)
+
+
+def _generate_validated(
+    db: DuckDBClient, settings: Settings, question: str, schema_context: str, cache: SqlCache, scope: str
+) -> tuple[str, list[str]]:
+    notes: list[str] = []
+    sql = generate_sql(question, schema_context)
+    sql = _repaired_sql(db, settings, question, schema_context, sql, notes)
+    cache.store(question, scope, sql)
+    return sql, notes
+
+
+async def _agenerate_validated(
+    db: DuckDBClient,
+    settings: Settings,
+    question: str,
+    schema_context: str,
+    cache: SqlCache,
+    scope: str,
+    generate: Callable[[str, str], Awaitable[str]],
+    before_repair: Callable[[], Awaitable[None]] | None,
+) -> tuple[str, list[str]]:
+    notes: list[str] = []
+    sql = await generate(question, schema_context)
+    sql = await _arepaired_sql(db, settings, question, schema_context, sql, notes, before_repair)
+    await run_blocking(cache.store, question, scope, sql)
+    return sql, notes
+
+
+def singleflight_stats() -> dict[str, SingleFlightStats]:
+    return {flight.name: flight.stats() for flight in (_PREPARE_FLIGHT, _EXECUTE_FLIGHT)}
 
 
 def get_schema_context() -> str:
@@ -34,30 +325,426 @@ def get_schema_context() -> str:
     return _build_schema_context(db)
 
 
+def warm_up() -> None:
+    """Build the schema catalog and retrieval index and finish column profiling up front."""
+    settings = load_settings()
+    _schema_for_question(_get_db_client(settings), settings, "")
+    wait_for_profiling()
+
+
+async def awarm_up() -> None:
+    await run_blocking(warm_up)
+
+
 def prepare_question(question: str) -> dict:
     if not question.strip():
         raise ValueError("Question cannot be empty.")
 
-    db = _get_db_client()
-    schema_context = _build_schema_context(db)
-    sql = generate_sql(question, schema_context)
-    return {"sql": sql, "schema_context": schema_context, "notes": []}
+    with span("pipeline.prepare_question"):
+        settings = load_settings()
+        db = _get_db_client(settings)
+        full_context, schema_context = _schema_for_question(db, settings, question)
+        cache, scope, cached_sql, suggestion = _lookup_cached_sql(settings, question, full_context)
+        notes = _suggestion_notes(suggestion)
+        if cached_sql is not None:
+            sql = cached_sql
+        else:
+            sql, generated_notes = _PREPARE_FLIGHT.do(
+                _flight_key(scope, question),
+                _generate_validated,
+                db,
+                settings,
+                question,
+                schema_context,
+                cache,
+                scope,
+            )
+            notes.extend(generated_notes)
+        return {"sql": sql, "schema_context": schema_context, "notes": notes, "suggestion": suggestion}
+
+
+def prepare_question_stream(question: str) -> Iterator[dict]:
+    """Yield ``{"type": "sql_delta", "text": ...}`` events, then ``{"type": "result", ...}``."""
+    if not question.strip():
+        raise ValueError("Question cannot be empty.")
+
+    with span("pipeline.prepare_question"):
+        settings = load_settings()
+        db = _get_db_client(settings)
+        full_context, schema_context = _schema_for_question(db, settings, question)
+        cache, scope, cached_sql, suggestion = _lookup_cached_sql(settings, question, full_context)
+        notes = _suggestion_notes(suggestion)
+        if cached_sql is not None:
+            sql = cached_sql
+            yield {"type": "sql_delta", "text": sql}
+        else:
+            key = _flight_key(scope, question)
+            call, leader = _PREPARE_FLIGHT.claim(key)
+            if not leader:
+                sql, generated_notes = call.result()
+                notes.extend(generated_notes)
+                yield {"type": "sql_delta", "text": sql}
+            else:
+                try:
+                    parts: list[str] = []
+                    generated_notes: list[str] = []
+                    for text in stream_sql(question, schema_context):
+                        parts.append(text)
+                        yield {"type": "sql_delta", "text": text}
+                    sql = _repaired_sql(db, settings, question, schema_context, "".join(parts), generated_notes)
+                    cache.store(question, scope, sql)
+                except BaseException as exc:
+                    _PREPARE_FLIGHT.complete(key, call, error=exc)
+                    raise
+                _PREPARE_FLIGHT.complete(key, call, (sql, list(generated_notes)))
+                notes.extend(generated_notes)
+        result = {"sql": sql, "schema_context": schema_context, "notes": notes, "suggestion": suggestion}
+        yield {"type": "result", "result": result}
+
+
+async def aprepare_question(
+    question: str,
+    generate: Callable[[str, str], Awaitable[str]] | None = None,
+    before_repair: Callable[[], Awaitable[None]] | None = None,
+) -> dict:
+    """Async ``prepare_question``.
+
+    ``generate`` replaces ``agenerate_sql`` and ``before_repair`` is awaited before each
+    repair call, so callers can rate-limit and count LLM requests.
+    """
+    if not question.strip():
+        raise ValueError("Question cannot be empty.")
 
+    with span("pipeline.prepare_question"):
+        settings = load_settings()
+        db = await run_blocking(_get_db_client, settings)
+        full_context, schema_context = await run_blocking(_schema_for_question, db, settings, question)
+        cache, scope, cached_sql, suggestion = await run_blocking(_lookup_cached_sql, settings, question, full_context)
+        notes = _suggestion_notes(suggestion)
+        if cached_sql is not None:
+            sql = cached_sql
+        else:
+            sql, generated_notes = await _PREPARE_FLIGHT.ado(
+                _flight_key(scope, question),
+                lambda: _agenerate_validated(
+                    db, settings, question, schema_context, cache, scope, generate or agenerate_sql, before_repair
+                ),
+            )
+            notes.extend(generated_notes)
+        return {"sql": sql, "schema_context": schema_context, "notes": notes, "suggestion": suggestion}
 
-def execute_sql(sql: str):
+
+def _get_result_cache(settings: Settings) -> ResultCache:
+    return get_result_cache(
+        max_entries=settings.result_cache_max_entries,
+        max_bytes=settings.result_cache_max_bytes,
+        spill_dir=settings.result_cache_spill_dir,
+        max_spill_bytes=settings.result_cache_max_spill_bytes,
+    )
+
+
+def _summary_workload(settings: Settings) -> list[tuple[str, int]]:
+    workload = [(query.sql, 1) for query in list_queries(settings.saved_queries_db)]
+    return workload + frequent_sql(settings.saved_queries_db)
+
+
+def _summary_store(settings: Settings) -> SummaryStore:
+    return get_summary_store(settings.summary_db, settings.duckdb_pool_size, _duckdb_config(settings))
+
+
+def _schedule_summary_refresh(db_path: str, store: SummaryStore, settings: Settings, force: bool = False) -> None:
+    schedule_refresh(
+        db_path,
+        store,
+        partial(_summary_workload, settings),
+        settings.summary_min_executions,
+        settings.summary_max_tables,
+        force,
+    )
+
+
+def _record_execution(settings: Settings, sql: str) -> None:
+    global _HISTORY_FLUSH_QUEUED
+    if not settings.summary_db:
+        return
+    with _HISTORY_LOCK:
+        _PENDING_EXECUTIONS.setdefault(settings, Counter())[sql] += 1
+        if not _HISTORY_FLUSH_QUEUED:
+            _HISTORY_FLUSH_QUEUED = True
+            _HISTORY_EXECUTOR.submit(_flush_sql_history)
+
+
+def _flush_sql_history() -> None:
+    global _HISTORY_FLUSH_QUEUED
+    with _HISTORY_LOCK:
+        pending = dict(_PENDING_EXECUTIONS)
+        _PENDING_EXECUTIONS.clear()
+        _HISTORY_FLUSH_QUEUED = False
+    for settings, counts in pending.items():
+        try:
+            totals = record_sql_executions(settings.saved_queries_db, counts)
+        except Exception as exc:
+            logger.warning("Could not record SQL history: %s", exc)
+            continue
+        threshold = settings.summary_min_executions
+        # A statement just became hot, so summaries built before it miss it; rebuild now
+        # instead of waiting for the source to change or the summaries to age out.
+        if any(total - counts[sql] < threshold <= total for sql, total in totals.items()):
+            if file_signature(settings.duckdb_path) is not None:
+                _schedule_summary_refresh(settings.duckdb_path, _summary_store(settings), settings, force=True)
+
+
+def wait_for_sql_history() -> None:
+    """Block until executions recorded so far are written to the SQL history."""
+    _HISTORY_EXECUTOR.submit(lambda: None).result()
+
+
+def _summary_route(db: DuckDBClient, sql: str, settings: Settings) -> tuple[DuckDBClient, str]:
+    """Point aggregate ``sql`` at a matching summary table when one is up to date."""
+    if not settings.summary_db or file_signature(db.db_path) is None:
+        return db, sql
+    store = _summary_store(settings)
+    if not store.is_current(db.db_path, settings.summary_max_age_seconds):
+        _schedule_summary_refresh(db.db_path, store, settings)
+    # Summaries past their age still match an unchanged source, so they serve until rebuilt.
+    with span("pipeline.summary_rewrite") as trace:
+        rewritten = store.rewrite(sql, db.db_path)
+        trace.set(rewritten=rewritten is not None)
+    if rewritten is None:
+        return db, sql
+    summaries = DuckDBClient(store.path, pool_size=settings.duckdb_pool_size, config=_duckdb_config(settings))
+    return summaries, rewritten
+
+
+def build_summary_tables(summary_db: str | None = None) -> list[str]:
+    """Mine saved and executed SQL for hot aggregates and rebuild the summary sidecar now."""
+    settings = load_settings()
+    summary_db = summary_db or settings.summary_db
+    if not summary_db:
+        raise ValueError("Set SUMMARY_DB to choose where summary tables are stored.")
+    db = _get_db_client(settings)
+    return refresh_summaries(
+        db.db_path,
+        get_summary_store(summary_db, settings.duckdb_pool_size, _duckdb_config(settings)),
+        partial(_summary_workload, settings),
+        settings.summary_min_executions,
+        settings.summary_max_tables,
+    )
+
+
+def _fetch_capped(db: DuckDBClient, sql: str, settings: Settings, scope: CancelScope | None) -> CachedResult:
+    db, sql = _summary_route(db, sql, settings)
+    timeout = _query_timeout(settings)
+    cap = settings.max_result_rows
+    table = db.query_arrow(sql, cap + 1, timeout=timeout, scope=scope)
+    if table.num_rows <= cap:
+        return CachedResult(table, table.num_rows)
+    total_rows = db.count_rows(sql, timeout=timeout, scope=scope)
+    return CachedResult(table.slice(0, cap), total_rows)
+
+
+def _fetch_shared(
+    db: DuckDBClient, sql: str, settings: Settings, scope: CancelScope | None, signature: object
+) -> CachedResult:
+    # Arrow tables are immutable, so one fetch can be handed to every caller waiting on it.
+    # A caller waiting on another's fetch keeps its own deadline and cancel button; giving
+    # up leaves the shared fetch running for the others.
+    key = result_key(sql, db.db_path, signature, settings.max_result_rows)
+    timeout = _query_timeout(settings)
+    try:
+        return _EXECUTE_FLIGHT.do(
+            key,
+            _fetch_capped,
+            db,
+            sql,
+            settings,
+            scope,
+            timeout=timeout,
+            cancelled=None if scope is None else (lambda: scope.cancelled),
+        )
+    except WaitCancelled as exc:
+        raise QueryCancelledError("Query was cancelled.") from exc
+    except WaitTimeout as exc:
+        raise QueryTimeoutError(f"Query exceeded the {timeout:g}s execution budget.") from exc
+
+
+def _cached_result(
+    db: DuckDBClient, sql: str, settings: Settings, scope: CancelScope | None
+) -> CachedResult | None:
+    cache = _get_result_cache(settings)
+    signature = file_signature(db.db_path)
+    if not cache.enabled or signature is None:
+        return None
+    key = result_key(sql, db.db_path, signature, settings.max_result_rows)
+    cached = cache.get(key, db.db_path, signature)
+    if cached is None:
+        cached = _fetch_shared(db, sql, settings, scope, signature)
+        cache.put(key, db.db_path, signature, cached)
+    return cached
+
+
+def _capped_frame(df: Any, total_rows: int, row_cap: int) -> Any:
+    df.attrs["total_rows"] = total_rows
+    df.attrs["truncated"] = total_rows > row_cap
+    return df
+
+
+def execute_sql(sql: str, scope: CancelScope | None = None):
+    """Return at most ``max_result_rows`` rows as a DataFrame.
+
+    ``df.attrs["total_rows"]`` holds the full row count and ``df.attrs["truncated"]``
+    says whether rows were cut at the cap.
+    """
     if not sql.strip():
         raise ValueError("SQL is empty.")
 
-    reject_unsafe_sql(sql)
-    db = _get_db_client()
-    return db.query(sql)
+    _check_safety(sql)
+    settings = load_settings()
+    db = _get_db_client(settings)
+    _record_execution(settings, sql)
+    with span("pipeline.execute") as trace:
+        cached = _cached_result(db, sql, settings, scope)
+        trace.set(result_cache=cached is not None)
+        cap = settings.max_result_rows
+        if cached is not None:
+            return _capped_frame(db.arrow_to_df(cached.table), cached.total_rows, cap)
+        db, sql = _summary_route(db, sql, settings)
+        timeout = _query_timeout(settings)
+        # One extra row tells whether the cap cut the result without counting every time.
+        df = db.query_page(sql, cap + 1, timeout=timeout, scope=scope)
+        if len(df) <= cap:
+            return _capped_frame(df, len(df), cap)
+        total_rows = db.count_rows(sql, timeout=timeout, scope=scope)
+        return _capped_frame(df.iloc[:cap].copy(), total_rows, cap)
+
+
+def execute_sql_page(
+    sql: str,
+    page: int = 0,
+    page_size: int | None = None,
+    total_rows: int | None = None,
+    scope: CancelScope | None = None,
+) -> QueryResult:
+    if not sql.strip():
+        raise ValueError("SQL is empty.")
+    if page < 0:
+        raise ValueError("Page must be zero or positive.")
+
+    _check_safety(sql)
+    settings = load_settings()
+    db = _get_db_client(settings)
+    if page == 0:
+        _record_execution(settings, sql)
+    with span("pipeline.execute") as trace:
+        page_size = page_size or settings.result_page_size
+        offset = page * page_size
+        cached = _cached_result(db, sql, settings, scope)
+        trace.set(result_cache=cached is not None, page=page)
+        if cached is not None:
+            total_rows = cached.total_rows
+            df = db.arrow_to_df(cached.table.slice(offset, page_size))
+        else:
+            db, sql = _summary_route(db, sql, settings)
+            timeout = _query_timeout(settings)
+            if total_rows is None:
+                total_rows = db.count_rows(sql, timeout=timeout, scope=scope)
+            limit = max(0, min(page_size, min(total_rows, settings.max_result_rows) - offset))
+            df = db.query_page(sql, limit, offset, timeout=timeout, scope=scope)
+    return QueryResult(
+        df=df,
+        total_rows=total_rows,
+        row_cap=settings.max_result_rows,
+        page=page,
+        page_size=page_size,
+    )
+
+
+def execute_sql_arrow(sql: str, scope: CancelScope | None = None) -> CachedResult:
+    """Return up to ``max_result_rows`` rows as an Arrow table, with the full row count."""
+    if not sql.strip():
+        raise ValueError("SQL is empty.")
+
+    _check_safety(sql)
+    settings = load_settings()
+    db = _get_db_client(settings)
+    _record_execution(settings, sql)
+    with span("pipeline.execute") as trace:
+        cached = _cached_result(db, sql, settings, scope)
+        trace.set(result_cache=cached is not None)
+        if cached is not None:
+            return cached
+        return _fetch_shared(db, sql, settings, scope, file_signature(db.db_path))
+
+
+def result_cache_stats() -> ResultCacheStats:
+    return _get_result_cache(load_settings()).stats()
+
+
+def sql_cache_stats() -> SqlCacheStats:
+    return _get_sql_cache(load_settings()).stats()
+
+
+async def aexecute_sql(sql: str, scope: CancelScope | None = None):
+    return await run_blocking(execute_sql, sql, scope)
+
+
+async def aexecute_sql_page(
+    sql: str,
+    page: int = 0,
+    page_size: int | None = None,
+    total_rows: int | None = None,
+    scope: CancelScope | None = None,
+) -> QueryResult:
+    return await run_blocking(execute_sql_page, sql, page, page_size, total_rows, scope)
+
+
+async def aexecute_sql_arrow(sql: str, scope: CancelScope | None = None) -> CachedResult:
+    return await run_blocking(execute_sql_arrow, sql, scope)
+
+
+def _with_row_counts(result: dict) -> dict:
+    result["total_rows"] = result["df"].attrs["total_rows"]
+    result["truncated"] = result["df"].attrs["truncated"]
+    return result
 
 
 def run(question: str) -> dict:
     result = prepare_question(question)
     result["df"] = execute_sql(result["sql"])
-    return result
+    return _with_row_counts(result)
+
+
+async def aexecute_and_explain(
+    sql: str,
+    schema_context: str,
+    scope: CancelScope | None = None,
+    paged: bool = False,
+) -> tuple[Any, str]:
+    """Run the query and explain it together; ``paged`` returns the first page instead of a frame."""
+    # Both only need the generated SQL, so the explanation round trip overlaps the scan.
+    execute = aexecute_sql_page(sql, scope=scope) if paged else aexecute_sql(sql, scope)
+    result, explanation = await asyncio.gather(execute, aexplain(sql, schema_context))
+    return result, explanation
+
+
+async def arun(question: str, explain: bool = False) -> dict:
+    result = await aprepare_question(question)
+    if explain:
+        result["df"], result["explanation"] = await aexecute_and_explain(
+            result["sql"], result["schema_context"]
+        )
+    else:
+        result["df"] = await aexecute_sql(result["sql"])
+    return _with_row_counts(result)
 
 
 def explain(sql: str, schema_context: str) -> str:
     return explain_sql(sql, schema_context)
+
+
+async def aexplain(sql: str, schema_context: str) -> str:
+    return await aexplain_sql(sql, schema_context)
+
+
+def explain_stream(sql: str, schema_context: str) -> Iterator[str]:
+    return stream_explain(sql, schema_context)
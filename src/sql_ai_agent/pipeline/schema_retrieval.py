@@ -0,0 +1,185 @@
+from __future__ import annotations
+
+from collections import Counter
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Mapping
+import logging
+import math
+import re
+import threading
+
+from sql_ai_agent.db.duckdb_client import DuckDBClient
+from sql_ai_agent.db.schema_catalog import ColumnInfo, SchemaCatalog, TableInfo, render_tables
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+_CAMEL_BOUNDARY = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+_SAMPLE_ROWS = 100
+_SAMPLE_VALUES_PER_COLUMN = 5
+_TEXT_TYPES = ("VARCHAR", "TEXT", "STRING", "CHAR")
+
+
+def tokenize(text: str) -> list[str]:
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(_CAMEL_BOUNDARY.sub(" ", text).lower()):
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, documents: list[list[str]], k1: float = 1.5, b: float = 0.75) -> None:
+        self._k1 = k1
+        self._b = b
+        self._frequencies = [Counter(document) for document in documents]
+        self._lengths = [len(document) for document in documents]
+        self._average_length = sum(self._lengths) / len(documents) if documents else 0.0
+        document_frequency: Counter[str] = Counter()
+        for frequencies in self._frequencies:
+            document_frequency.update(frequencies.keys())
+        count = len(documents)
+        self._idf = {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()
+        }
+
+    def scores(self, query: list[str]) -> list[float]:
+        results = []
+        for frequencies, length in zip(self._frequencies, self._lengths):
+            score = 0.0
+            relative_length = length / self._average_length if self._average_length else 0.0
+            norm = self._k1 * (1 - self._b + self._b * relative_length)
+            for term in query:
+                tf = frequencies.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self._k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+@dataclass(frozen=True)
+class SchemaIndex:
+    catalog: SchemaCatalog
+    tables: BM25Index
+    columns: dict[str, BM25Index]
+
+
+@dataclass(frozen=True)
+class PrunedSchema:
+    context: str
+    tables: tuple[str, ...]
+    pruned: bool
+    top_score: float
+
+
+def _quote(identifier: str) -> str:
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _sample_values(db: DuckDBClient, table: TableInfo) -> dict[str, list[str]]:
+    text_columns = [column.name for column in table.columns if column.type.upper().startswith(_TEXT_TYPES)]
+    if not text_columns:
+        return {}
+    select = ", ".join(_quote(name) for name in text_columns)
+    rows = db.fetch_rows(f"SELECT {select} FROM {_quote(table.name)} LIMIT {_SAMPLE_ROWS}")
+    samples: dict[str, list[str]] = {}
+    for index, name in enumerate(text_columns):
+        values = dict.fromkeys(str(row[index])[:40] for row in rows if row[index] is not None)
+        samples[name] = list(values)[:_SAMPLE_VALUES_PER_COLUMN]
+    return samples
+
+
+def _column_document(column: ColumnInfo, samples: list[str]) -> list[str]:
+    return tokenize(" ".join([column.name, column.comment or "", *samples]))
+
+
+def build_schema_index(db: DuckDBClient, catalog: SchemaCatalog) -> SchemaIndex:
+    table_documents = []
+    column_indexes: dict[str, BM25Index] = {}
+    for table in catalog.tables:
+        try:
+            samples = _sample_values(db, table)
+        except Exception as exc:
+            logger.warning("Could not sample values from %s: %s", table.name, exc)
+            samples = {}
+        column_documents = [_column_document(column, samples.get(column.name, [])) for column in table.columns]
+        column_indexes[table.name] = BM25Index(column_documents)
+        # Table names are repeated so they outweigh any single column or sample value.
+        name_tokens = tokenize(table.name)
+        document = name_tokens * 3 + tokenize(table.comment or "")
+        for column_document in column_documents:
+            document.extend(column_document)
+        table_documents.append(document)
+    return SchemaIndex(catalog=catalog, tables=BM25Index(table_documents), columns=column_indexes)
+
+
+_INDEXES: dict[str, SchemaIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def get_schema_index(db: DuckDBClient, catalog: SchemaCatalog) -> SchemaIndex:
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(db.db_path)
+        if index is None or index.catalog is not catalog:
+            index = build_schema_index(db, catalog)
+            _INDEXES[db.db_path] = index
+        return index
+
+
+def _prune_columns(table: TableInfo, index: BM25Index, query: list[str], max_columns: int) -> TableInfo:
+    if len(table.columns) <= max_columns:
+        return table
+    scores = index.scores(query)
+    ranked = sorted(range(len(table.columns)), key=lambda i: (-scores[i], i))[:max_columns]
+    keep = sorted(ranked)
+    return TableInfo(table.name, tuple(table.columns[i] for i in keep), table.comment)
+
+
+def prune_schema(
+    index: SchemaIndex,
+    question: str,
+    top_k: int = 8,
+    min_score: float = 1.0,
+    max_columns: int = 50,
+    annotations: Mapping[tuple[str, str | None], str] | None = None,
+) -> PrunedSchema:
+    catalog = index.catalog
+    query = tokenize(question)
+    scores = index.tables.scores(query)
+    top_score = max(scores, default=0.0)
+    if len(catalog.tables) <= top_k or top_score < min_score:
+        # Small catalogs gain nothing from pruning, and a weak best match means the
+        # question does not name the schema well enough to drop anything safely.
+        return PrunedSchema(catalog.render(annotations), tuple(catalog.table_names()), False, top_score)
+
+    ranked = sorted(range(len(catalog.tables)), key=lambda i: (-scores[i], i))
+    selected = sorted(i for i in ranked[:top_k] if scores[i] > 0)
+    tables = [
+        _prune_columns(catalog.tables[i], index.columns[catalog.tables[i].name], query, max_columns)
+        for i in selected
+    ]
+    return PrunedSchema(render_tables(tables, annotations), tuple(table.name for table in tables), True, top_score)
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    try:
+        import tiktoken
+
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as exc:
+        # tiktoken may be missing or unable to fetch its encoding files offline.
+        logger.debug("tiktoken unavailable, estimating token counts: %s", exc)
+        return None
+
+
+def count_tokens(text: str, model: str) -> int:
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text))
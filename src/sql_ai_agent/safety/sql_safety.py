@@ -1,6 +1,8 @@
 from __future__ import annotations
 
+from functools import lru_cache
 import re
+import string
 
 _BLOCKED_KEYWORDS = (
     "INSERT",
@@ -16,23 +18,64 @@ _BLOCKED_KEYWORDS = (
     "IMPORT",
 )
 
-_BLOCK_PATTERN = re.compile(r"\b(" + "|".join(_BLOCKED_KEYWORDS) + r")\b", re.IGNORECASE)
+_READ_STATEMENTS = (
+    "SELECT",
+    "WITH",
+    "VALUES",
+    "FROM",
+    "TABLE",
+    "SHOW",
+    "DESCRIBE",
+    "SUMMARIZE",
+    "EXPLAIN",
+    "PIVOT",
+    "UNPIVOT",
+)
 
+_BLOCKED_WORDS = frozenset(_BLOCKED_KEYWORDS)
+_LEADING_PATTERN = re.compile(r"[\s(]*(" + "|".join(_READ_STATEMENTS) + r")\b", re.IGNORECASE)
 
-def _has_multiple_statements(sql: str) -> bool:
-    stripped = sql.strip()
-    if ";" not in stripped:
-        return False
-    parts = [part for part in stripped.split(";") if part.strip()]
-    return len(parts) != 1
+# String literals (plain, E'' with backslash escapes, dollar-quoted), quoted identifiers
+# and comments are blanked out in one scan, so keywords and semicolons inside them are
+# ignored. Every branch starts with a literal character, which keeps the scan fast.
+# The result cache reuses it to tell comments from literals when building cache keys.
+OPAQUE_PATTERN = re.compile(
+    r"""
+    '(?<=[eE]')(?<![\w$][eE]')[^'\\]*(?:(?:\\.|'')[^'\\]*)*'
+    | '[^']*(?:''[^']*)*'
+    | "[^"]*(?:""[^"]*)*"
+    | --[^\n]*
+    | /\*.*?\*/
+    | \$(\w*)\$.*?\$\1\$
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+_WORD_BREAKS = str.maketrans({char: " " for char in string.punctuation if char != "_"})
+
+
+def _code_only(sql: str) -> str:
+    return OPAQUE_PATTERN.sub(" ", sql)
 
 
+def _statements(code: str) -> list[str]:
+    return [part for part in code.split(";") if part.strip()]
+
+
+def _has_blocked_keyword(code: str) -> bool:
+    return not _BLOCKED_WORDS.isdisjoint(code.upper().translate(_WORD_BREAKS).split())
+
+
+@lru_cache(maxsize=4096)
 def is_read_only(sql: str) -> bool:
     if not sql or not sql.strip():
         return False
-    if _has_multiple_statements(sql):
+    code = _code_only(sql)
+    statements = _statements(code)
+    if len(statements) != 1:
+        return False
+    if not _LEADING_PATTERN.match(statements[0]):
         return False
-    if _BLOCK_PATTERN.search(sql):
+    if _has_blocked_keyword(code):
         return False
     return True
 
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
 from datetime import datetime, timezone
 from pathlib import Path
+from typing import Any, Iterable, Iterator, Mapping
+import json
+import queue
+import re
 import sqlite3
+import threading
 
 
 @dataclass(frozen=True)
@@ -27,13 +33,292 @@ CREATE TABLE IF NOT EXISTS saved_queries (
     tag TEXT,
     notes TEXT
 );
+CREATE INDEX IF NOT EXISTS idx_saved_queries_created_at ON saved_queries (created_at);
+CREATE INDEX IF NOT EXISTS idx_saved_queries_tag ON saved_queries (tag);
+CREATE VIRTUAL TABLE IF NOT EXISTS saved_queries_fts USING fts5(
+    name,
+    question,
+    tag,
+    content='saved_queries',
+    content_rowid='id',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS saved_queries_fts_insert AFTER INSERT ON saved_queries BEGIN
+    INSERT INTO saved_queries_fts (rowid, name, question, tag) VALUES (new.id, new.name, new.question, new.tag);
+END;
+CREATE TRIGGER IF NOT EXISTS saved_queries_fts_delete AFTER DELETE ON saved_queries BEGIN
+    INSERT INTO saved_queries_fts (saved_queries_fts, rowid, name, question, tag)
+    VALUES ('delete', old.id, old.name, old.question, old.tag);
+END;
+CREATE TRIGGER IF NOT EXISTS saved_queries_fts_update AFTER UPDATE ON saved_queries BEGIN
+    INSERT INTO saved_queries_fts (saved_queries_fts, rowid, name, question, tag)
+    VALUES ('delete', old.id, old.name, old.question, old.tag);
+    INSERT INTO saved_queries_fts (rowid, name, question, tag) VALUES (new.id, new.name, new.question, new.tag);
+END;
+CREATE TABLE IF NOT EXISTS sql_history (
+    sql_key TEXT PRIMARY KEY,
+    sql TEXT NOT NULL,
+    executions INTEGER NOT NULL,
+    last_executed_at TEXT NOT NULL
+);
+"""
+
+_COLUMNS = "q.id, q.name, q.question, q.sql, q.created_at, q.tag, q.notes"
+# Matches in the name rank above matches in the question, which rank above tag matches.
+_RANK = "bm25(saved_queries_fts, 10.0, 5.0, 2.0)"
+_TERM = re.compile(r"\w+")
+
+# Statements are module constants so each pooled connection compiles them once and
+# then reuses them from sqlite3's per-connection statement cache.
+_INSERT_SQL = """
+INSERT INTO saved_queries (name, question, sql, created_at, tag, notes)
+VALUES (:name, :question, :sql, :created_at, :tag, :notes)
 """
+_SEARCH_SQL = f"""
+SELECT {_COLUMNS}
+FROM saved_queries_fts
+JOIN saved_queries AS q ON q.id = saved_queries_fts.rowid
+WHERE saved_queries_fts MATCH ?
+ORDER BY {_RANK}, q.created_at DESC
+LIMIT ? OFFSET ?
+"""
+_LIST_SQL = f"""
+SELECT {_COLUMNS}
+FROM saved_queries AS q
+ORDER BY q.created_at DESC
+LIMIT ? OFFSET ?
+"""
+_SEARCH_COUNT_SQL = "SELECT COUNT(*) FROM saved_queries_fts WHERE saved_queries_fts MATCH ?"
+_COUNT_SQL = "SELECT COUNT(*) FROM saved_queries"
+_GET_SQL = f"SELECT {_COLUMNS} FROM saved_queries AS q WHERE q.id = ?"
+_DELETE_SQL = "DELETE FROM saved_queries WHERE id = ?"
+_EXPORT_SQL = f"SELECT {_COLUMNS} FROM saved_queries AS q ORDER BY q.id"
+_RECORD_SQL = """
+INSERT INTO sql_history (sql_key, sql, executions, last_executed_at) VALUES (?, ?, ?, ?)
+ON CONFLICT (sql_key) DO UPDATE SET
+    executions = executions + excluded.executions,
+    last_executed_at = excluded.last_executed_at
+RETURNING executions
+"""
+_FREQUENT_SQL = "SELECT sql, executions FROM sql_history ORDER BY executions DESC, last_executed_at DESC LIMIT ?"
+
+
+def search_expression(search: str) -> str | None:
+    """Turn free text into an FTS5 query where every word must match as a prefix."""
+    terms = _TERM.findall(search)
+    return " ".join(f'"{term}"*' for term in terms) or None
+
+
+def _row_to_query(row: sqlite3.Row) -> SavedQuery:
+    return SavedQuery(
+        id=row["id"],
+        name=row["name"],
+        question=row["question"],
+        sql=row["sql"],
+        created_at=row["created_at"],
+        tag=row["tag"],
+        notes=row["notes"],
+    )
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _insert_params(query: Mapping[str, Any]) -> dict[str, Any]:
+    return {
+        "name": query["name"],
+        "question": query["question"],
+        "sql": query["sql"],
+        "created_at": query.get("created_at") or _now(),
+        "tag": query.get("tag"),
+        "notes": query.get("notes"),
+    }
+
+
+class SavedQueryStore:
+    """Saved queries in SQLite, shared through a small pool of long-lived connections.
+
+    Connections run in WAL mode with ``synchronous=NORMAL``, so readers do not block the
+    writer, and commits skip the fsync of rollback-journal mode.
+    """
+
+    def __init__(self, db_path: str, pool_size: int = 4, timeout: float = 30.0) -> None:
+        if pool_size < 1:
+            raise ValueError("Pool size must be at least 1.")
+        self._db_path = db_path
+        self._timeout = timeout
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        with self._connection() as con:
+            indexed = con.execute("SELECT 1 FROM sqlite_master WHERE name = 'saved_queries_fts'").fetchone()
+            con.executescript(_SCHEMA)
+            if not indexed:
+                # Databases created before the index existed need their rows indexed once.
+                with con:
+                    con.execute("INSERT INTO saved_queries_fts (saved_queries_fts) VALUES ('rebuild')")
+
+    @property
+    def db_path(self) -> str:
+        return self._db_path
+
+    def _open(self) -> sqlite3.Connection:
+        con = sqlite3.connect(
+            self._db_path,
+            timeout=self._timeout,
+            check_same_thread=False,
+            cached_statements=128,
+        )
+        con.row_factory = sqlite3.Row
+        con.execute("PRAGMA journal_mode=WAL")
+        con.execute("PRAGMA synchronous=NORMAL")
+        return con
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        self._slots.acquire()
+        try:
+            if self._closed:
+                raise RuntimeError("Saved query store is closed.")
+            try:
+                con = self._idle.get_nowait()
+            except queue.Empty:
+                con = self._open()
+            try:
+                yield con
+            finally:
+                self._release(con)
+        finally:
+            self._slots.release()
+
+    def _release(self, con: sqlite3.Connection) -> None:
+        with self._lock:
+            if not self._closed:
+                self._idle.put(con)
+                return
+        # Connections in use while the store closed are closed as they come back.
+        con.close()
+
+    def save(
+        self,
+        name: str,
+        question: str,
+        sql: str,
+        tag: str | None = None,
+        notes: str | None = None,
+    ) -> int:
+        params = _insert_params({"name": name, "question": question, "sql": sql, "tag": tag, "notes": notes})
+        with self._connection() as con, con:
+            return int(con.execute(_INSERT_SQL, params).lastrowid)
+
+    def save_many(self, queries: Iterable[Mapping[str, Any]]) -> int:
+        """Insert many queries in one transaction; ``created_at`` is kept when given."""
+        rows = [_insert_params(query) for query in queries]
+        with self._connection() as con, con:
+            con.executemany(_INSERT_SQL, rows)
+        return len(rows)
+
+    def list_queries(
+        self,
+        search: str | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[SavedQuery]:
+        expression = search_expression(search) if search else None
+        page = (-1 if limit is None else limit, offset)
+        with self._connection() as con:
+            if expression:
+                rows = con.execute(_SEARCH_SQL, (expression, *page)).fetchall()
+            else:
+                rows = con.execute(_LIST_SQL, page).fetchall()
+        return [_row_to_query(row) for row in rows]
+
+    def count(self, search: str | None = None) -> int:
+        expression = search_expression(search) if search else None
+        with self._connection() as con:
+            if expression:
+                row = con.execute(_SEARCH_COUNT_SQL, (expression,)).fetchone()
+            else:
+                row = con.execute(_COUNT_SQL).fetchone()
+        return int(row[0])
+
+    def get(self, query_id: int) -> SavedQuery | None:
+        with self._connection() as con:
+            row = con.execute(_GET_SQL, (query_id,)).fetchone()
+        return _row_to_query(row) if row else None
+
+    def delete(self, query_id: int) -> bool:
+        with self._connection() as con, con:
+            return con.execute(_DELETE_SQL, (query_id,)).rowcount > 0
+
+    def record_executions(self, counts: Mapping[str, int]) -> dict[str, int]:
+        """Add execution counts in one transaction and return each statement's new total.
+
+        Statements that differ only in whitespace share a history row.
+        """
+        now = _now()
+        totals: dict[str, int] = {}
+        with self._connection() as con, con:
+            for sql, count in counts.items():
+                totals[sql] = con.execute(_RECORD_SQL, (" ".join(sql.split()), sql, count, now)).fetchone()[0]
+        return totals
+
+    def frequent_sql(self, limit: int = 1000) -> list[tuple[str, int]]:
+        with self._connection() as con:
+            return [(row["sql"], row["executions"]) for row in con.execute(_FREQUENT_SQL, (limit,))]
+
+    def export_jsonl(self, path: str) -> int:
+        count = 0
+        with self._connection() as con, open(path, "w", encoding="utf-8") as handle:
+            for row in con.execute(_EXPORT_SQL):
+                record = asdict(_row_to_query(row))
+                record.pop("id")
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+                count += 1
+        return count
+
+    def import_jsonl(self, path: str) -> int:
+        with open(path, encoding="utf-8") as handle:
+            return self.save_many(json.loads(line) for line in handle if line.strip())
+
+    def close(self) -> None:
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                con = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            con.close()
+
+
+_STORES: dict[str, SavedQueryStore] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def get_store(db_path: str) -> SavedQueryStore:
+    key = str(Path(db_path).resolve())
+    with _STORES_LOCK:
+        store = _STORES.get(key)
+        if store is None:
+            store = SavedQueryStore(db_path)
+            _STORES[key] = store
+        return store
+
+
+def close_stores() -> None:
+    with _STORES_LOCK:
+        stores = list(_STORES.values())
+        _STORES.clear()
+    for store in stores:
+        store.close()
 
 
 def init_db(db_path: str) -> None:
-    Path(db_path).parent.mkdir(parents=True, exist_ok=True)
-    with sqlite3.connect(db_path) as con:
-        con.execute(_SCHEMA)
+    get_store(db_path)
 
 
 def save_query(
@@ -44,87 +329,45 @@ def save_query(
     tag: str | None = None,
     notes: str | None = None,
 ) -> int:
-    created_at = datetime.now(timezone.utc).isoformat()
-    with sqlite3.connect(db_path) as con:
-        cursor = con.execute(
-            """
-            INSERT INTO saved_queries (name, question, sql, created_at, tag, notes)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (name, question, sql, created_at, tag, notes),
-        )
-        con.commit()
-        return int(cursor.lastrowid)
+    return get_store(db_path).save(name, question, sql, tag=tag, notes=notes)
 
 
-def list_queries(db_path: str, search: str | None = None) -> list[SavedQuery]:
-    with sqlite3.connect(db_path) as con:
-        con.row_factory = sqlite3.Row
-        if search:
-            like = f"%{search}%"
-            rows = con.execute(
-                """
-                SELECT id, name, question, sql, created_at, tag, notes
-                FROM saved_queries
-                WHERE name LIKE ? OR question LIKE ? OR tag LIKE ?
-                ORDER BY created_at DESC
-                """,
-                (like, like, like),
-            ).fetchall()
-        else:
-            rows = con.execute(
-                """
-                SELECT id, name, question, sql, created_at, tag, notes
-                FROM saved_queries
-                ORDER BY created_at DESC
-                """
-            ).fetchall()
-
-    return [
-        SavedQuery(
-            id=row["id"],
-            name=row["name"],
-            question=row["question"],
-            sql=row["sql"],
-            created_at=row["created_at"],
-            tag=row["tag"],
-            notes=row["notes"],
-        )
-        for row in rows
-    ]
+def save_queries(db_path: str, queries: Iterable[Mapping[str, Any]]) -> int:
+    return get_store(db_path).save_many(queries)
 
 
-def get_query(db_path: str, query_id: int) -> SavedQuery | None:
-    with sqlite3.connect(db_path) as con:
-        con.row_factory = sqlite3.Row
-        row = con.execute(
-            """
-            SELECT id, name, question, sql, created_at, tag, notes
-            FROM saved_queries
-            WHERE id = ?
-            """,
-            (query_id,),
-        ).fetchone()
-
-    if not row:
-        return None
+def list_queries(
+    db_path: str,
+    search: str | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+) -> list[SavedQuery]:
+    return get_store(db_path).list_queries(search, limit=limit, offset=offset)
 
-    return SavedQuery(
-        id=row["id"],
-        name=row["name"],
-        question=row["question"],
-        sql=row["sql"],
-        created_at=row["created_at"],
-        tag=row["tag"],
-        notes=row["notes"],
-    )
+
+def count_queries(db_path: str, search: str | None = None) -> int:
+    return get_store(db_path).count(search)
+
+
+def get_query(db_path: str, query_id: int) -> SavedQuery | None:
+    return get_store(db_path).get(query_id)
 
 
 def delete_query(db_path: str, query_id: int) -> bool:
-    with sqlite3.connect(db_path) as con:
-        cursor = con.execute(
-            "DELETE FROM saved_queries WHERE id = ?",
-            (query_id,),
-        )
-        con.commit()
-        return cursor.rowcount > 0
+    return get_store(db_path).delete(query_id)
+
+
+def record_sql_executions(db_path: str, counts: Mapping[str, int]) -> dict[str, int]:
+    return get_store(db_path).record_executions(counts)
+
+
+def frequent_sql(db_path: str, limit: int = 1000) -> list[tuple[str, int]]:
+    return get_store(db_path).frequent_sql(limit)
+
+
+def export_queries(db_path: str, path: str) -> int:
+    return get_store(db_path).export_jsonl(path)
+
+
+def import_queries(db_path: str, path: str) -> int:
+    return get_store(db_path).import_jsonl(path)
@@ -0,0 +1,216 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Hashable, TypeVar
+import asyncio
+import threading
+import time
+import weakref
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class SingleFlightStats:
+    executions: int
+    coalesced: int
+    in_flight: int
+
+
+_FLIGHTS: weakref.WeakValueDictionary[str, SingleFlight] = weakref.WeakValueDictionary()
+# How often a follower that can be cancelled re-checks its cancel flag while waiting.
+_CANCEL_POLL_SECONDS = 0.05
+
+
+class _Abandoned(Exception):
+    pass
+
+
+class WaitCancelled(Exception):
+    """A follower stopped waiting because its caller cancelled; the shared call keeps running."""
+
+
+class WaitTimeout(TimeoutError):
+    """A follower stopped waiting at its own deadline; the shared call keeps running."""
+
+
+class Call:
+    """One in-flight execution that later callers with the same key wait on."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._result: Any = None
+        self._error: BaseException | None = None
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def _settle(self, result: Any, error: BaseException | None) -> None:
+        with self._lock:
+            self._result, self._error = result, error
+            waiters, self._waiters = self._waiters, []
+            self._done.set()
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def result(self) -> Any:
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def _outcome(self) -> Any:
+        if isinstance(self._error, _Abandoned):
+            raise self._error
+        return self.result()
+
+    def wait(self, deadline: float | None = None, cancelled: Callable[[], bool] | None = None) -> Any:
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if cancelled is not None:
+                timeout = _CANCEL_POLL_SECONDS if timeout is None else min(timeout, _CANCEL_POLL_SECONDS)
+            if self._done.wait(timeout):
+                return self._outcome()
+            if cancelled is not None and cancelled():
+                raise WaitCancelled("Stopped waiting for a shared call.")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise WaitTimeout("Timed out waiting for a shared call.")
+
+    async def wait_async(self) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if not self._done.is_set():
+                self._waiters.append((loop, future))
+            else:
+                future.set_result(None)
+        await future
+        return self._outcome()
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class SingleFlight:
+    """Runs concurrent calls with the same key once and hands every caller the outcome.
+
+    Thread callers block on the leader; async callers await it without holding a thread,
+    and the two kinds share flights. If a leader is abandoned (a generator closed early,
+    an interrupt, or one of the ``retry_on`` errors that only concern the leader's own
+    caller, such as its cancellation), its followers retry and one of them leads instead.
+    """
+
+    def __init__(self, name: str, retry_on: tuple[type[BaseException], ...] = ()) -> None:
+        self.name = name
+        self._retry_on = retry_on
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Call] = {}
+        self._executions = 0
+        self._coalesced = 0
+        _FLIGHTS[name] = self
+
+    def _claim_once(self, key: Hashable) -> tuple[Call, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self._coalesced += 1
+                return call, False
+            call = self._calls[key] = Call()
+            self._executions += 1
+            return call, True
+
+    def claim(
+        self,
+        key: Hashable,
+        timeout: float | None = None,
+        cancelled: Callable[[], bool] | None = None,
+    ) -> tuple[Call, bool]:
+        """Return the flight for ``key`` and whether the caller must run it.
+
+        Followers return only once the leader has finished; the caller then reads
+        ``call.result()``. A leader must pass the outcome to ``complete``. A follower
+        gives up with ``WaitTimeout`` after ``timeout`` seconds or ``WaitCancelled`` once
+        ``cancelled()`` is true, without affecting the leader.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            call, leader = self._claim_once(key)
+            if leader:
+                return call, True
+            try:
+                call.wait(deadline, cancelled)
+            except _Abandoned:
+                continue
+            except (WaitCancelled, WaitTimeout):
+                raise
+            except Exception:
+                pass
+            return call, False
+
+    async def aclaim(self, key: Hashable) -> tuple[Call, bool]:
+        while True:
+            call, leader = self._claim_once(key)
+            if leader:
+                return call, True
+            try:
+                await call.wait_async()
+            except _Abandoned:
+                continue
+            except Exception:
+                pass
+            return call, False
+
+    def complete(self, key: Hashable, call: Call, result: Any = None, error: BaseException | None = None) -> None:
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+        if error is not None and (not isinstance(error, Exception) or isinstance(error, self._retry_on)):
+            error = _Abandoned(f"In-flight call for {key!r} was abandoned.")
+        call._settle(result, error)
+
+    def do(
+        self,
+        key: Hashable,
+        func: Callable[..., T],
+        *args: Any,
+        timeout: float | None = None,
+        cancelled: Callable[[], bool] | None = None,
+    ) -> T:
+        call, leader = self.claim(key, timeout, cancelled)
+        if not leader:
+            return call.result()
+        try:
+            result = func(*args)
+        except BaseException as exc:
+            self.complete(key, call, error=exc)
+            raise
+        self.complete(key, call, result)
+        return result
+
+    async def ado(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        call, leader = await self.aclaim(key)
+        if not leader:
+            return call.result()
+        task = asyncio.ensure_future(func())
+
+        def finished(task: asyncio.Future) -> None:
+            if task.cancelled():
+                self.complete(key, call, error=asyncio.CancelledError())
+            else:
+                self.complete(key, call, task.result() if task.exception() is None else None, task.exception())
+
+        task.add_done_callback(finished)
+        # Shielded so the leader's caller going away does not cancel the shared work.
+        return await asyncio.shield(task)
+
+    def stats(self) -> SingleFlightStats:
+        with self._lock:
+            return SingleFlightStats(
+                executions=self._executions,
+                coalesced=self._coalesced,
+                in_flight=len(self._calls),
+            )
+
+
+def flight_stats() -> dict[str, SingleFlightStats]:
+    return {name: flight.stats() for name, flight in sorted(_FLIGHTS.items())}
@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+from contextvars import ContextVar
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+import itertools
+import logging
+import threading
+import time
+
+from sql_ai_agent.config import load_settings
+from sql_ai_agent.utils.singleflight import flight_stats
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled: bool | None = None
+_current: ContextVar[Span | None] = ContextVar("sql_ai_agent_span", default=None)
+_ids = itertools.count(1)
+
+
+class _Histogram:
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                self.counts[index] += 1
+                break
+
+
+class MetricsRegistry:
+    """Span latencies, errors, token usage and row counts, rendered in Prometheus text format."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._latency: dict[str, _Histogram] = {}
+        self._errors: dict[str, int] = {}
+        self._tokens: dict[tuple[str, str], int] = {}
+        self._rows: dict[str, int] = {}
+
+    def observe_span(self, name: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            histogram = self._latency.get(name)
+            if histogram is None:
+                histogram = self._latency[name] = _Histogram()
+            histogram.observe(seconds)
+            if not ok:
+                self._errors[name] = self._errors.get(name, 0) + 1
+
+    def add_tokens(self, name: str, prompt: int, completion: int) -> None:
+        with self._lock:
+            for kind, count in (("prompt", prompt), ("completion", completion)):
+                self._tokens[(name, kind)] = self._tokens.get((name, kind), 0) + count
+
+    def add_rows(self, name: str, rows: int) -> None:
+        with self._lock:
+            self._rows[name] = self._rows.get(name, 0) + rows
+
+    def span_count(self, name: str) -> int:
+        with self._lock:
+            histogram = self._latency.get(name)
+            return histogram.count if histogram else 0
+
+    def token_count(self, name: str, kind: str) -> int:
+        with self._lock:
+            return self._tokens.get((name, kind), 0)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._latency.clear()
+            self._errors.clear()
+            self._tokens.clear()
+            self._rows.clear()
+
+    def render(self) -> str:
+        lines = [
+            "# HELP sql_ai_agent_span_seconds Time spent in each pipeline stage.",
+            "# TYPE sql_ai_agent_span_seconds histogram",
+        ]
+        with self._lock:
+            for name, histogram in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'sql_ai_agent_span_seconds_bucket{{span="{name}",le="{bound:g}"}} {cumulative}')
+                lines.append(f'sql_ai_agent_span_seconds_bucket{{span="{name}",le="+Inf"}} {histogram.count}')
+                lines.append(f'sql_ai_agent_span_seconds_sum{{span="{name}"}} {histogram.total:.6f}')
+                lines.append(f'sql_ai_agent_span_seconds_count{{span="{name}"}} {histogram.count}')
+            lines += [
+                "# HELP sql_ai_agent_span_errors_total Stage calls that raised.",
+                "# TYPE sql_ai_agent_span_errors_total counter",
+            ]
+            lines += [
+                f'sql_ai_agent_span_errors_total{{span="{name}"}} {count}'
+                for name, count in sorted(self._errors.items())
+            ]
+            lines += [
+                "# HELP sql_ai_agent_llm_tokens_total Tokens reported by the OpenAI API.",
+                "# TYPE sql_ai_agent_llm_tokens_total counter",
+            ]
+            lines += [
+                f'sql_ai_agent_llm_tokens_total{{span="{name}",kind="{kind}"}} {count}'
+                for (name, kind), count in sorted(self._tokens.items())
+            ]
+            lines += [
+                "# HELP sql_ai_agent_rows_total Rows returned by DuckDB.",
+                "# TYPE sql_ai_agent_rows_total counter",
+            ]
+            lines += [
+                f'sql_ai_agent_rows_total{{span="{name}"}} {count}' for name, count in sorted(self._rows.items())
+            ]
+        flights = flight_stats()
+        lines += [
+            "# HELP sql_ai_agent_singleflight_executions_total Calls that ran instead of joining one in flight.",
+            "# TYPE sql_ai_agent_singleflight_executions_total counter",
+        ]
+        lines += [
+            f'sql_ai_agent_singleflight_executions_total{{flight="{name}"}} {stats.executions}'
+            for name, stats in flights.items()
+        ]
+        lines += [
+            "# HELP sql_ai_agent_singleflight_coalesced_total Calls that waited on an identical call in flight.",
+            "# TYPE sql_ai_agent_singleflight_coalesced_total counter",
+        ]
+        lines += [
+            f'sql_ai_agent_singleflight_coalesced_total{{flight="{name}"}} {stats.coalesced}'
+            for name, stats in flights.items()
+        ]
+        return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+class Span:
+    __slots__ = ("name", "attributes", "span_id", "parent_id", "trace_id", "_started", "_token")
+
+    def __init__(self, name: str, attributes: dict[str, Any]) -> None:
+        self.name = name
+        self.attributes = attributes
+
+    def __enter__(self) -> Span:
+        parent = _current.get()
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent else None
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self._token = _current.set(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        seconds = time.perf_counter() - self._started
+        try:
+            _current.reset(self._token)
+        except ValueError:
+            # Exited from another context, e.g. a generator closed by a different task.
+            pass
+        METRICS.observe_span(self.name, seconds, exc_type is None)
+        if logger.isEnabledFor(logging.INFO):
+            record = {
+                "trace_id": self.trace_id,
+                "span_id": self.span_id,
+                "parent_id": self.parent_id,
+                "name": self.name,
+                "duration_ms": round(seconds * 1000, 3),
+                "status": "ok" if exc_type is None else "error",
+                **self.attributes,
+            }
+            if exc_type is not None:
+                record["error"] = exc_type.__name__
+            logger.info("span %s %.1f ms", self.name, seconds * 1000, extra={"span": record})
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def record_usage(self, usage: Any) -> None:
+        """Record token usage from an OpenAI response's ``usage`` field, if present."""
+        if usage is None:
+            return
+        prompt = getattr(usage, "prompt_tokens", 0) or 0
+        completion = getattr(usage, "completion_tokens", 0) or 0
+        self.attributes.update(prompt_tokens=prompt, completion_tokens=completion)
+        METRICS.add_tokens(self.name, prompt, completion)
+
+    def record_rows(self, rows: int) -> None:
+        self.attributes["rows"] = rows
+        METRICS.add_rows(self.name, rows)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> _NoopSpan:
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        return None
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def record_usage(self, usage: Any) -> None:
+        pass
+
+    def record_rows(self, rows: int) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def tracing_enabled() -> bool:
+    global _enabled
+    if _enabled is None:
+        _enabled = load_settings().tracing_enabled
+    return _enabled
+
+
+def configure_tracing(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def span(name: str, **attributes: Any) -> Span | _NoopSpan:
+    """Time a block as ``name``; a shared no-op object is returned while tracing is disabled."""
+    if not tracing_enabled():
+        return _NOOP_SPAN
+    return Span(name, attributes)
+
+
+def render_metrics() -> str:
+    return METRICS.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args) -> None:
+        pass
+
+    def do_GET(self) -> None:
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_metrics().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_metrics_server(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread; pass port 0 to pick a free port."""
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    return server
@@ -1,6 +1,121 @@
+import json
 import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 
 SRC_DIR = Path(__file__).resolve().parents[1] / "src"
 if str(SRC_DIR) not in sys.path:
     sys.path.insert(0, str(SRC_DIR))
+
+import pytest  # noqa: E402
+
+from sql_ai_agent.db.column_profiles import close_profile_stores, wait_for_profiling  # noqa: E402
+from sql_ai_agent.db.connection_pool import close_pools  # noqa: E402
+from sql_ai_agent.db.summary_tables import wait_for_summaries  # noqa: E402
+from sql_ai_agent.llm.client import reset_clients  # noqa: E402
+from sql_ai_agent.llm.sql_cache import close_sql_caches  # noqa: E402
+from sql_ai_agent.pipeline.qa_pipeline import wait_for_sql_history  # noqa: E402
+from sql_ai_agent.storage.saved_queries import close_stores  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _close_duckdb_pools():
+    yield
+    wait_for_profiling()
+    wait_for_sql_history()
+    wait_for_summaries()
+    close_pools()
+    close_stores()
+    close_profile_stores()
+    close_sql_caches()
+
+
+class OpenAIStub:
+    def __init__(self) -> None:
+        self.replies: list[tuple[int, str]] = []
+        self.requests: list[dict] = []
+        self.client_ports: list[int] = []
+        self.server = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def reply(self, content: str, status: int = 200) -> None:
+        self.replies.append((status, content))
+
+
+def _completion_body(content: str) -> dict:
+    return {
+        "id": "chatcmpl-stub",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "stub",
+        "choices": [
+            {
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content},
+            }
+        ],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+
+
+def _stream_body(content: str) -> bytes:
+    events = []
+    for start in range(0, len(content), 4):
+        chunk = {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "stub",
+            "choices": [{"index": 0, "delta": {"content": content[start : start + 4]}, "finish_reason": None}],
+        }
+        events.append(f"data: {json.dumps(chunk)}\n\n")
+    events.append("data: [DONE]\n\n")
+    return "".join(events).encode("utf-8")
+
+
+@pytest.fixture
+def openai_stub(monkeypatch):
+    stub = OpenAIStub()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            stub.requests.append(request)
+            stub.client_ports.append(self.client_address[1])
+            status, content = stub.replies.pop(0) if stub.replies else (200, "")
+            if status == 200 and request.get("stream"):
+                data = _stream_body(content)
+                content_type = "text/event-stream"
+            else:
+                payload = _completion_body(content) if status == 200 else {"error": {"message": content}}
+                data = json.dumps(payload).encode("utf-8")
+                content_type = "application/json"
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    stub.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=stub.server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setenv("OPENAI_BASE_URL", stub.base_url)
+    monkeypatch.setenv("OPENAI_MAX_RETRIES", "2")
+    reset_clients()
+    yield stub
+    reset_clients()
+    stub.server.shutdown()
+    stub.server.server_close()
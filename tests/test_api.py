@@ -0,0 +1,148 @@
+import asyncio
+import json
+
+import duckdb
+import httpx
+import pyarrow as pa
+import pytest
+
+from sql_ai_agent.api import app as api_app
+from sql_ai_agent.api.app import Limiter, Overloaded, create_app
+
+
+@pytest.fixture
+def api_env(tmp_path, monkeypatch, openai_stub):
+    db_path = tmp_path / "books.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE books AS SELECT i AS book_id, 'Book ' || i AS title FROM range(2500) AS t(i)")
+    monkeypatch.setenv("DUCKDB_PATH", str(db_path))
+    monkeypatch.setenv("SQL_CACHE_DB", str(tmp_path / "sql_cache.db"))
+    monkeypatch.setenv("SAVED_QUERIES_DB", str(tmp_path / "saved_queries.db"))
+    monkeypatch.setenv("RESULT_CACHE_MAX_ENTRIES", "0")
+    return openai_stub
+
+
+def _request(app, method: str, path: str, **kwargs) -> httpx.Response:
+    async def send() -> httpx.Response:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            return await client.request(method, path, **kwargs)
+
+    return asyncio.run(send())
+
+
+def test_identical_questions_in_flight_share_one_answer(api_env):
+    api_env.reply("SELECT COUNT(*) AS book_count FROM books")
+    app = create_app()
+
+    async def ask_twice() -> list[httpx.Response]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            questions = ("How many books?", "how many books")
+            return await asyncio.gather(*(client.post("/ask", json={"question": question}) for question in questions))
+
+    responses = asyncio.run(ask_twice())
+    assert [response.status_code for response in responses] == [200, 200]
+    assert responses[0].json() == responses[1].json()
+    assert responses[0].json()["rows"] == [{"book_count": 2500}]
+    assert len(api_env.requests) == 1
+    assert app.flight.stats().coalesced == 1
+
+
+def test_execute_streams_ndjson_and_arrow(api_env):
+    app = create_app()
+    sql = "SELECT book_id, title FROM books ORDER BY book_id"
+
+    ndjson = _request(app, "POST", "/sql/execute", json={"sql": sql, "format": "ndjson"})
+    assert ndjson.headers["content-type"] == "application/x-ndjson"
+    assert ndjson.headers["x-total-rows"] == "2500"
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert len(rows) == 2500 and rows[-1] == {"book_id": 2499, "title": "Book 2499"}
+
+    arrow = _request(
+        app, "POST", "/sql/execute", json={"sql": sql}, headers={"Accept": "application/vnd.apache.arrow.stream"}
+    )
+    table = pa.ipc.open_stream(arrow.content).read_all()
+    assert table.num_rows == 2500
+    assert table.column("title")[0].as_py() == "Book 0"
+
+
+def test_stream_failing_midway_is_closed_without_a_second_start(api_env, monkeypatch):
+    async def failing_chunks(table):
+        yield b'{"book_id": 0}\n'
+        raise RuntimeError("conversion failed")
+
+    monkeypatch.setattr(api_app, "_ndjson_chunks", failing_chunks)
+    request = json.dumps({"sql": "SELECT book_id FROM books", "format": "ndjson"}).encode("utf-8")
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": request, "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/sql/execute", "headers": [], "query_string": b""}
+    asyncio.run(create_app()(scope, receive, send))
+    assert [message["type"] for message in messages].count("http.response.start") == 1
+    assert messages[0]["status"] == 200
+    assert messages[-1] == {"type": "http.response.body", "body": b""}
+
+
+def test_concurrent_queries_differing_inside_a_literal_are_not_coalesced(api_env):
+    app = create_app()
+
+    async def execute_both() -> list[httpx.Response]:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            return await asyncio.gather(
+                *(
+                    client.post("/sql/execute", json={"sql": f"SELECT $$x -- {tag}$$ AS v FROM books LIMIT 1"})
+                    for tag in ("one", "two")
+                )
+            )
+
+    responses = asyncio.run(execute_both())
+    assert [response.json()["rows"] for response in responses] == [[{"v": "x -- one"}], [{"v": "x -- two"}]]
+    assert app.flight.stats().coalesced == 0
+
+
+def test_execute_rejects_unsafe_sql(api_env):
+    response = _request(create_app(), "POST", "/sql/execute", json={"sql": "DROP TABLE books"})
+    assert response.status_code == 400
+    assert "error" in response.json()
+
+
+def test_saved_queries_round_trip(api_env):
+    app = create_app()
+    created = _request(app, "POST", "/saved-queries", json={"name": "All", "question": "All books", "sql": "SELECT 1"})
+    assert created.status_code == 201
+    query_id = created.json()["id"]
+
+    listed = _request(app, "GET", "/saved-queries", params={"search": "books"}).json()
+    assert listed["total"] == 1 and listed["items"][0]["id"] == query_id
+    assert _request(app, "GET", f"/saved-queries/{query_id}").json()["name"] == "All"
+    assert _request(app, "DELETE", f"/saved-queries/{query_id}").status_code == 204
+    assert _request(app, "GET", f"/saved-queries/{query_id}").status_code == 404
+
+
+def test_limiter_rejects_requests_beyond_the_queue():
+    async def scenario() -> None:
+        limiter = Limiter(max_concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async with limiter:
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded):
+            async with limiter:
+                pass
+        release.set()
+        await asyncio.gather(holder, waiter)
+
+    asyncio.run(scenario())
@@ -0,0 +1,70 @@
+import duckdb
+
+from sql_ai_agent.db.column_profiles import (
+    ProfileStore,
+    close_profile_stores,
+    get_profile_store,
+    profile_annotations,
+    refresh_profiles,
+)
+from sql_ai_agent.db.connection_pool import close_pools
+from sql_ai_agent.db.duckdb_client import DuckDBClient
+from sql_ai_agent.db.schema_catalog import load_catalog
+
+
+def _create(db_path):
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE books (title VARCHAR, genre VARCHAR, price DECIMAL(10, 2))")
+        con.execute(
+            "INSERT INTO books VALUES ('Dune', 'Fiction', 9.99), ('Emma', 'Fiction', 5.00), ('Atlas', NULL, 20.00)"
+        )
+        con.execute("CREATE TABLE authors (name VARCHAR)")
+        con.execute("INSERT INTO authors VALUES ('Herbert')")
+        con.execute("CREATE TABLE reviews (stars INTEGER)")
+
+
+def test_profiles_are_rendered_into_schema_context(tmp_path):
+    db_path = tmp_path / "books.duckdb"
+    _create(db_path)
+    client = DuckDBClient(str(db_path))
+    catalog = load_catalog(client)
+    store = ProfileStore(str(tmp_path / "profiles.db"))
+
+    assert sorted(refresh_profiles(client, catalog, store)) == ["authors", "books", "reviews"]
+    context = catalog.render(profile_annotations(store.load(client.db_path)))
+    assert "- books (3 rows):" in context
+    assert "price DECIMAL(10,2) [~3 distinct, 5.00..20.00]" in context
+    assert "genre VARCHAR [~1 distinct, 33% null, values 'Fiction']" in context
+
+
+def test_only_changed_tables_are_profiled_again(tmp_path):
+    db_path = tmp_path / "books.duckdb"
+    _create(db_path)
+    store = ProfileStore(str(tmp_path / "profiles.db"))
+    client = DuckDBClient(str(db_path))
+    refresh_profiles(client, load_catalog(client), store)
+    assert refresh_profiles(client, load_catalog(client), store) == []
+
+    close_pools()
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("INSERT INTO books VALUES ('Ubik', 'Fiction', 7.50)")
+        con.execute("DROP TABLE reviews")
+        con.execute("CHECKPOINT")
+    client = DuckDBClient(str(db_path))
+    assert refresh_profiles(client, load_catalog(client), store) == ["books"]
+    assert set(store.load(client.db_path)) == {"authors", "books"}
+    assert store.load(client.db_path)["books"].row_count == 4
+
+
+def test_closed_profile_stores_are_not_handed_out_again(tmp_path):
+    db_path = tmp_path / "books.duckdb"
+    _create(db_path)
+    path = str(tmp_path / "profiles.db")
+    store = get_profile_store(path)
+    client = DuckDBClient(str(db_path))
+    refresh_profiles(client, load_catalog(client), store)
+
+    close_profile_stores()
+    reopened = get_profile_store(path)
+    assert reopened is not store
+    assert set(reopened.load(client.db_path)) == {"authors", "books", "reviews"}
@@ -0,0 +1,109 @@
+import hashlib
+import shutil
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from sql_ai_agent.ingest.crawler import FetchResult, HttpFetcher, crawl
+
+FIXTURES = Path(__file__).parent / "fixtures" / "books_toscrape"
+
+
+@pytest.fixture
+def books_site(tmp_path):
+    root = tmp_path / "site"
+    shutil.copytree(FIXTURES, root)
+    hits: list[tuple[str, int]] = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path = root / (self.path.lstrip("/") or "index.html")
+            if not path.is_file():
+                hits.append((self.path, 404))
+                self.send_error(404)
+                return
+            body = path.read_bytes()
+            etag = '"' + hashlib.md5(body).hexdigest() + '"'
+            status = 304 if self.headers.get("If-None-Match") == etag else 200
+            hits.append((self.path, status))
+            self.send_response(status)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", "0" if status == 304 else str(len(body)))
+            self.end_headers()
+            if status == 200:
+                self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address[:2]
+    yield root, f"http://{host}:{port}/", hits
+    server.shutdown()
+    server.server_close()
+
+
+def _books(db_path):
+    with duckdb.connect(db_path, read_only=True) as con:
+        return dict(con.execute("SELECT book_id, price FROM books").fetchall())
+
+
+def test_crawl_walks_pages_and_only_reloads_changed_ones(books_site, tmp_path):
+    root, url, hits = books_site
+    db_path = str(tmp_path / "books.duckdb")
+    fetcher = HttpFetcher()
+
+    first = crawl(db_path, fetcher, start_url=url, workers=4)
+    assert (first.full_reload, first.pages, first.changed, first.rows_written) == (True, 3, 3, 60)
+    assert len(_books(db_path)) == 60
+
+    second = crawl(db_path, fetcher, start_url=url, workers=4)
+    assert (second.full_reload, second.not_modified, second.rows_written) == (False, 3, 0)
+    assert [status for _, status in hits[-3:]] == [304, 304, 304]
+
+    page = root / "catalogue" / "page-3.html"
+    page.write_text(page.read_text(encoding="utf-8").replace("£", "£1", 1), encoding="utf-8")
+    third = crawl(db_path, fetcher, start_url=url, workers=4)
+    assert (third.changed, third.not_modified, third.rows_written) == (1, 2, 20)
+    books = _books(db_path)
+    assert len(books) == 60 and max(books.values()) > 100
+    fetcher.close()
+
+
+def test_content_hash_skips_unchanged_pages_without_etags(books_site, tmp_path):
+    _, url, _ = books_site
+    db_path = str(tmp_path / "books.duckdb")
+
+    class NoEtagFetcher:
+        def __init__(self):
+            self.inner = HttpFetcher()
+
+        def fetch(self, url, etag=None):
+            return FetchResult(url, self.inner.fetch(url).html)
+
+    fetcher = NoEtagFetcher()
+    crawl(db_path, fetcher, start_url=url, workers=2, max_pages=2)
+    again = crawl(db_path, fetcher, start_url=url, workers=2, max_pages=2)
+    assert (again.pages, again.unchanged, again.rows_written) == (2, 2, 0)
+    assert len(_books(db_path)) == 40
+    fetcher.inner.close()
+
+
+def test_full_reload_without_parsed_books_keeps_the_old_table(books_site, tmp_path):
+    root, url, _ = books_site
+    db_path = str(tmp_path / "books.duckdb")
+    with duckdb.connect(db_path) as con:
+        con.execute("CREATE TABLE books AS SELECT 'Legacy' AS title, 1.0 AS price")
+    (root / "index.html").write_text("<html><body><p>New layout</p></body></html>", encoding="utf-8")
+
+    fetcher = HttpFetcher()
+    with pytest.raises(RuntimeError, match="No book records"):
+        crawl(db_path, fetcher, start_url=url, workers=2)
+    fetcher.close()
+    with duckdb.connect(db_path, read_only=True) as con:
+        assert con.execute("SELECT title FROM books").fetchall() == [("Legacy",)]
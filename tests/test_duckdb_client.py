@@ -1,6 +1,10 @@
+import time
+from contextlib import closing
+
 import duckdb
+import pytest
 
-from sql_ai_agent.db.duckdb_client import DuckDBClient
+from sql_ai_agent.db.duckdb_client import CancelScope, DuckDBClient, QueryCancelledError, QueryTimeoutError
 
 
 def test_query_returns_dataframe(tmp_path):
@@ -15,3 +19,84 @@ def test_query_returns_dataframe(tmp_path):
     assert set(client.list_tables()) == {"items"}
     description = client.describe_table("items")
     assert "name" in description["name"].tolist()
+
+
+def test_pool_reuses_connections_and_reopens_on_change(tmp_path):
+    db_path = tmp_path / "sample.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE items AS SELECT 1 AS id")
+
+    client = DuckDBClient(str(db_path), pool_size=2)
+    assert client.query("SELECT id FROM items")["id"].tolist() == [1]
+    assert client.query("SELECT id FROM items")["id"].tolist() == [1]
+    stats = client.pool_stats()
+    assert stats.checkouts == 2
+    assert stats.idle == 1
+    assert stats.in_use == 0
+
+    replacement = tmp_path / "replacement.duckdb"
+    with duckdb.connect(str(replacement)) as con:
+        con.execute("CREATE TABLE items AS SELECT 2 AS id")
+    replacement.replace(db_path)
+
+    assert client.query("SELECT id FROM items")["id"].tolist() == [2]
+    assert client.pool_stats().reopens == 1
+
+
+def test_paged_and_batched_fetches(tmp_path):
+    db_path = tmp_path / "sample.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE items AS SELECT range AS id FROM range(25)")
+
+    client = DuckDBClient(str(db_path))
+    sql = "SELECT id FROM items ORDER BY id DESC -- newest first\n;"
+    assert client.count_rows(sql) == 25
+    assert client.query_page(sql, limit=5, offset=10)["id"].tolist() == [14, 13, 12, 11, 10]
+    with closing(client.iter_batches("SELECT id FROM items", batch_size=10)) as batches:
+        assert sum(batch.num_rows for batch in batches) == 25
+
+
+def test_abandoned_batch_iterator_returns_its_cursor(tmp_path):
+    db_path = tmp_path / "sample.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE items AS SELECT range AS id FROM range(100)")
+
+    client = DuckDBClient(str(db_path), pool_size=1)
+    with closing(client.iter_batches("SELECT id FROM items", batch_size=10)) as batches:
+        for batch in batches:
+            assert batch.num_rows == 10
+            break
+    assert client.pool_stats().in_use == 0
+    assert client.query("SELECT COUNT(*) AS n FROM items")["n"].tolist() == [100]
+
+
+def test_long_query_times_out_and_connection_is_reused(tmp_path):
+    db_path = tmp_path / "sample.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE items AS SELECT 1 AS id")
+
+    client = DuckDBClient(str(db_path), pool_size=1)
+    slow_sql = "SELECT COUNT(*) FROM range(100000000) a, range(100000000) b"
+    started = time.perf_counter()
+    with pytest.raises(QueryTimeoutError):
+        client.count_rows(slow_sql, timeout=0.2)
+    assert time.perf_counter() - started < 10
+
+    scope = CancelScope()
+    scope.cancel()
+    with pytest.raises(QueryCancelledError):
+        client.query_page("SELECT id FROM items", limit=1, scope=scope)
+    assert client.query_page("SELECT id FROM items", limit=1, timeout=5)["id"].tolist() == [1]
+
+
+def test_reopening_a_pooled_path_with_other_settings_is_refused(tmp_path):
+    db_path = tmp_path / "sample.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE items AS SELECT 1 AS id")
+
+    client = DuckDBClient(str(db_path), pool_size=2, config={"threads": 1})
+    assert DuckDBClient(str(db_path), pool_size=2, config={"threads": 1}).pool_stats() == client.pool_stats()
+    with pytest.raises(ValueError):
+        DuckDBClient(str(db_path), pool_size=3, config={"threads": 1})
+    with pytest.raises(ValueError):
+        DuckDBClient(str(db_path), pool_size=2)
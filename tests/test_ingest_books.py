@@ -0,0 +1,36 @@
+from pathlib import Path
+
+import duckdb
+import pytest
+
+from sql_ai_agent.ingest.books import parse_book_batch, parse_books, parse_pages, read_html_pages, write_duckdb
+
+FIXTURES = Path(__file__).parent / "fixtures" / "books_toscrape"
+
+
+@pytest.mark.parametrize("backend", ["bs4", "lxml"])
+def test_parse_books_reads_titles_and_prices_from_fixture(backend):
+    books = parse_books((FIXTURES / "index.html").read_text(encoding="utf-8"), backend)
+    assert len(books) == 20
+    assert {"book_id": 997, "title": "Sharp Objects & Dirt: A Novel", "price": 31.23} in books
+    assert 38.01 in [book["price"] for book in books]
+    assert all(isinstance(book["price"], float) and book["price"] > 0 for book in books)
+
+
+def test_write_duckdb_swaps_the_books_table(tmp_path):
+    db_path = str(tmp_path / "books.duckdb")
+    batches = [parse_book_batch(html) for html in read_html_pages(str(FIXTURES))]
+    assert write_duckdb(db_path, batches) == 60
+    assert write_duckdb(db_path, batches[:1]) == 20
+
+    with duckdb.connect(db_path, read_only=True) as con:
+        assert con.execute("SELECT COUNT(*) FROM books").fetchone()[0] == 20
+        price_type = con.execute("SELECT data_type FROM information_schema.columns WHERE column_name = 'price'")
+        assert price_type.fetchone()[0] == "DECIMAL(10,2)"
+        assert [row[0] for row in con.execute("SHOW TABLES").fetchall()] == ["books"]
+
+
+def test_lxml_backend_matches_bs4_across_processes():
+    pages = list(read_html_pages(str(FIXTURES)))
+    expected = [parse_book_batch(html, "bs4") for html in pages]
+    assert parse_pages(pages, backend="lxml", processes=2) == expected
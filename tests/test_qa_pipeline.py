@@ -0,0 +1,252 @@
+import asyncio
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import duckdb
+import pytest
+
+from sql_ai_agent.db.duckdb_client import CancelScope, QueryCancelledError
+from sql_ai_agent.pipeline import qa_pipeline
+from sql_ai_agent.pipeline.batch import run_batch
+
+
+@pytest.fixture
+def books_env(tmp_path, monkeypatch, openai_stub):
+    db_path = tmp_path / "books.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE books (title VARCHAR, price DECIMAL(10, 2))")
+        con.execute("INSERT INTO books VALUES ('A', 10), ('B', 20)")
+    monkeypatch.setenv("DUCKDB_PATH", str(db_path))
+    monkeypatch.setenv("SQL_CACHE_DB", str(tmp_path / "sql_cache.db"))
+    return openai_stub
+
+
+def test_run_uses_sql_cache_for_repeated_questions(books_env):
+    books_env.reply("SELECT AVG(price) AS avg_price FROM books")
+
+    first = qa_pipeline.run("What is the average price?")
+    second = qa_pipeline.run("what is the average price")
+    assert float(first["df"]["avg_price"][0]) == 15.0
+    assert second["sql"] == first["sql"]
+    assert len(books_env.requests) == 1
+
+
+def test_prepare_question_stream_yields_deltas_then_result(books_env):
+    sql = "SELECT COUNT(*) AS book_count FROM books"
+    books_env.reply(sql)
+
+    events = list(qa_pipeline.prepare_question_stream("How many books?"))
+    assert [event["type"] for event in events[:-1]] == ["sql_delta"] * len(events[:-1])
+    assert len(events) > 2
+    assert "".join(event["text"] for event in events[:-1]) == sql
+    assert events[-1]["type"] == "result"
+    assert events[-1]["result"]["sql"] == sql
+    assert books_env.requests[0]["stream"] is True
+
+    cached = list(qa_pipeline.prepare_question_stream("how many books"))
+    assert [event["type"] for event in cached] == ["sql_delta", "result"]
+    assert cached[0]["text"] == sql
+    assert (cached[1]["result"]["sql"], cached[1]["result"]["notes"]) == (sql, [])
+    assert len(books_env.requests) == 1
+
+
+def test_similar_cached_question_is_suggested_not_run(books_env, monkeypatch):
+    monkeypatch.setenv("SQL_CACHE_SIMILARITY_THRESHOLD", "0.8")
+    books_env.reply("SELECT AVG(price) AS avg_price FROM books")
+    books_env.reply("SELECT MAX(price) AS max_price FROM books")
+
+    first = qa_pipeline.run("What is the average book price?")
+    second = qa_pipeline.run("What is the average books price?")
+    assert first["suggestion"] is None
+    assert second["sql"] == "SELECT MAX(price) AS max_price FROM books"
+    assert second["suggestion"]["sql"] == first["sql"]
+    assert second["suggestion"]["question"] == "What is the average book price?"
+    assert len(books_env.requests) == 2
+
+
+def test_arun_executes_and_explains_concurrently(books_env):
+    books_env.reply("SELECT COUNT(*) AS book_count FROM books")
+    books_env.reply("Counts the books.")
+
+    result = asyncio.run(qa_pipeline.arun("How many books?", explain=True))
+    assert int(result["df"]["book_count"][0]) == 2
+    assert result["explanation"] == "Counts the books."
+    assert len(books_env.requests) == 2
+
+    books_env.reply("Counts the books.")
+    page, explanation = asyncio.run(qa_pipeline.aexecute_and_explain(result["sql"], "", CancelScope(), paged=True))
+    assert (page.df["book_count"].tolist(), page.total_rows, explanation) == ([2], 1, "Counts the books.")
+
+
+def test_batch_writes_jsonl_results_and_reports_stages(books_env, tmp_path):
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text(
+        '{"id": "q1", "question": "How many books?"}\n'
+        '{"id": "q2", "question": "How many books"}\n'
+        '{"id": "q3", "question": "Broken"}\n',
+        encoding="utf-8",
+    )
+    books_env.reply("SELECT COUNT(*) AS book_count FROM books")
+    books_env.reply("SELECT missing_column FROM books")
+    output = tmp_path / "results.jsonl"
+
+    report = run_batch(str(questions), str(output), concurrency=1)
+    records = {row["id"]: row for row in map(json.loads, output.read_text(encoding="utf-8").splitlines())}
+    assert records["q1"]["rows"] == [{"book_count": 2}]
+    assert records["q2"]["sql"] == records["q1"]["sql"]
+    assert records["q3"]["error"] and records["q3"]["sql"] == "SELECT missing_column FROM books"
+    assert (report.questions, report.failed) == (3, 1)
+    assert report.stage("schema").count == 1
+    assert report.stage("generate").count == 2
+
+
+def test_execute_sql_page_caps_rows_and_keeps_total(books_env, monkeypatch):
+    monkeypatch.setenv("MAX_RESULT_ROWS", "3")
+    sql = "SELECT range AS n FROM range(10)"
+
+    capped = qa_pipeline.execute_sql(sql)
+    assert len(capped) == 3
+    assert (capped.attrs["total_rows"], capped.attrs["truncated"]) == (10, True)
+    first = qa_pipeline.execute_sql_page(sql, page=0, page_size=2)
+    assert first.df["n"].tolist() == [0, 1]
+    assert (first.total_rows, first.truncated, first.page_count) == (10, True, 2)
+    last = qa_pipeline.execute_sql_page(sql, page=1, page_size=2, total_rows=first.total_rows)
+    assert last.df["n"].tolist() == [2]
+
+    monkeypatch.setenv("RESULT_CACHE_MAX_ENTRIES", "0")
+    uncached = qa_pipeline.execute_sql(sql)
+    assert uncached["n"].tolist() == [0, 1, 2]
+    assert (uncached.attrs["total_rows"], uncached.attrs["truncated"]) == (10, True)
+
+
+def test_repeated_sql_is_served_from_result_cache(books_env):
+    before = qa_pipeline.result_cache_stats()
+    first = qa_pipeline.execute_sql("SELECT title AS book_title FROM books ORDER BY title")
+    second = qa_pipeline.execute_sql_page("SELECT title AS book_title\nFROM books ORDER BY title;")
+    after = qa_pipeline.result_cache_stats()
+
+    assert first["book_title"].tolist() == second.df["book_title"].tolist() == ["A", "B"]
+    assert after.hits - before.hits == 1
+    assert after.misses - before.misses == 1
+
+
+def test_comment_markers_inside_literals_do_not_share_cached_results(books_env):
+    assert qa_pipeline.execute_sql("SELECT $$x -- one$$ AS v FROM books LIMIT 1")["v"].tolist() == ["x -- one"]
+    assert qa_pipeline.execute_sql("SELECT $$x -- two$$ AS v FROM books LIMIT 1")["v"].tolist() == ["x -- two"]
+    assert qa_pipeline.execute_sql("SELECT E'a\\' /* one */' AS v FROM books LIMIT 1")["v"].tolist() == ["a' /* one */"]
+    assert qa_pipeline.execute_sql("SELECT E'a\\' /* two */' AS v FROM books LIMIT 1")["v"].tolist() == ["a' /* two */"]
+
+
+def test_invalid_sql_is_repaired_before_execution(books_env):
+    books_env.reply("SELECT author FROM books")
+    books_env.reply("SELECT COUNT(*) AS book_count FROM books")
+
+    result = qa_pipeline.run("How many books?")
+    assert int(result["df"]["book_count"][0]) == 2
+    assert len(result["notes"]) == 1 and result["notes"][0].startswith("Attempt 1 failed validation")
+    repair_prompt = books_env.requests[1]["messages"][-1]["content"]
+    assert "author" in repair_prompt and "Binder Error" in repair_prompt
+
+
+def test_unrepairable_sql_raises_and_is_not_cached(books_env, monkeypatch):
+    monkeypatch.setenv("SQL_REPAIR_ATTEMPTS", "1")
+    books_env.reply("SELECT author FROM books")
+    books_env.reply("SELECT writer FROM books")
+
+    with pytest.raises(ValueError, match="after 2 attempt"):
+        qa_pipeline.prepare_question("Who wrote the books?")
+    books_env.reply("SELECT title AS book_title FROM books")
+    assert qa_pipeline.prepare_question("Who wrote the books?")["sql"] == "SELECT title AS book_title FROM books"
+
+
+def test_identical_questions_in_flight_generate_sql_once(books_env, monkeypatch):
+    release = threading.Event()
+    calls = []
+
+    def slow_generate(question, schema_context):
+        calls.append(question)
+        release.wait(5)
+        return "SELECT COUNT(*) AS book_count FROM books"
+
+    monkeypatch.setattr(qa_pipeline, "generate_sql", slow_generate)
+    coalesced = qa_pipeline.singleflight_stats()["prepare_question"].coalesced
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(qa_pipeline.prepare_question, q) for q in ("How many books?", "how many books")]
+        deadline = time.monotonic() + 5
+        while qa_pipeline.singleflight_stats()["prepare_question"].coalesced == coalesced:
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+        release.set()
+        results = [future.result() for future in futures]
+    assert [result["sql"] for result in results] == ["SELECT COUNT(*) AS book_count FROM books"] * 2
+    assert len(calls) == 1
+
+
+def test_cancelled_follower_stops_waiting_while_the_leader_keeps_running(books_env, monkeypatch):
+    fetch_capped = qa_pipeline._fetch_capped
+    release = threading.Event()
+    fetching = []
+
+    def slow_fetch(db, sql, settings, scope):
+        fetching.append(scope)
+        release.wait(5)
+        return fetch_capped(db, sql, settings, scope)
+
+    monkeypatch.setattr(qa_pipeline, "_fetch_capped", slow_fetch)
+    sql = "SELECT COUNT(*) AS book_count FROM books"
+    leading, following = CancelScope(), CancelScope()
+    coalesced = qa_pipeline.singleflight_stats()["execute_sql"].coalesced
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(qa_pipeline.execute_sql_arrow, sql, leading)
+        deadline = time.monotonic() + 5
+        while not fetching:
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+        second = pool.submit(qa_pipeline.execute_sql_arrow, sql, following)
+        while qa_pipeline.singleflight_stats()["execute_sql"].coalesced == coalesced:
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+        following.cancel()
+        with pytest.raises(QueryCancelledError):
+            second.result(timeout=5)
+        assert not first.done()
+        release.set()
+        assert first.result(timeout=5).table.column("book_count")[0].as_py() == 2
+    assert fetching == [leading]
+
+
+def test_cancelling_one_caller_leaves_an_identical_query_running(books_env, monkeypatch):
+    fetch_capped = qa_pipeline._fetch_capped
+    release = threading.Event()
+    fetching = []
+
+    def slow_fetch(db, sql, settings, scope):
+        fetching.append(scope)
+        while not release.is_set():
+            if scope.cancelled:
+                raise QueryCancelledError("Query was cancelled.")
+            time.sleep(0.005)
+        return fetch_capped(db, sql, settings, scope)
+
+    monkeypatch.setattr(qa_pipeline, "_fetch_capped", slow_fetch)
+    sql = "SELECT COUNT(*) AS book_count FROM books"
+    cancelled, kept = CancelScope(), CancelScope()
+    coalesced = qa_pipeline.singleflight_stats()["execute_sql"].coalesced
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        first = pool.submit(qa_pipeline.execute_sql_arrow, sql, cancelled)
+        deadline = time.monotonic() + 5
+        while not fetching:
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+        second = pool.submit(qa_pipeline.execute_sql_arrow, sql, kept)
+        while qa_pipeline.singleflight_stats()["execute_sql"].coalesced == coalesced:
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+        cancelled.cancel()
+        with pytest.raises(QueryCancelledError):
+            first.result(timeout=5)
+        release.set()
+        assert second.result(timeout=5).table.column("book_count")[0].as_py() == 2
+    assert fetching == [cancelled, kept]
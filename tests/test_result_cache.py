@@ -0,0 +1,53 @@
+import pyarrow as pa
+
+from sql_ai_agent.db.result_cache import CachedResult, ResultCache, canonicalize_sql, result_key
+
+
+def _result(rows):
+    return CachedResult(pa.table({"n": list(range(rows))}), rows)
+
+
+def test_canonical_sql_ignores_layout_but_not_literals():
+    assert canonicalize_sql("SELECT  a\n FROM t ;") == "SELECT a FROM t"
+    assert canonicalize_sql("SELECT 'a  b'") != canonicalize_sql("SELECT 'a b'")
+
+
+def test_canonical_sql_drops_comments_without_merging_lines():
+    assert canonicalize_sql("SELECT 1 -- note\n+ 1 AS x") == "SELECT 1 + 1 AS x"
+    assert canonicalize_sql("SELECT 1 -- note + 1 AS x") == "SELECT 1"
+    assert canonicalize_sql("SELECT /* a */ 1; -- done") == "SELECT 1"
+    assert canonicalize_sql("SELECT '-- kept' AS c") == "SELECT '-- kept' AS c"
+    assert result_key("SELECT 1", "db", (1, 2), 10) == result_key(" SELECT\t1;", "db", (1, 2), 10)
+
+
+def test_canonical_sql_keeps_comment_markers_inside_e_and_dollar_literals():
+    assert canonicalize_sql("SELECT $$x -- one$$ AS v") != canonicalize_sql("SELECT $$x -- two$$ AS v")
+    assert canonicalize_sql("SELECT $q$x /* one */$q$ AS v") != canonicalize_sql("SELECT $q$x /* two */$q$ AS v")
+    assert canonicalize_sql("SELECT E'a\\' -- one' AS v") != canonicalize_sql("SELECT E'a\\' -- two' AS v")
+    assert canonicalize_sql("SELECT E'a\\' /* one */' AS v") == "SELECT E'a\\' /* one */' AS v"
+
+
+def test_lru_eviction_spill_and_invalidation(tmp_path):
+    cache = ResultCache(max_entries=2, spill_dir=str(tmp_path / "spill"))
+    for key in ("a", "b"):
+        cache.put(key, "db", 1, _result(3))
+    assert cache.get("a", "db", 1).total_rows == 3
+    cache.put("c", "db", 1, _result(4))
+
+    # "b" was least recently used: it moved to the Parquet spill tier.
+    assert cache.get("b", "db", 1).table.num_rows == 3
+    assert list((tmp_path / "spill").glob("*.parquet"))
+    stats = cache.stats()
+    assert (stats.hits, stats.evictions, stats.spilled) == (2, 1, 1)
+
+    assert cache.get("a", "db", 2) is None
+    assert cache.stats().entries == 0
+    assert not list((tmp_path / "spill").glob("*.parquet"))
+
+
+def test_byte_budget_limits_memory(tmp_path):
+    cache = ResultCache(max_entries=10, max_bytes=_result(100).table.nbytes * 2)
+    for key in ("a", "b", "c"):
+        cache.put(key, "db", 1, _result(100))
+    assert cache.get("a", "db", 1) is None
+    assert cache.get("c", "db", 1) is not None
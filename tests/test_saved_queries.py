@@ -0,0 +1,104 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sql_ai_agent.storage.saved_queries import (
+    SavedQueryStore,
+    close_stores,
+    count_queries,
+    delete_query,
+    frequent_sql,
+    get_store,
+    init_db,
+    list_queries,
+    record_sql_executions,
+    save_query,
+)
+
+
+def test_search_ranks_name_matches_and_paginates(tmp_path):
+    db_path = str(tmp_path / "saved.db")
+    init_db(db_path)
+    save_query(db_path, "Cheapest titles", "Which books are below 10 pounds?", "SELECT 1", tag="pricing")
+    save_query(db_path, "Genre counts", "How many books per genre?", "SELECT 2")
+    save_query(db_path, "Average price", "What is the mean book price?", "SELECT 3", tag="pricing")
+    save_query(db_path, "Price histogram", "Distribution of prices", "SELECT 4")
+
+    assert [item.name for item in list_queries(db_path, search="price")] == [
+        "Price histogram",
+        "Average price",
+    ]
+    assert [item.name for item in list_queries(db_path, search="pric")][:2] == ["Price histogram", "Average price"]
+    assert count_queries(db_path, search="pricing") == 2
+    assert count_queries(db_path, search="book genre") == 1
+    assert len(list_queries(db_path, limit=2)) == 2
+    assert [item.sql for item in list_queries(db_path, limit=2, offset=2)] == ["SELECT 2", "SELECT 1"]
+
+    cheapest = list_queries(db_path, search="cheapest")[0]
+    assert delete_query(db_path, cheapest.id)
+    assert list_queries(db_path, search="cheapest") == []
+
+
+def test_init_db_indexes_rows_from_an_existing_database(tmp_path):
+    db_path = str(tmp_path / "saved.db")
+    with sqlite3.connect(db_path) as con:
+        con.execute(
+            """
+            CREATE TABLE saved_queries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL, question TEXT NOT NULL,
+                sql TEXT NOT NULL, created_at TEXT NOT NULL, tag TEXT, notes TEXT
+            )
+            """
+        )
+        con.execute("INSERT INTO saved_queries VALUES (1, 'Legacy', 'Old question', 'SELECT 1', '2024', NULL, NULL)")
+
+    init_db(db_path)
+    init_db(db_path)
+    assert [item.name for item in list_queries(db_path, search="legacy")] == ["Legacy"]
+
+
+def test_store_uses_wal_and_round_trips_bulk_import_export(tmp_path):
+    store = SavedQueryStore(str(tmp_path / "saved.db"), pool_size=2)
+    with sqlite3.connect(store.db_path) as con:
+        assert con.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+    queries = [{"name": f"Query {i}", "question": f"Question {i}", "sql": f"SELECT {i}"} for i in range(50)]
+    assert store.save_many(queries) == 50
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        ids = list(pool.map(lambda i: store.save(f"Extra {i}", "Q", "SELECT 1", tag="extra"), range(20)))
+        counts = list(pool.map(lambda _: store.count(), range(20)))
+    assert len(set(ids)) == 20 and all(50 <= count <= 70 for count in counts)
+
+    export = tmp_path / "queries.jsonl"
+    assert store.export_jsonl(str(export)) == 70
+    copy = SavedQueryStore(str(tmp_path / "copy.db"))
+    assert copy.import_jsonl(str(export)) == 70
+    assert copy.count("extra") == 20
+    assert copy.list_queries(limit=1)[0].created_at == store.list_queries(limit=1)[0].created_at
+    store.close()
+    copy.close()
+
+
+def test_sql_history_counts_executions(tmp_path):
+    db_path = str(tmp_path / "saved.db")
+    assert record_sql_executions(db_path, {"SELECT COUNT(*) FROM books": 1, "SELECT 1": 1}) == {
+        "SELECT COUNT(*) FROM books": 1,
+        "SELECT 1": 1,
+    }
+    assert record_sql_executions(db_path, {"SELECT  COUNT(*)\nFROM books": 2}) == {"SELECT  COUNT(*)\nFROM books": 3}
+    assert frequent_sql(db_path) == [("SELECT COUNT(*) FROM books", 3), ("SELECT 1", 1)]
+
+
+def test_closed_store_closes_its_connections_and_refuses_new_work(tmp_path):
+    db_path = str(tmp_path / "saved.db")
+    store = get_store(db_path)
+    store.save("Query", "Question", "SELECT 1")
+    with store._connection() as held:
+        close_stores()
+    with pytest.raises(sqlite3.ProgrammingError):
+        held.execute("SELECT 1")
+    with pytest.raises(RuntimeError, match="closed"):
+        store.count()
+    assert get_store(db_path) is not store
+    assert count_queries(db_path) == 1
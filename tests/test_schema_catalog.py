@@ -0,0 +1,30 @@
+import duckdb
+
+from sql_ai_agent.db.duckdb_client import DuckDBClient
+from sql_ai_agent.db.schema_catalog import clear_catalog_cache, get_catalog
+
+
+def test_catalog_renders_all_tables_and_refreshes_on_change(tmp_path):
+    clear_catalog_cache()
+    db_path = tmp_path / "sample.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE books (title VARCHAR, price DECIMAL(10, 2))")
+        con.execute("CREATE TABLE authors (id INTEGER, name VARCHAR)")
+
+    client = DuckDBClient(str(db_path))
+    catalog = get_catalog(client)
+    assert catalog.render() == (
+        "Tables:\n"
+        "- authors: id INTEGER, name VARCHAR\n"
+        "- books: title VARCHAR, price DECIMAL(10,2)"
+    )
+    assert get_catalog(client) is catalog
+
+    replacement = tmp_path / "replacement.duckdb"
+    with duckdb.connect(str(replacement)) as con:
+        con.execute("CREATE TABLE books (title VARCHAR)")
+    replacement.replace(db_path)
+
+    refreshed = get_catalog(client)
+    assert refreshed is not catalog
+    assert refreshed.table_names() == ["books"]
@@ -0,0 +1,35 @@
+import duckdb
+
+from sql_ai_agent.db.duckdb_client import DuckDBClient
+from sql_ai_agent.db.schema_catalog import load_catalog
+from sql_ai_agent.pipeline.schema_retrieval import build_schema_index, prune_schema, tokenize
+
+
+def _wide_client(tmp_path):
+    db_path = tmp_path / "wide.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE books (title VARCHAR, price DECIMAL(10, 2), genre VARCHAR)")
+        con.execute("INSERT INTO books VALUES ('Dune', 9.99, 'Science Fiction')")
+        con.execute("CREATE TABLE authors (author_id INTEGER, full_name VARCHAR)")
+        con.execute("COMMENT ON TABLE authors IS 'People who wrote books'")
+        for i in range(20):
+            con.execute(f"CREATE TABLE metric_{i} (metric_id INTEGER, value_{i} DOUBLE)")
+    return DuckDBClient(str(db_path))
+
+
+def test_tokenize_splits_identifiers_and_folds_plurals():
+    assert tokenize("bookPrices total_sales") == ["book", "price", "total", "sale"]
+
+
+def test_prunes_to_relevant_tables_and_falls_back_when_unsure(tmp_path):
+    client = _wide_client(tmp_path)
+    index = build_schema_index(client, load_catalog(client))
+
+    pruned = prune_schema(index, "Average price of science fiction books", top_k=2)
+    assert pruned.pruned
+    assert "books" in pruned.tables
+    assert "metric_3" not in pruned.context
+
+    vague = prune_schema(index, "What happened yesterday?", top_k=2)
+    assert not vague.pruned
+    assert len(vague.tables) == 22
@@ -0,0 +1,100 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from sql_ai_agent.utils.singleflight import SingleFlight, WaitCancelled, WaitTimeout
+
+
+def _wait_for(condition) -> None:
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def test_threads_share_one_execution():
+    flight = SingleFlight("test-threads")
+    release = threading.Event()
+    calls = []
+
+    def work(value: int) -> int:
+        calls.append(value)
+        release.wait(5)
+        return value * 2
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        futures = [pool.submit(flight.do, "key", work, 21) for _ in range(3)]
+        _wait_for(lambda: flight.stats().coalesced == 2)
+        release.set()
+        assert [future.result() for future in futures] == [42, 42, 42]
+    assert calls == [21]
+    assert flight.stats().executions == 1 and flight.stats().in_flight == 0
+
+
+def test_async_callers_share_errors_and_later_calls_run_again():
+    flight = SingleFlight("test-async")
+    calls = []
+
+    async def fail() -> None:
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario() -> list:
+        return await asyncio.gather(*(flight.ado("key", fail) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(scenario())
+    assert [str(error) for error in errors] == ["boom"] * 3
+    assert len(calls) == 1
+    with pytest.raises(ValueError):
+        asyncio.run(flight.ado("key", fail))
+    assert flight.stats().executions == 2
+
+
+def test_followers_retry_when_the_leader_is_abandoned():
+    flight = SingleFlight("test-abandoned")
+    call, leader = flight.claim("key")
+    assert leader
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        follower = pool.submit(flight.do, "key", lambda: "recomputed")
+        _wait_for(lambda: flight.stats().coalesced == 1)
+        flight.complete("key", call, error=GeneratorExit())
+        assert follower.result(timeout=5) == "recomputed"
+    assert flight.stats().executions == 2
+
+
+def test_followers_retry_after_a_leader_error_listed_in_retry_on():
+    flight = SingleFlight("test-retry-on", retry_on=(TimeoutError,))
+    call, leader = flight.claim("key")
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        follower = pool.submit(flight.do, "key", lambda: "own result")
+        _wait_for(lambda: flight.stats().coalesced == 1)
+        flight.complete("key", call, error=TimeoutError("leader's deadline"))
+        assert follower.result(timeout=5) == "own result"
+
+
+def test_follower_stops_waiting_without_stopping_the_leader():
+    flight = SingleFlight("test-follower-gives-up")
+    release = threading.Event()
+    stop = threading.Event()
+
+    def work() -> str:
+        release.wait(5)
+        return "done"
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        leader = pool.submit(flight.do, "key", work)
+        _wait_for(lambda: flight.stats().in_flight == 1)
+        cancelled = pool.submit(flight.do, "key", work, cancelled=stop.is_set)
+        with pytest.raises(WaitTimeout):
+            flight.do("key", work, timeout=0.05)
+        stop.set()
+        with pytest.raises(WaitCancelled):
+            cancelled.result(timeout=5)
+        assert not leader.done()
+        release.set()
+        assert leader.result(timeout=5) == "done"
+    assert flight.stats().executions == 1
@@ -0,0 +1,45 @@
+from sql_ai_agent.llm.sql_cache import SqlCache, close_sql_caches, get_sql_cache
+
+
+def test_exact_hit_ignores_case_whitespace_and_punctuation(tmp_path):
+    cache = SqlCache(str(tmp_path / "cache.db"))
+    scope = SqlCache.scope_for("Tables:\n- books: title VARCHAR", "model", "v1")
+    assert cache.lookup("What is the average price?", scope) is None
+
+    cache.store("What is the average price?", scope, "SELECT AVG(price) AS avg_price FROM books")
+    hit = cache.lookup("  what is the   AVERAGE price ", scope)
+    assert hit is not None and hit.exact
+    assert hit.sql == "SELECT AVG(price) AS avg_price FROM books"
+
+    other_scope = SqlCache.scope_for("Tables:\n- books: title VARCHAR", "model", "v2")
+    assert cache.lookup("What is the average price?", other_scope) is None
+
+    stats = cache.stats()
+    assert (stats.exact_hits, stats.misses) == (1, 2)
+
+
+def test_similarity_tier_and_lru_eviction(tmp_path):
+    cache = SqlCache(str(tmp_path / "cache.db"), max_entries=2, similarity_threshold=0.8)
+    scope = SqlCache.scope_for("schema", "model", "v1")
+    cache.store("average book price", scope, "SELECT 1")
+    cache.store("count of books", scope, "SELECT 2")
+
+    hit = cache.lookup("average books price", scope)
+    assert hit is not None and not hit.exact
+    assert hit.sql == "SELECT 1"
+
+    cache.store("most expensive book", scope, "SELECT 3")
+    assert cache.lookup("count of books", scope) is None
+    assert cache.lookup("average book price", scope).sql == "SELECT 1"
+
+
+def test_closed_caches_are_not_handed_out_again(tmp_path):
+    path = str(tmp_path / "cache.db")
+    scope = SqlCache.scope_for("schema", "model", "v1")
+    cache = get_sql_cache(path)
+    cache.store("count of books", scope, "SELECT 2")
+
+    close_sql_caches()
+    reopened = get_sql_cache(path)
+    assert reopened is not cache
+    assert reopened.lookup("count of books", scope).sql == "SELECT 2"
@@ -0,0 +1,37 @@
+from sql_ai_agent.llm.client import get_client
+from sql_ai_agent.llm.sql_generator import explain_sql, generate_sql, stream_explain, stream_sql
+
+
+def test_generate_and_explain_share_one_keep_alive_client(openai_stub):
+    openai_stub.reply("```sql\nSELECT AVG(price) AS avg_price FROM books\n```")
+    openai_stub.reply("Computes the average price.")
+
+    first = get_client()
+    assert generate_sql("average price?", "Tables:\n- books: price DOUBLE") == (
+        "SELECT AVG(price) AS avg_price FROM books"
+    )
+    assert explain_sql("SELECT 1", "") == "Computes the average price."
+    assert get_client() is first
+    assert len(set(openai_stub.client_ports)) == 1
+    assert openai_stub.requests[0]["model"] == "gpt-4o-mini"
+
+
+def test_retries_transient_server_errors(openai_stub, monkeypatch):
+    monkeypatch.setenv("OPENAI_MODEL", "stub-model")
+    openai_stub.reply("overloaded", status=503)
+    openai_stub.reply("SELECT 1 AS one")
+
+    assert generate_sql("one", "") == "SELECT 1 AS one"
+    assert len(openai_stub.requests) == 2
+    assert openai_stub.requests[-1]["model"] == "stub-model"
+
+
+def test_streaming_strips_fences_incrementally(openai_stub):
+    openai_stub.reply("```sql\nSELECT title AS book_title\nFROM books\n```")
+    openai_stub.reply("  Lists every book title.  ")
+
+    chunks = list(stream_sql("titles", ""))
+    assert len(chunks) > 1
+    assert "".join(chunks) == "SELECT title AS book_title\nFROM books"
+    assert "".join(stream_explain("SELECT 1", "")) == "Lists every book title."
+    assert all(request["stream"] for request in openai_stub.requests)
@@ -35,3 +35,31 @@ def test_blocks_multiple_statements():
 def test_allows_trailing_semicolon():
     sql = "SELECT * FROM books;"
     assert is_read_only(sql)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT 'please update me' AS note FROM books",
+        'SELECT title AS "update", price AS "created" FROM books',
+        "SELECT title FROM books -- drop the cheap ones later",
+        "SELECT title FROM books WHERE title = 'a;b'",
+        "WITH cheap AS (SELECT * FROM books) SELECT COUNT(*) AS n FROM cheap",
+        "/* report */ SELECT 1 AS one",
+    ],
+)
+def test_ignores_keywords_in_literals_identifiers_and_comments(sql):
+    assert is_read_only(sql)
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT 1; -- trailing\nDROP TABLE books",
+        "SET threads = 1",
+        "INSTALL httpfs",
+        "SELECT 'x'; DELETE FROM books",
+    ],
+)
+def test_blocks_non_read_statements(sql):
+    assert not is_read_only(sql)
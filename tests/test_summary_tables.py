@@ -0,0 +1,113 @@
+import os
+
+import duckdb
+import pytest
+
+from sql_ai_agent.db.duckdb_client import DuckDBClient
+from sql_ai_agent.db.summary_tables import SummaryStore, advise, aggregate_shape, wait_for_summaries
+from sql_ai_agent.pipeline import qa_pipeline
+
+HOT_QUERIES = [
+    "SELECT genre, COUNT(*) AS book_count, AVG(price) AS avg_price FROM books GROUP BY genre ORDER BY genre",
+    "SELECT b.genre, ROUND(SUM(b.price), 1) AS total FROM books AS b WHERE b.genre <> 'g1' "
+    "GROUP BY b.genre HAVING COUNT(*) > 20 ORDER BY total DESC LIMIT 2",
+    "SELECT genre, COUNT(DISTINCT pages) AS pages FROM books GROUP BY genre ORDER BY pages, genre NULLS FIRST",
+    "SELECT UPPER(genre) AS genre_label, MAX(pages) - MIN(pages) AS page_range FROM books "
+    "WHERE genre IS NOT NULL GROUP BY genre ORDER BY 1",
+    "SELECT COUNT(*) AS book_count, SUM(pages) AS total_pages, MEDIAN(price) AS median_price FROM books",
+    "SELECT COUNT(*) AS book_count FROM books HAVING COUNT(*) > 1000",
+]
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    db_path = str(tmp_path / "books.duckdb")
+    with duckdb.connect(db_path) as con:
+        con.execute(
+            """
+            CREATE TABLE books AS
+            SELECT
+                i AS book_id,
+                CASE WHEN i % 7 = 0 THEN NULL ELSE 'g' || (i % 4) END AS genre,
+                CAST(i * 1.25 AS DECIMAL(10, 2)) AS price,
+                CAST((i * 13) % 50 AS INTEGER) AS pages
+            FROM range(400) AS t(i)
+            """
+        )
+    return db_path
+
+
+def _results(db: DuckDBClient, sql: str):
+    table = db.run(lambda con: con.execute(sql).arrow())
+    return table.schema, table.to_pylist()
+
+
+def test_rewritten_queries_return_identical_results(catalog, tmp_path):
+    store = SummaryStore(str(tmp_path / "summaries.duckdb"))
+    specs = advise([(sql, 1) for sql in HOT_QUERIES], min_executions=1)
+    assert len(store.build(catalog, specs)) == 2
+
+    source, summaries = DuckDBClient(catalog), DuckDBClient(store.path)
+    for sql in HOT_QUERIES:
+        rewritten = store.rewrite(sql, catalog)
+        assert rewritten is not None and "summary_" in rewritten, sql
+        assert _results(summaries, rewritten) == _results(source, sql), sql
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        "SELECT genre, COUNT(*) AS n FROM books WHERE pages > 10 GROUP BY genre",
+        "SELECT genre, COUNT(*) FROM books GROUP BY genre",
+        "SELECT genre, STRING_AGG(CAST(pages AS VARCHAR), ',') AS pages FROM books GROUP BY genre",
+        "SELECT genre, COUNT(*) AS n FROM books GROUP BY ROLLUP (genre)",
+        "SELECT COUNT(*) AS n FROM books WHERE genre = 'g1'",
+        "SELECT b.genre, COUNT(*) AS n FROM books AS b JOIN books AS c USING (book_id) GROUP BY b.genre",
+        "SELECT genre, pages FROM books",
+        "SELECT genre, COUNT(*) AS n FROM books WHERE book_id IN (SELECT 1) GROUP BY genre",
+    ],
+)
+def test_queries_a_summary_cannot_answer_exactly_are_left_alone(sql):
+    assert aggregate_shape(sql) is None
+
+
+def test_summaries_need_rebuilding_after_the_source_changes(catalog, tmp_path):
+    store = SummaryStore(str(tmp_path / "summaries.duckdb"))
+    sql = "SELECT genre, COUNT(*) AS book_count FROM books GROUP BY genre ORDER BY genre"
+    specs = advise([(sql, 3)])
+    store.build(catalog, specs)
+    assert store.is_current(catalog) and store.rewrite(sql, catalog) is not None
+
+    with duckdb.connect(catalog) as con:
+        con.execute("INSERT INTO books VALUES (1000, 'g9', 1.00, 1)")
+    assert not store.is_current(catalog)
+    assert store.rewrite(sql, catalog) is None
+
+    store.build(catalog, specs)
+    assert ("g9", 1) in DuckDBClient(store.path).fetch_rows(store.rewrite(sql, catalog))
+
+
+def test_pipeline_serves_hot_aggregates_from_summaries(catalog, tmp_path, monkeypatch):
+    summary_db = str(tmp_path / "summaries.duckdb")
+    monkeypatch.setenv("DUCKDB_PATH", catalog)
+    monkeypatch.setenv("SAVED_QUERIES_DB", str(tmp_path / "saved_queries.db"))
+    monkeypatch.setenv("SUMMARY_DB", summary_db)
+    monkeypatch.setenv("SUMMARY_MIN_EXECUTIONS", "3")
+    monkeypatch.setenv("RESULT_CACHE_MAX_ENTRIES", "0")
+    sql = HOT_QUERIES[0]
+
+    first = qa_pipeline.execute_sql(sql)
+    qa_pipeline.execute_sql(sql)
+    qa_pipeline.wait_for_sql_history()
+    wait_for_summaries()
+    assert not os.path.exists(summary_db) or not SummaryStore(summary_db).summaries()
+
+    # The third execution crosses SUMMARY_MIN_EXECUTIONS, which queues a rebuild on its own.
+    qa_pipeline.execute_sql(sql)
+    qa_pipeline.wait_for_sql_history()
+    wait_for_summaries()
+
+    store = SummaryStore(summary_db)
+    assert [summary.table for summary in store.summaries()] == ["books"]
+    assert store.rewrite(sql, catalog) is not None
+    assert qa_pipeline.execute_sql(sql).equals(first)
@@ -0,0 +1,71 @@
+import logging
+import urllib.request
+
+import duckdb
+import pytest
+
+from sql_ai_agent.pipeline import qa_pipeline
+from sql_ai_agent.utils import tracing
+
+
+@pytest.fixture
+def traced(tmp_path, monkeypatch, openai_stub):
+    db_path = tmp_path / "books.duckdb"
+    with duckdb.connect(str(db_path)) as con:
+        con.execute("CREATE TABLE books (title VARCHAR, price DECIMAL(10, 2))")
+        con.execute("INSERT INTO books VALUES ('A', 10), ('B', 20), ('C', 30)")
+    monkeypatch.setenv("DUCKDB_PATH", str(db_path))
+    monkeypatch.setenv("SQL_CACHE_DB", str(tmp_path / "sql_cache.db"))
+    monkeypatch.setenv("RESULT_CACHE_MAX_ENTRIES", "0")
+    tracing.METRICS.reset()
+    tracing.configure_tracing(True)
+    yield openai_stub
+    tracing.configure_tracing(False)
+    tracing.METRICS.reset()
+
+
+def test_disabled_tracing_records_nothing():
+    tracing.configure_tracing(False)
+    tracing.METRICS.reset()
+    with tracing.span("noop") as trace:
+        trace.record_rows(3)
+    assert trace is tracing.span("other")
+    assert tracing.METRICS.span_count("noop") == 0
+
+
+def test_pipeline_stages_are_traced(traced, caplog):
+    traced.reply("SELECT title FROM books ORDER BY title")
+
+    with caplog.at_level(logging.INFO, logger="sql_ai_agent.utils.tracing"):
+        qa_pipeline.run("List the titles")
+
+    metrics = tracing.METRICS
+    for name in ("pipeline.prepare_question", "pipeline.schema", "llm.generate_sql", "pipeline.execute"):
+        assert metrics.span_count(name) == 1, name
+    assert metrics.token_count("llm.generate_sql", "prompt") == 1
+
+    spans = {record.span["name"]: record.span for record in caplog.records if hasattr(record, "span")}
+    root = spans["pipeline.prepare_question"]
+    assert root["parent_id"] is None
+    assert spans["llm.generate_sql"]["parent_id"] == root["span_id"]
+    assert spans["duckdb.query_page"]["rows"] == 3
+
+    text = tracing.render_metrics()
+    assert 'sql_ai_agent_span_seconds_count{span="pipeline.schema"} 1' in text
+    assert 'sql_ai_agent_rows_total{span="duckdb.query_page"} 3' in text
+
+
+def test_metrics_server_serves_prometheus_text(traced):
+    with tracing.span("pipeline.execute"):
+        pass
+    server = tracing.start_metrics_server(0)
+    try:
+        host, port = server.server_address[:2]
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics") as response:
+            body = response.read().decode("utf-8")
+            content_type = response.headers["Content-Type"]
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert content_type.startswith("text/plain")
+    assert 'sql_ai_agent_span_seconds_bucket{span="pipeline.execute",le="+Inf"} 1' in body